@@ -2,12 +2,14 @@ from datetime import timedelta
 from uuid import uuid4
 
 from django.conf import settings
-from django.db import models
+from django.db import models, router
 from django.utils import timezone
 
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from flytster.routers import set_pinned, set_shard
+
 
 def generate_token():
     return uuid4().hex
@@ -48,14 +50,20 @@ class TokenAuthentication(BaseAuthentication):
         return self.authenticate_credentials(token)
 
     def authenticate_credentials(self, key):
+        # Read from the primary, since a lagging replica could miss the user's
+        # pin or a token that was just issued
+        tokens = AuthToken.objects.db_manager(router.db_for_write(AuthToken))
         try:
-            token = AuthToken.objects.select_related('user').get(token=key)
+            token = tokens.select_related('user').get(token=key)
         except AuthToken.DoesNotExist:
             raise AuthenticationFailed()
 
         if token.is_expired:
             raise AuthenticationFailed()
 
+        set_shard(token.user.shard or None)
+        if token.user.is_pinned_to_primary:
+            set_pinned(True)
         return (token.user, token.token)
 
 
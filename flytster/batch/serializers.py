@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.urlresolvers import resolve, Resolver404
+
+from rest_framework import serializers
+
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+BATCH_PATH_PREFIX = '/api/v1/'
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=BATCH_METHODS)
+    path = serializers.CharField(max_length=500)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_path(self, value):
+        path = value.partition('?')[0]
+        if not path.startswith(BATCH_PATH_PREFIX):
+            raise serializers.ValidationError(
+                'Paths must start with {0}.'.format(BATCH_PATH_PREFIX))
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return value
+        if match.url_name == 'batch':
+            raise serializers.ValidationError('Batches can not be nested.')
+        return value
+
+    def validate_headers(self, value):
+        if any(name.lower() == 'authorization' for name in value):
+            raise serializers.ValidationError(
+                'Sub-requests use the batch request\'s authorization.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True)
+    read_only = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one request is required.')
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                'At most {0} requests can be batched.'.format(settings.BATCH_MAX_REQUESTS))
+        return value
+
+    def validate(self, attrs):
+        if attrs['read_only'] and any(r['method'] != 'GET' for r in attrs['requests']):
+            raise serializers.ValidationError('Read only batches can only contain GET requests.')
+        return attrs
@@ -0,0 +1,101 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+import json
+
+from django.core.urlresolvers import reverse
+from django.test import Client
+from rest_framework import status
+
+from users.models import FlytsterUser
+from trips.models import Trip, TripStatus
+
+
+class BatchSetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create()
+        )
+
+        self.url_batch = reverse('batch')
+
+    def post(self, data, **auth):
+        return self.client.post(self.url_batch, data=json.dumps(data),
+                                content_type='application/json', **auth)
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return BatchSetupFixture()
+
+
+def test_batch_reads(setup):
+    data = {'read_only': True, 'requests': [
+        {'method': 'GET', 'path': reverse('get_update_user')},
+        {'method': 'GET', 'path': reverse('list_create_passenger')},
+        {'method': 'GET', 'path': reverse('trip_list_create') + '?fields=id'},
+    ]}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    user, passengers, trips = response.data['responses']
+    assert user['status'] == 200
+    assert user['body']['email'] == setup.user.email
+    assert passengers['body']['count'] == 0
+    assert trips['body']['results'] == [{'id': setup.trip.id}]
+
+def test_batch_write(setup):
+    data = {'requests': [
+        {'method': 'POST', 'path': reverse('list_create_passenger'), 'body': {
+            'trip_id': setup.trip.id, 'first_name': 'Drew', 'last_name': 'Brees',
+            'gender': 'M', 'birthdate': '1979-01-15'}},
+        {'method': 'GET', 'path': reverse('list_create_passenger')},
+    ]}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    created, listed = response.data['responses']
+    assert created['status'] == 201
+    assert listed['body']['count'] == 1
+
+def test_batch_not_found(setup):
+    data = {'requests': [{'method': 'GET', 'path': '/api/v1/nothing-here'}]}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['responses'][0]['status'] == 404
+
+def test_batch_read_only_rejects_writes(setup):
+    data = {'read_only': True, 'requests': [
+        {'method': 'DELETE', 'path': reverse('trip_retrieve_delete', args=[setup.trip.id])}]}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert Trip.objects.count() == 1
+
+def test_batch_nested(setup):
+    data = {'requests': [{'method': 'POST', 'path': setup.url_batch}]}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_batch_too_many(setup, settings):
+    settings.BATCH_MAX_REQUESTS = 1
+    data = {'requests': [{'method': 'GET', 'path': reverse('get_update_user')}] * 2}
+    response = setup.post(data, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'requests' in response.data
+
+def test_batch_no_auth(setup):
+    data = {'requests': [{'method': 'GET', 'path': reverse('get_update_user')}]}
+    response = setup.post(data)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,77 @@
+import json
+
+from django.core.urlresolvers import resolve, Resolver404
+from django.db import DatabaseError, connections, transaction
+from django.test.client import RequestFactory
+
+from rest_framework import status, views
+from rest_framework.response import Response
+
+from flytster.routers import user_database
+
+from .serializers import BatchSerializer
+
+
+class BatchView(views.APIView):
+    """
+    POST: Runs a list of API requests as the authenticated user and returns
+    all of their responses. Read only batches share one consistent snapshot.
+    """
+
+    def post(self, request):
+        batch = BatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        sub_requests = batch.validated_data['requests']
+
+        if batch.validated_data['read_only']:
+            using = user_database()
+            connection = connections[using]
+            # SET TRANSACTION only works as the first statement of a transaction
+            starts_transaction = not connection.in_atomic_block
+            with transaction.atomic(using=using):
+                if starts_transaction:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+                responses = [self.run_read_only(request, item, using) for item in sub_requests]
+        else:
+            responses = [self.run(request, item) for item in sub_requests]
+
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+    def run_read_only(self, request, item, using):
+        try:
+            with transaction.atomic(using=using):
+                return self.run(request, item)
+        except DatabaseError:
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'body': {'detail': 'This request can not run in a read only batch.'}}
+
+    def run(self, request, item):
+        """
+        Dispatches one sub-request straight to its view, skipping middleware
+        and reusing the batch request's authentication.
+        """
+        path = item['path'].partition('?')[0]
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+
+        meta = {'HTTP_HOST': request.get_host()}
+        for name, value in item.get('headers', {}).items():
+            meta['HTTP_' + name.upper().replace('-', '_')] = value
+
+        body = json.dumps(item['body']) if 'body' in item else ''
+        sub_request = RequestFactory().generic(
+            item['method'], item['path'], data=body, content_type='application/json',
+            secure=request.is_secure(), **meta)
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        response = match.func(sub_request, *match.args, **match.kwargs)
+
+        if not hasattr(response, 'data'):
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': 'This request can not be batched.'}}
+        return {'status': response.status_code, 'body': response.data}
@@ -0,0 +1,55 @@
+"""
+Times utc_string_to_datetime against the strptime version it replaced over a
+million QPX timestamps. Doesn't need Django or a database.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.utils import add_project_to_path, timed, report
+
+add_project_to_path()
+
+from utils.converters import utc_string_to_datetime, utc_strings_to_datetimes
+
+
+OFFSETS = ['-04:00', '-05:00', '-06:00', '-07:00', '-08:00', '-10:00']
+
+
+def strptime_utc_string_to_datetime(utc_string):
+    string = ''.join(utc_string.rsplit(':', 1))
+    return datetime.strptime(string, '%Y-%m-%dT%H:%M%z')
+
+
+def qpx_strings(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2016, 1, 1)
+    return [
+        (start + timedelta(minutes=rng.randrange(365 * 24 * 60))).strftime('%Y-%m-%dT%H:%M')
+        + rng.choice(OFFSETS)
+        for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=1000000, help='timestamps to parse')
+    args = parser.parse_args()
+
+    strings = qpx_strings(args.n)
+    assert ([strptime_utc_string_to_datetime(s) for s in strings[:1000]] ==
+            [utc_string_to_datetime(s) for s in strings[:1000]])
+
+    seconds, _ = timed(lambda: [strptime_utc_string_to_datetime(s) for s in strings])
+    report('strptime', seconds, args.n)
+
+    utc_string_to_datetime.cache_clear()
+    seconds, _ = timed(lambda: [utc_string_to_datetime(s) for s in strings])
+    report('utc_string_to_datetime', seconds, args.n)
+
+    utc_string_to_datetime.cache_clear()
+    seconds, _ = timed(utc_strings_to_datetimes, strings)
+    report('utc_strings_to_datetimes', seconds, args.n)
+
+
+if __name__ == '__main__':
+    main()
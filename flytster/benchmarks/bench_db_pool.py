@@ -0,0 +1,83 @@
+"""
+Simulates concurrent requests that each run one query and then close their
+connection, as Django does at the end of a request, with the stock Postgres
+backend and with the pooled one. Each backend runs in its own process.
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.utils import setup_django, report
+
+
+ENGINES = ('django.db.backends.postgresql', 'flytster.postgresql_pool')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_engine(engine, count, concurrency):
+    setup_django('flytster.settings')
+
+    from django.conf import settings
+    from django.db import connection
+
+    settings.DATABASES['default']['ENGINE'] = engine
+    settings.DATABASES['default']['POOL'] = {'MIN_SIZE': concurrency, 'MAX_SIZE': concurrency}
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        timings = []
+        for _ in range(count // concurrency):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+            timings.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    report('{0} x{1}'.format(engine, concurrency), seconds, len(latencies))
+    print('    p50 {0:.3f}ms  p95 {1:.3f}ms  p99 {2:.3f}ms'.format(
+        percentile(latencies, 0.50) * 1000,
+        percentile(latencies, 0.95) * 1000,
+        percentile(latencies, 0.99) * 1000))
+
+    if engine == 'flytster.postgresql_pool':
+        from flytster.postgresql_pool.base import pool_stats
+        print('    {0}'.format(pool_stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='requests per backend')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--engine', choices=ENGINES)
+    args = parser.parse_args()
+
+    if args.engine:
+        run_engine(args.engine, args.n, args.concurrency)
+        return
+
+    for engine in ENGINES:
+        subprocess.check_call([sys.executable, '-m', 'benchmarks.bench_db_pool',
+                               '-n', str(args.n), '-c', str(args.concurrency),
+                               '--engine', engine])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures per-request overhead of the default settings against the lean
+api_settings profile. Each profile runs in its own process since middleware
+and renderers are fixed at import. Needs a migrated database; all rows are
+rolled back.
+"""
+import argparse
+import subprocess
+import sys
+
+from benchmarks.utils import setup_django, rolled_back, timed, report
+
+
+PROFILES = ('flytster.settings', 'flytster.api_settings')
+
+
+def run_profile(settings_module, count):
+    setup_django(settings_module)
+
+    from django.core.urlresolvers import reverse
+    from django.test import Client
+    from django.test.utils import override_settings
+    from users.models import FlytsterUser
+
+    with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), rolled_back():
+        user = FlytsterUser.objects.create_user(
+            first_name='Bench', last_name='Mark', email='bench@flytster.com', password='Password1')
+        token = user.auth_tokens.latest('timestamp').token
+        url = reverse('get_update_user')
+
+        anonymous = Client()
+        authenticated = Client(HTTP_AUTHORIZATION=token)
+
+        def requests(client, expected):
+            for _ in range(count):
+                response = client.get(url)
+                assert response.status_code == expected, response.status_code
+
+        seconds, _ = timed(requests, anonymous, 403)
+        report('{0} GET /user 403'.format(settings_module), seconds, count)
+        seconds, _ = timed(requests, authenticated, 200)
+        report('{0} GET /user 200'.format(settings_module), seconds, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='requests per profile')
+    parser.add_argument('--settings', choices=PROFILES)
+    args = parser.parse_args()
+
+    if args.settings:
+        run_profile(args.settings, args.n)
+        return
+
+    for settings_module in PROFILES:
+        subprocess.check_call([sys.executable, '-m', 'benchmarks.bench_middleware',
+                               '-n', str(args.n), '--settings', settings_module])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Starts gunicorn with and without GUNICORN_PRELOAD and reports time to the
+first response, the slowest of the first requests (each worker's first one
+lands among them) and RSS and PSS per worker. PSS splits shared pages between
+the processes sharing them, so it drops when preloaded workers share memory.
+Linux only. Doesn't touch the database.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from benchmarks.utils import BASE_DIR
+
+
+def get(url):
+    start = time.perf_counter()
+    try:
+        urlopen(url).read()
+    except HTTPError as e:
+        # Anonymous GET /user is a 403, which is all the work we need
+        e.read()
+    return time.perf_counter() - start
+
+
+def first_response(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return get(url)
+        except URLError:
+            time.sleep(0.01)
+    raise RuntimeError('gunicorn did not respond at {0}'.format(url))
+
+
+def memory_kb(pid):
+    """
+    RSS and PSS of a process in kB.
+    """
+    values = {}
+    with open('/proc/{0}/smaps_rollup'.format(pid)) as smaps:
+        for line in smaps:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def worker_pids(master_pid):
+    with open('/proc/{0}/task/{0}/children'.format(master_pid)) as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def run(preload, args):
+    env = dict(os.environ,
+        GUNICORN_PRELOAD='true' if preload else 'false',
+        GUNICORN_WORKER_CLASS='sync',
+        GUNICORN_WORKERS=str(args.workers))
+    url = 'http://127.0.0.1:{0}/api/v1/user'.format(args.port)
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py',
+         '-b', '127.0.0.1:{0}'.format(args.port), '--log-level', 'warning',
+         'flytster.wsgi'],
+        cwd=BASE_DIR, env=env)
+
+    try:
+        first_response(url)
+        ready = time.perf_counter() - started
+        slowest = max(get(url) for _ in range(args.workers * 10))
+
+        memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        rss = sum(m[0] for m in memory) / len(memory)
+        pss = sum(m[1] for m in memory) / len(memory)
+
+        print('{0:<12} first response {1:>8.0f} ms   slowest of next {2} {3:>7.1f} ms   '
+              'per worker RSS {4:>7.0f} kB PSS {5:>7.0f} kB'.format(
+                'preload' if preload else 'no preload', ready * 1000,
+                args.workers * 10, slowest * 1000, rss, pss))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        run(preload, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Time and peak memory to decode the sample OTA_AirAvailRS in sabre/samples,
+with its options repeated -r times to stand in for a busy city pair, using
+ElementTree.fromstring against the streaming decoder in sabre.responses.
+Doesn't need Django or a database.
+"""
+import argparse
+import os
+import re
+import tracemalloc
+from xml.etree import ElementTree
+
+from benchmarks.utils import BASE_DIR, add_project_to_path, timed, report
+
+add_project_to_path()
+
+from sabre.responses import SABRE_NS, AvailableFlight, decode_availability
+
+
+SAMPLES_DIR = os.path.join(BASE_DIR, 'sabre', 'samples')
+
+
+def sample_availability(repeat):
+    with open(os.path.join(SAMPLES_DIR, 'OTA_AirAvailRS.xml'), 'rb') as sample:
+        content = sample.read()
+    options = re.search(b'(<OriginDestinationOption .*</OriginDestinationOption>)', content, re.S)
+    return content.replace(options.group(1), options.group(1) * repeat)
+
+
+def fromstring_availability(content):
+    flights = []
+    for segment in ElementTree.fromstring(content).iter(SABRE_NS + 'FlightSegment'):
+        flights.append(AvailableFlight(
+            carrier=segment.find(SABRE_NS + 'MarketingAirline').get('Code'),
+            number=segment.get('FlightNumber'),
+            origin=segment.find(SABRE_NS + 'OriginLocation').get('LocationCode'),
+            destination=segment.find(SABRE_NS + 'DestinationLocation').get('LocationCode'),
+            departure_time=segment.get('DepartureDateTime'),
+            arrival_time=segment.get('ArrivalDateTime'),
+            booking_classes=tuple(
+                (avail.get('ResBookDesigCode'), int(avail.get('ResBookDesigQuantity')))
+                for avail in segment.iterfind(SABRE_NS + 'BookingClassAvail'))))
+    return flights
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-r', type=int, default=2000, help='times to repeat the sample options')
+    parser.add_argument('-n', type=int, default=5, help='decodes per run')
+    args = parser.parse_args()
+
+    content = sample_availability(args.r)
+    flights = decode_availability(content).flights
+    assert fromstring_availability(content) == flights
+    print('{0:.1f} MB response, {1} flights'.format(len(content) / 2 ** 20, len(flights)))
+
+    for name, decode in (('ElementTree.fromstring', fromstring_availability),
+                         ('decode_availability', decode_availability)):
+        seconds, _ = timed(lambda: [decode(content) for _ in range(args.n)])
+        report(name, seconds, args.n)
+        print('    peak {0:.1f} MB'.format(peak_memory(decode, content) / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
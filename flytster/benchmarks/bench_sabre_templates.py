@@ -0,0 +1,61 @@
+"""
+Envelopes rendered per second for OTA_AirAvailLLSRQ with a new Jinja
+environment per call, as the Sabre requests used to, against the shared
+one in sabre.soap_requests. Also times a new process's first render with
+and without the bytecode cache. Doesn't need a database.
+"""
+import argparse
+import tempfile
+
+from benchmarks.bench_trip_batch import TRIP_OPTION
+from benchmarks.utils import setup_django, timed, report
+
+
+TEMPLATE = 'check_air_availability.xml'
+
+
+class StoredTrip(object):
+    data = TRIP_OPTION
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='envelopes per run')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
+    from sabre import soap_requests
+
+    context = dict(soap_requests.base_context('token'),
+        SEGMENTS=soap_requests.trip_segments(StoredTrip()))
+
+    def per_call():
+        env = Environment(loader=PackageLoader('sabre', 'templates'), autoescape=True)
+        return env.get_template(TEMPLATE).render(context)
+
+    def shared():
+        return soap_requests.render_template(TEMPLATE, context)
+
+    assert per_call() == shared()
+
+    for name, render in (('Environment per call', per_call), ('shared Environment', shared)):
+        seconds, _ = timed(lambda: [render() for _ in range(args.n)])
+        report(name, seconds, args.n)
+
+    with tempfile.TemporaryDirectory() as directory:
+        def first_render(bytecode_cache):
+            env = Environment(loader=PackageLoader('sabre', 'templates'), autoescape=True,
+                              bytecode_cache=bytecode_cache)
+            return env.get_template(TEMPLATE).render(context)
+
+        first_render(FileSystemBytecodeCache(directory))
+        for name, cache in (('first render, compiled', None),
+                            ('first render, bytecode cache', FileSystemBytecodeCache(directory))):
+            seconds, _ = timed(first_render, cache)
+            report(name, seconds, 1)
+
+
+if __name__ == '__main__':
+    main()
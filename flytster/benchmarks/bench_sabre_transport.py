@@ -0,0 +1,58 @@
+"""
+Compares a fresh requests.post per SOAP call, which pays a TCP and TLS
+handshake every time, with sabre.transport's shared keep-alive session,
+against a local TLS stub of Sabre.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.sabre_stub import SabreStub
+from benchmarks.utils import setup_django, report
+
+
+def latencies(call, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    import requests
+    from django.conf import settings
+    from sabre import transport
+
+    with SabreStub() as stub:
+        settings.SABRE_TESTING_URL = stub.url
+        # REQUESTS_CA_BUNDLE would otherwise win over the stub's certificate
+        session = transport.get_http_session()
+        session.trust_env = False
+        session.verify = stub.cert
+        envelope = '<SOAP-ENV:Envelope/>'
+
+        def fresh():
+            requests.post(stub.url, data=envelope, headers=transport.SOAP_HEADERS,
+                          verify=stub.cert).content
+
+        def pooled():
+            transport.post_soap('OTA_PingRQ', envelope).content
+
+        for name, call in (('requests.post', fresh), ('sabre.transport', pooled)):
+            timings = latencies(call, args.n)
+            report(name, sum(timings), args.n)
+            print('    p50 {0:.2f} ms'.format(statistics.median(timings) * 1000))
+
+        print(transport.metrics.snapshot())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Times `manage.py check`, which every management command, cron job and test
+run pays for at startup. Exits with status 1 when it is slower than the
+committed baseline by more than the tolerance. Doesn't touch the database.
+
+Raw times differ from machine to machine, so the gate compares startup as a
+multiple of a fixed calibration: a new interpreter importing a set of stdlib
+modules, which pays for process start and imports the same way.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import BASE_DIR, report
+
+
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'startup_baseline.json')
+
+CALIBRATION_IMPORTS = ('import argparse, decimal, email.mime.multipart, http.client, '
+                       'json, logging, xml.etree.ElementTree')
+
+
+def time_command(args, env=None):
+    start = time.perf_counter()
+    subprocess.check_call(args, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_check(settings_module):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    return time_command([sys.executable, 'manage.py', 'check'], env)
+
+
+def time_calibration():
+    return time_command([sys.executable, '-c', CALIBRATION_IMPORTS])
+
+
+def median_of(func, runs):
+    # The first run warms the filesystem cache and writes bytecode
+    func()
+    return statistics.median(func() for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=10, help='runs')
+    parser.add_argument('--settings', default='flytster.settings')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+        help='allowed slowdown over the baseline, as a fraction')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+        help='baseline file to compare against (default the committed one)')
+    parser.add_argument('--update-baseline', action='store_true',
+        help='save this run as the baseline, to commit')
+    args = parser.parse_args()
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print('No baseline at {0}. Save one with --update-baseline and commit it.'.format(
+            args.baseline))
+        sys.exit(2)
+
+    check = median_of(lambda: time_check(args.settings), args.n)
+    calibration = median_of(time_calibration, args.n)
+    ratio = check / calibration
+    report('manage.py check', check, 1)
+    report('calibration imports', calibration, 1)
+    print('Startup is {0:.2f}x the calibration.'.format(ratio))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({
+                'check_to_calibration': ratio,
+                'manage_py_check_seconds': check,
+                'calibration_seconds': calibration,
+                'python': platform.python_version(),
+            }, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print('Saved the baseline to {0}.'.format(args.baseline))
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline['python'] != platform.python_version():
+        print('The baseline was taken on Python {0}, this is {1}.'.format(
+            baseline['python'], platform.python_version()))
+
+    limit = baseline['check_to_calibration'] * (1 + args.tolerance)
+    print('Baseline {0:.2f}x, limit {1:.2f}x.'.format(baseline['check_to_calibration'], limit))
+    if ratio > limit:
+        print('Startup regressed by {0:.0%}.'.format(ratio / baseline['check_to_calibration'] - 1))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
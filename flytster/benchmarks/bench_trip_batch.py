@@ -0,0 +1,71 @@
+"""
+Compares saving N tripOptions with N single POST /trip requests against one
+POST /trip/batch request. Needs a migrated database; all rows are rolled back.
+"""
+import argparse
+import json
+from copy import deepcopy
+
+from benchmarks.utils import setup_django, rolled_back, timed, report
+
+
+TRIP_OPTION = {
+    "passenger_data": {"adult_count": 1, "child_count": 1},
+    "pricing_data": {
+        "base": 885.58, "tax": 111.62, "total": 997.20,
+        "last_ticket_time": "2016-02-16T10:25-05:00", "ptc": "ADT",
+        "refundable": True, "fare_calculation": "END ZP OGG PDX LAX XT 8.90US 73.25US 12.00ZP"
+    },
+    "trip_data": {"slice": [
+        {"duration": 159, "segment": [{
+            "duration": 159, "carrier": "NK", "number": "847", "cabin": "COACH",
+            "booking_code": "Y", "married_group": "0", "leg": [{
+                "duration": 159, "aircraft": "320", "arrival_time": "2016-02-16T14:04-07:00",
+                "departure_time": "2016-02-16T12:25-06:00", "origin": "ORD", "destination": "DEN"}]}]},
+        {"duration": 151, "segment": [{
+            "duration": 151, "carrier": "NK", "number": "630", "cabin": "COACH",
+            "booking_code": "Y", "married_group": "1", "leg": [{
+                "duration": 151, "aircraft": "320", "arrival_time": "2016-02-17T17:06-06:00",
+                "departure_time": "2016-02-17T13:35-07:00", "origin": "DEN", "destination": "ORD"}]}]}
+    ]}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=50, help='tripOptions per run')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.urlresolvers import reverse
+    from django.test import Client
+    from django.test.utils import override_settings
+    from users.models import FlytsterUser
+
+    with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                           TRIP_BATCH_MAX_SIZE=max(args.n, 50)), rolled_back():
+        user = FlytsterUser.objects.create_user(
+            first_name='Bench', last_name='Mark', email='bench@flytster.com', password='Password1')
+        client = Client(HTTP_AUTHORIZATION=user.auth_tokens.latest('timestamp').token)
+
+        def single_posts():
+            for _ in range(args.n):
+                response = client.post(reverse('trip_list_create'), json.dumps(TRIP_OPTION),
+                                       content_type='application/json')
+                assert response.status_code == 201, response.content
+
+        def batch_post():
+            body = json.dumps({'trips': [deepcopy(TRIP_OPTION) for _ in range(args.n)]})
+            response = client.post(reverse('trip_batch_create'), body,
+                                   content_type='application/json')
+            assert response.status_code == 201, response.content
+
+        seconds, _ = timed(single_posts)
+        report('{0} x POST /trip'.format(args.n), seconds, args.n)
+        seconds, _ = timed(batch_post)
+        report('1 x POST /trip/batch ({0} trips)'.format(args.n), seconds, args.n)
+
+
+if __name__ == '__main__':
+    main()
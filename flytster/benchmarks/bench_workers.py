@@ -0,0 +1,90 @@
+"""
+Compares throughput of gunicorn worker classes on requests that block on
+upstream I/O (see benchmarks.wsgi_io). Starts gunicorn with
+gunicorn_config.py once per worker class and fires concurrent requests at it.
+Doesn't touch the database.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from benchmarks.utils import BASE_DIR, report
+
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn did not start on port {0}'.format(port))
+
+
+def fire(url, count, concurrency):
+    def worker():
+        for _ in range(count // concurrency):
+            try:
+                urlopen(url).read()
+            except HTTPError as e:
+                # Anonymous GET /user is a 403, which is all the work we need
+                e.read()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_worker_class(worker_class, args):
+    env = dict(os.environ,
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(args.workers),
+        BENCH_IO_SECONDS=str(args.io))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py',
+         '-b', '127.0.0.1:{0}'.format(args.port), '--log-level', 'warning',
+         'benchmarks.wsgi_io:application'],
+        cwd=BASE_DIR, env=env)
+
+    try:
+        wait_for_port(args.port)
+        url = 'http://127.0.0.1:{0}/bench/io'.format(args.port)
+        fire(url, args.concurrency, args.concurrency)
+
+        start = time.perf_counter()
+        fire(url, args.n, args.concurrency)
+        report('{0} x{1} workers'.format(worker_class, args.workers),
+            time.perf_counter() - start, args.n - args.n % args.concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='requests per worker class')
+    parser.add_argument('-c', '--concurrency', type=int, default=64)
+    parser.add_argument('-w', '--workers', type=int, default=2)
+    parser.add_argument('--io', type=float, default=0.05, help='seconds of upstream I/O per request')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--worker-class', choices=WORKER_CLASSES, action='append')
+    args = parser.parse_args()
+
+    for worker_class in args.worker_class or WORKER_CLASSES:
+        run_worker_class(worker_class, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Import-time profile of django.setup(), and with --check of the system checks,
+which also import the URLconf and every view. Lists the slowest imports by
+total time, including what they import, and by self time.
+"""
+import argparse
+import importlib._bootstrap
+import time
+from collections import defaultdict
+
+from benchmarks.utils import setup_django
+
+
+def profile_imports(func):
+    """
+    Runs func and returns (name, self seconds, total seconds) for every module
+    imported while it ran. Hooks the function the import system calls for
+    modules not yet in sys.modules, which always gets the absolute name.
+    """
+    bootstrap = importlib._bootstrap
+    original = bootstrap._find_and_load
+    timings = []
+    children = [0.0]
+
+    def find_and_load(name, import_):
+        children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, import_)
+        finally:
+            elapsed = time.perf_counter() - start
+            self_time = elapsed - children.pop()
+            children[-1] += elapsed
+            timings.append((name, self_time, elapsed))
+
+    bootstrap._find_and_load = find_and_load
+    try:
+        func()
+    finally:
+        bootstrap._find_and_load = original
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--settings', default='flytster.settings')
+    parser.add_argument('--check', action='store_true', help='also run manage.py check')
+    parser.add_argument('-n', type=int, default=25, help='rows per table')
+    args = parser.parse_args()
+
+    def start():
+        setup_django(args.settings)
+        if args.check:
+            from django.core.management import call_command
+            call_command('check')
+
+    timings = profile_imports(start)
+
+    packages = defaultdict(float)
+    for name, self_time, _ in timings:
+        packages[name.partition('.')[0]] += self_time
+
+    total = sum(self_time for _, self_time, _ in timings)
+    print('{0} modules imported in {1:.1f} ms\n'.format(len(timings), total * 1000))
+
+    print('By package (self time)')
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.n]:
+        print('  {0:>8.1f} ms  {1}'.format(seconds * 1000, package))
+
+    print('\nBy module (total time, self time)')
+    for name, self_time, elapsed in sorted(timings, key=lambda item: -item[2])[:args.n]:
+        print('  {0:>8.1f} ms {1:>8.1f} ms  {2}'.format(elapsed * 1000, self_time * 1000, name))
+
+
+if __name__ == '__main__':
+    main()
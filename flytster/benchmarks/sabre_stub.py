@@ -0,0 +1,87 @@
+"""
+A local HTTPS server standing in for Sabre. It answers every POST with a
+canned SOAP body over keep-alive HTTP/1.1 connections, using a throwaway
+self-signed certificate made with the openssl CLI.
+"""
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+DEFAULT_BODY = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">'
+    b'<soap-env:Body><OTA_PingRS/></soap-env:Body></soap-env:Envelope>')
+
+
+# A config file instead of -addext, which older openssl releases lack
+OPENSSL_CONFIG = '''
+[req]
+distinguished_name = dn
+x509_extensions = ext
+prompt = no
+[dn]
+CN = localhost
+[ext]
+subjectAltName = DNS:localhost
+basicConstraints = critical, CA:TRUE
+'''
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle and
+    # delayed ACKs hold each reply on a kept-alive connection for ~40 ms.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = self.server.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SabreStub(object):
+
+    def __init__(self, body=DEFAULT_BODY):
+        self.directory = tempfile.mkdtemp()
+        self.cert = os.path.join(self.directory, 'cert.pem')
+        key = os.path.join(self.directory, 'key.pem')
+        config = os.path.join(self.directory, 'openssl.cnf')
+        with open(config, 'w') as config_file:
+            config_file.write(OPENSSL_CONFIG)
+        subprocess.check_call(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-config', config, '-keyout', key, '-out', self.cert],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.body = body
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.load_cert_chain(self.cert, key)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.url = 'https://localhost:{0}/'.format(self.server.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
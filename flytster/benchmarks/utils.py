@@ -0,0 +1,55 @@
+"""
+Shared helpers for the scripts in this package. Run a benchmark from the
+flytster directory, e.g. `python -m benchmarks.bench_trip_batch`.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_project_to_path():
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(settings_module='flytster.settings'):
+    add_project_to_path()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs the block in a transaction that is always rolled back, so benchmarks
+    can write to the database without leaving rows behind.
+    """
+    from django.db import transaction
+
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def report(name, seconds, count):
+    print('{0:<40} {1:>12.1f} ops/s {2:>10.3f} ms/op'.format(
+        name, count / seconds, seconds * 1000.0 / count))
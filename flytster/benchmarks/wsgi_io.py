@@ -0,0 +1,23 @@
+"""
+The Flytster WSGI app with a stand-in for a slow upstream call. Requests to
+/bench/io sleep for BENCH_IO_SECONDS, the way a view does while it waits on
+SMTP, Twilio or Sabre, then run through Django as GET /api/v1/user.
+"""
+import os
+import time
+
+from benchmarks.utils import add_project_to_path
+
+add_project_to_path()
+
+from flytster.wsgi import application as django_application
+
+
+IO_SECONDS = float(os.getenv('BENCH_IO_SECONDS', '0.05'))
+
+
+def application(environ, start_response):
+    if environ['PATH_INFO'] == '/bench/io':
+        time.sleep(IO_SECONDS)
+        environ['PATH_INFO'] = '/api/v1/user'
+    return django_application(environ, start_response)
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookings.pipeline import claim_jobs, run_claimed
+from flytster.routers import shard_aliases
+from sabre.availability import stats
+
+
+class Command(BaseCommand):
+    help = ('Runs queued booking jobs on a pool of worker threads. Any number '
+            'of these can run at once, since each claims its own jobs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.BOOKING_WORKERS)
+        parser.add_argument('--batch', type=int, default=settings.BOOKING_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true',
+            help='Run the jobs that are due now and exit.')
+
+    def handle(self, *args, **options):
+        reported = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                count = self.run_due_jobs(executor, options['batch'])
+                if options['once']:
+                    self.stdout.write('Ran {0} booking jobs.'.format(count))
+                    self.report_stats()
+                    return
+                if time.monotonic() - reported >= settings.SABRE_STATS_SECONDS:
+                    self.report_stats()
+                    reported = time.monotonic()
+                if not count:
+                    time.sleep(settings.BOOKING_POLL_SECONDS)
+
+    def run_due_jobs(self, executor, batch):
+        count = 0
+        for using in shard_aliases():
+            jobs = claim_jobs(using, batch)
+            wait([executor.submit(run_claimed, job) for job in jobs])
+            count += len(jobs)
+        return count
+
+    def report_stats(self):
+        current = stats()
+        self.stdout.write(
+            'Availability cache: {hit_rate:.0%} hit rate, {hits} hits, {negative_hits} negative hits, '
+            '{shared} shared, {misses} misses, {errors} errors, {size} cached.'.format(
+                **current['availability_cache']))
+        for action, calls in sorted(current['calls'].items()):
+            outcomes = ', '.join('{0} {1}'.format(count, outcome)
+                                 for outcome, count in sorted(calls['outcomes'].items()))
+            p95 = calls['p95_seconds']
+            self.stdout.write('Sabre {0}: {1} calls, p95 {2}, {3}.'.format(
+                action, calls['calls'], '{0:.0f} ms'.format(p95 * 1000) if p95 is not None else 'n/a',
+                outcomes or 'no outcomes'))
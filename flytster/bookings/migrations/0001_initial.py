@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('trips', '0005_trip_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step', models.CharField(choices=[('availability', 'availability'), ('book', 'book'), ('ticket', 'ticket'), ('done', 'done'), ('failed', 'failed')], default='availability', max_length=12)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, default='', max_length=500)),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='trips.Trip')),
+            ],
+            options={
+                'verbose_name_plural': 'BookingJobs',
+                'verbose_name': 'BookingJob',
+            },
+        ),
+    ]
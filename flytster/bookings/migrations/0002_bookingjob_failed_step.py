@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingjob',
+            name='failed_step',
+            field=models.CharField(blank=True, choices=[('availability', 'availability'), ('book', 'book'), ('ticket', 'ticket'), ('done', 'done'), ('failed', 'failed')], default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='bookingjob',
+            name='outcome_unknown',
+            field=models.BooleanField(default=False),
+        ),
+    ]
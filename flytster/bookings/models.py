@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+from trips.models import Trip
+
+
+AVAILABILITY = 'availability'
+BOOK = 'book'
+TICKET = 'ticket'
+DONE = 'done'
+FAILED = 'failed'
+
+STEP_CHOICES = (
+    (AVAILABILITY, AVAILABILITY),
+    (BOOK, BOOK),
+    (TICKET, TICKET),
+    (DONE, DONE),
+    (FAILED, FAILED))
+
+# Steps a worker still has to run
+PENDING_STEPS = (AVAILABILITY, BOOK, TICKET)
+
+
+class BookingJob(models.Model):
+    """
+    A trip's progress through the booking pipeline, see bookings.pipeline.
+    step is the next one to run, and is saved after each step so a job
+    picks up where it left off. A failed job keeps the step it failed on,
+    and whether Sabre may have acted on it anyway.
+    """
+    trip = models.OneToOneField(Trip, related_name='booking')
+    step = models.CharField(max_length=12, choices=STEP_CHOICES, default=AVAILABILITY)
+    failed_step = models.CharField(max_length=12, choices=STEP_CHOICES, default='', blank=True)
+    outcome_unknown = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    error = models.CharField(max_length=500, default='', blank=True)
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = u'BookingJob'
+        verbose_name_plural = u'BookingJobs'
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.trip_id, self.step)
@@ -0,0 +1,317 @@
+"""
+Moves passenger-ready trips through availability, booking and ticketing
+with Sabre, outside of HTTP requests. The API only enqueues a BookingJob;
+the run_booking_pipeline command claims due jobs and runs their steps one
+after another on a bounded thread pool, saving the job and the trip's
+TripStatus after every step:
+
+    availability -> book -> ticket -> done
+
+A worker holds a job for BOOKING_LEASE_SECONDS, so a job whose worker died
+is picked up again from its last saved step.
+
+Booking sells the segments, adds the passengers' names, stores a price quote
+and ends the transaction on one Sabre session, saving the PNR's record
+locator on the TripStatus; ticketing retrieves that PNR. A failure before
+the PNR is stored leaves nothing behind, since the session's work area is
+ignored, so the step can run again. Once Sabre may have stored a PNR or
+issued tickets without the job knowing, the job fails for someone to check
+and is never run again. The job is marked outcome_unknown before those
+calls and cleared once the step is saved, so a job whose worker died in
+between fails the same way when it is claimed again.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from passengers.models import Passenger
+from sabre.availability import AvailabilityDeadlineExceeded, update_trip_availability
+from sabre.exceptions import (InvalidSessionError, SabreError, SabreTransportError, SabreUnavailable,
+    SabreUnexpectedAnswer)
+from sabre.sessions import SessionPoolTimeout, get_session_pool
+from sabre.soap_requests import (add_passenger_names, book_air_segment, end_transaction,
+    issue_tickets, price_itinerary, retrieve_itinerary)
+from trips.models import Trip, TripPrice, TripStatus
+from users.models import FlytsterUser
+
+from .models import AVAILABILITY, BOOK, TICKET, DONE, FAILED, PENDING_STEPS, BookingJob
+
+
+logger = logging.getLogger(__name__)
+
+# Claims due jobs nobody holds, skipping rows another worker is claiming
+CLAIM_JOBS_SQL = '''
+    UPDATE {table} SET locked_until = %(locked_until)s
+    WHERE id IN (
+        SELECT id FROM {table}
+        WHERE step IN %(steps)s
+            AND run_after <= %(now)s
+            AND (locked_until IS NULL OR locked_until < %(now)s)
+        ORDER BY run_after
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED)
+    RETURNING id'''
+
+
+class NotReady(Exception):
+    pass
+
+
+class Retry(Exception):
+    """
+    Raised by a step to run it again after delay seconds, without counting
+    an attempt.
+    """
+
+    def __init__(self, delay):
+        super(Retry, self).__init__(delay)
+        self.delay = delay
+
+
+class StepFailed(Exception):
+    pass
+
+
+class UnknownOutcome(Exception):
+    """
+    Raised by a step when Sabre may have stored a PNR or issued tickets
+    without the step seeing it, so running it again could do so twice.
+    """
+    pass
+
+
+class NotRestartable(Exception):
+    pass
+
+
+def enqueue(trip):
+    """
+    Queues the trip for booking and returns its job. A trip already queued
+    keeps its job, and a failed one resumes from the step it failed on, or
+    from ticketing once the trip is booked. A job whose outcome is unknown
+    is never run again.
+    """
+    if not trip.status.is_passenger_ready:
+        raise NotReady('Add the trip\'s passengers before booking it.')
+
+    using = trip._state.db
+    with transaction.atomic(using=using):
+        job, created = BookingJob.objects.using(using).select_for_update().get_or_create(trip=trip)
+        if not created and job.step == FAILED:
+            if job.outcome_unknown:
+                raise NotRestartable('Sabre may have acted on the trip\'s last {0} step, so it '
+                                     'has to be checked before it is booked again.'.format(job.failed_step))
+            status = TripStatus.objects.using(using).get(pk=trip.status_id)
+            job.step = TICKET if status.is_booked else job.failed_step or AVAILABILITY
+            job.failed_step, job.attempts, job.error = '', 0, ''
+            job.run_after, job.locked_until = timezone.now(), None
+            job.save(using=using)
+    return job
+
+
+def set_status(trip, **flags):
+    TripStatus.objects.using(trip._state.db).filter(pk=trip.status_id).update(
+        updated=timezone.now(), **flags)
+
+
+def check_availability(trip):
+    if not update_trip_availability(trip):
+        raise StepFailed('The trip is no longer available.')
+    return BOOK
+
+
+def send_once(func, *args):
+    """
+    Makes a call Sabre can't take back. An answer that never arrived, can't
+    be read or lacks what the call returns raises UnknownOutcome; an error
+    Sabre answered with is raised as is, since Sabre did nothing.
+    """
+    try:
+        return func(*args)
+    except (SabreTransportError, SabreUnexpectedAnswer) as e:
+        raise UnknownOutcome(str(e))
+    except SabreError:
+        raise
+    except Exception as e:
+        raise UnknownOutcome('Could not read Sabre\'s answer: {0!r}'.format(e))
+
+
+def check_not_sent(trip, step):
+    """
+    Fails a step whose job is still marked by start_sending, since its last
+    worker stopped after a call Sabre can't take back.
+    """
+    if BookingJob.objects.using(trip._state.db).filter(trip_id=trip.pk, outcome_unknown=True).exists():
+        raise UnknownOutcome('The {0} step stopped after it may have reached Sabre.'.format(step))
+
+
+def start_sending(trip):
+    """
+    Marks the trip's job before a call Sabre can't take back, see run_step.
+    """
+    BookingJob.objects.using(trip._state.db).filter(trip_id=trip.pk).update(
+        outcome_unknown=True, updated=timezone.now())
+
+
+def book(trip):
+    using = trip._state.db
+    status = TripStatus.objects.using(using).get(pk=trip.status_id)
+    if status.record_locator:
+        # Booked by a run whose job wasn't saved
+        return TICKET
+    check_not_sent(trip, BOOK)
+
+    passengers = list(Passenger.objects.using(using).filter(trip=trip).order_by('timestamp'))
+    phone = FlytsterUser.objects.filter(pk=trip.user_id).values_list('phone', flat=True).first()
+
+    with get_session_pool().transaction() as token:
+        segments = book_air_segment(token, trip)
+        unsold = [segment for segment in segments if not segment.is_sold]
+        if unsold or not segments:
+            raise StepFailed('Sabre did not sell {0}.'.format(', '.join(
+                '{0}{1} ({2})'.format(s.carrier, s.number, s.status) for s in unsold) or 'the trip'))
+        add_passenger_names(token, passengers, phone)
+        price_itinerary(token, trip)
+        start_sending(trip)
+        record_locator = send_once(end_transaction, token)
+
+    try:
+        set_status(trip, is_booked=True, record_locator=record_locator)
+    except Exception as e:
+        raise UnknownOutcome('Sabre stored PNR {0} but it was not saved: {1!r}'.format(record_locator, e))
+    return TICKET
+
+
+def ticket(trip):
+    status = TripStatus.objects.using(trip._state.db).get(pk=trip.status_id)
+    if status.is_ticketed:
+        # Ticketed by a run whose job wasn't saved
+        return DONE
+    check_not_sent(trip, TICKET)
+
+    if not status.is_purchased:
+        try:
+            last_ticket_time = trip.price.last_ticket_time
+        except TripPrice.DoesNotExist:
+            raise StepFailed('The trip has no price to ticket it by.')
+        if last_ticket_time <= timezone.now():
+            set_status(trip, is_expired=True)
+            raise StepFailed('The trip was not purchased before its last ticketing time.')
+        raise Retry(settings.BOOKING_PURCHASE_POLL_SECONDS)
+
+    if not status.record_locator:
+        raise StepFailed('The trip has no Sabre PNR to ticket.')
+
+    with get_session_pool().transaction() as token:
+        retrieve_itinerary(token, status.record_locator)
+        start_sending(trip)
+        send_once(issue_tickets, token)
+        try:
+            end_transaction(token)
+        except Exception as e:
+            raise UnknownOutcome('Ticketed PNR {0} but could not end the transaction: {1!r}'.format(
+                status.record_locator, e))
+
+    try:
+        set_status(trip, is_ticketed=True)
+    except Exception as e:
+        raise UnknownOutcome('Ticketed PNR {0} but it was not saved: {1!r}'.format(
+            status.record_locator, e))
+    return DONE
+
+
+STEPS = {
+    AVAILABILITY: check_availability,
+    BOOK: book,
+    TICKET: ticket,
+}
+
+# Sabre errors worth another attempt. Others are answers, like a flight
+# that can't be sold, which won't change.
+RETRIED_ERRORS = (SabreUnavailable, SessionPoolTimeout, SabreTransportError,
+    InvalidSessionError, AvailabilityDeadlineExceeded)
+
+
+def is_retried(error):
+    return isinstance(error, RETRIED_ERRORS) or not isinstance(error, SabreError)
+
+
+def run_step(job):
+    """
+    Runs the job's next step and saves where it got to.
+    """
+    using = job._state.db
+    trip = Trip.objects.using(using).select_related('price').get(pk=job.trip_id)
+    step = job.step
+    now = timezone.now()
+
+    # start_sending marks the job's row, not this instance, so saving the
+    # job clears the mark unless the step's outcome is unknown
+    try:
+        job.step = STEPS[step](trip)
+        job.attempts, job.error, job.run_after = 0, '', now
+        job.outcome_unknown = False
+    except Retry as e:
+        job.run_after = now + timedelta(seconds=e.delay)
+    except StepFailed as e:
+        job.step, job.failed_step, job.error = FAILED, step, str(e)[:500]
+    except UnknownOutcome as e:
+        job.step, job.failed_step, job.outcome_unknown = FAILED, step, True
+        job.error = str(e)[:500]
+        logger.error('Booking step %s for trip %s may have gone through with Sabre.',
+                     step, trip.pk, exc_info=True)
+    except Exception as e:
+        job.attempts += 1
+        job.error = str(e)[:500] or repr(e)[:500]
+        if is_retried(e) and job.attempts < settings.BOOKING_MAX_ATTEMPTS:
+            job.run_after = now + timedelta(seconds=settings.BOOKING_RETRY_SECONDS * job.attempts)
+        else:
+            job.step, job.failed_step = FAILED, step
+        logger.warning('Booking step %s failed for trip %s.', step, trip.pk, exc_info=True)
+
+    job.save(using=using)
+
+
+def run_job(job):
+    """
+    Runs a claimed job's steps until it's done, failed or waiting, then
+    gives up its lease.
+    """
+    while job.step in PENDING_STEPS and job.run_after <= timezone.now():
+        run_step(job)
+    job.locked_until = None
+    job.save(using=job._state.db, update_fields=['locked_until', 'updated'])
+    return job
+
+
+def claim_jobs(using, limit):
+    """
+    Leases up to limit due jobs on the database to this worker.
+    """
+    using = using or router.db_for_write(BookingJob)
+    now = timezone.now()
+    params = {
+        'steps': PENDING_STEPS,
+        'now': now,
+        'locked_until': now + timedelta(seconds=settings.BOOKING_LEASE_SECONDS),
+        'limit': limit,
+    }
+    with connections[using].cursor() as cursor:
+        cursor.execute(CLAIM_JOBS_SQL.format(table=BookingJob._meta.db_table), params)
+        ids = [row[0] for row in cursor.fetchall()]
+    return list(BookingJob.objects.using(using).filter(pk__in=ids))
+
+
+def run_claimed(job):
+    """
+    Runs a claimed job on a pool thread, which needs its own connections.
+    """
+    try:
+        return run_job(job)
+    except Exception:
+        logger.exception('Booking job %s crashed on step %s.', job.pk, job.step)
+    finally:
+        connections.close_all()
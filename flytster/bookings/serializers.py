@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from trips.serializers import TripStatusSerializer
+
+from .models import BookingJob
+
+
+class BookingJobSerializer(serializers.ModelSerializer):
+    status = TripStatusSerializer(source='trip.status', read_only=True)
+
+    class Meta:
+        model = BookingJob
+        fields = ('trip', 'step', 'failed_step', 'attempts', 'error', 'run_after', 'status',
+            'timestamp', 'updated')
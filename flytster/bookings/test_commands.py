@@ -0,0 +1,33 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from sabre import availability, availability_cache, transport
+from sabre.availability_cache import AvailabilityCache
+from sabre.soap_requests import Segment
+
+
+def segment(number):
+    return Segment(carrier='NK', number=number, booking_code='Y', aircraft='320',
+        origin='ORD', destination='DEN', departure_time='2016-02-16T12:25',
+        arrival_time='2016-02-16T14:04', party_size=2)
+
+
+def test_pipeline_reports_cache_and_sabre_stats(monkeypatch):
+    cache = AvailabilityCache(ttl=60, negative_ttl=10, max_size=100)
+    metrics = transport.CallMetrics()
+    monkeypatch.setattr(availability_cache, '_cache', cache)
+    monkeypatch.setattr(availability, 'metrics', metrics)
+
+    for _ in range(4):
+        cache.get_or_check(segment('847'), lambda: True)
+    metrics.record('OTA_AirAvailLLSRQ', 0.25)
+
+    out = StringIO()
+    call_command('run_booking_pipeline', '--once', stdout=out)
+    assert 'Ran 0 booking jobs.' in out.getvalue()
+    assert 'Availability cache: 75% hit rate, 3 hits' in out.getvalue()
+    assert 'Sabre OTA_AirAvailLLSRQ: 1 calls, p95 250 ms, 1 ok.' in out.getvalue()
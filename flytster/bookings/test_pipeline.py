@@ -0,0 +1,447 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+import os
+from datetime import timedelta
+
+from django.utils import timezone
+
+from bookings import pipeline
+from bookings.models import AVAILABILITY, BOOK, TICKET, DONE, FAILED, BookingJob
+from passengers.models import Passenger
+from sabre import soap_requests
+from sabre.exceptions import SabreError, SabreTimeout, SabreUnavailable
+from sabre.sessions import SessionPool
+from trips.models import Trip, TripPrice, TripStatus
+from users.models import FlytsterUser
+
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sabre', 'samples')
+
+# An answer for actions whose content the pipeline doesn't read
+COMPLETE = b'''<?xml version="1.0" encoding="UTF-8"?>
+<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/"><soap-env:Body>
+<Response xmlns="http://webservices.sabre.com/sabreXML/2011/10" xmlns:stl="http://services.sabre.com/STL/v01">
+<stl:ApplicationResults status="Complete"/></Response></soap-env:Body></soap-env:Envelope>'''
+
+TRIP_DATA = {
+    "passenger_data": {"adult_count": 1},
+    "trip_data": {"slice": [
+        {"segment": [{
+            "carrier": "NK", "number": "847", "booking_code": "Y", "leg": [{
+                "aircraft": "320", "arrival_time": "2016-02-16T14:04-07:00",
+                "departure_time": "2016-02-16T12:25-06:00", "origin": "ORD", "destination": "DEN"}]}]},
+        {"segment": [{
+            "carrier": "NK", "number": "630", "booking_code": "Y", "leg": [{
+                "aircraft": "320", "arrival_time": "2016-02-17T17:06-06:00",
+                "departure_time": "2016-02-17T13:35-07:00", "origin": "DEN", "destination": "ORD"}]}]}
+    ]}
+}
+
+
+def sample(name):
+    with open(os.path.join(SAMPLES_DIR, name), 'rb') as sample_file:
+        return sample_file.read()
+
+
+class PipelineSetupFixture:
+    def __init__(self):
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create(is_passenger_ready=True)
+        )
+        self.steps = []
+
+    def step(self, name, result):
+        """
+        Stands in for a step, recording the call and then returning or
+        raising result.
+        """
+        def run(trip):
+            self.steps.append(name)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return run
+
+
+@pytest.fixture(scope="function")
+def setup(monkeypatch, settings):
+    settings.BOOKING_MAX_ATTEMPTS = 2
+    setup = PipelineSetupFixture()
+    steps = {
+        AVAILABILITY: setup.step(AVAILABILITY, BOOK),
+        BOOK: setup.step(BOOK, TICKET),
+        TICKET: setup.step(TICKET, DONE),
+    }
+    monkeypatch.setattr(pipeline, 'STEPS', steps)
+    return setup
+
+
+def test_enqueue_needs_passengers(setup):
+    TripStatus.objects.filter(pk=setup.trip.status_id).update(is_passenger_ready=False)
+    trip = Trip.objects.get(pk=setup.trip.pk)
+
+    with pytest.raises(pipeline.NotReady):
+        pipeline.enqueue(trip)
+    assert not BookingJob.objects.exists()
+
+
+def test_enqueue_keeps_the_queued_job(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(step=TICKET)
+
+    assert pipeline.enqueue(setup.trip).step == TICKET
+    assert BookingJob.objects.count() == 1
+
+
+def test_enqueue_resumes_a_failed_job_from_its_failed_step(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(step=FAILED, failed_step=BOOK, attempts=2, error='down')
+
+    job = pipeline.enqueue(setup.trip)
+    assert (job.step, job.failed_step, job.attempts, job.error) == (BOOK, '', 0, '')
+
+
+def test_enqueue_resumes_a_booked_trip_at_ticketing(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(step=FAILED, failed_step=BOOK)
+    TripStatus.objects.filter(pk=setup.trip.status_id).update(is_booked=True)
+
+    assert pipeline.enqueue(setup.trip).step == TICKET
+
+
+def test_enqueue_refuses_a_job_sabre_may_have_acted_on(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(step=FAILED, failed_step=BOOK, outcome_unknown=True)
+
+    with pytest.raises(pipeline.NotRestartable):
+        pipeline.enqueue(setup.trip)
+    assert BookingJob.objects.get(pk=job.pk).step == FAILED
+
+
+def test_job_runs_every_step(setup):
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+
+    assert setup.steps == [AVAILABILITY, BOOK, TICKET]
+    job = BookingJob.objects.get(pk=job.pk)
+    assert job.step == DONE and job.locked_until is None
+
+
+def test_job_resumes_from_its_saved_step(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(step=TICKET)
+
+    pipeline.run_job(BookingJob.objects.get(pk=job.pk))
+    assert setup.steps == [TICKET]
+
+
+def test_retry_waits_without_counting_an_attempt(setup):
+    pipeline.STEPS[TICKET] = setup.step(TICKET, pipeline.Retry(60))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert (job.step, job.attempts) == (TICKET, 0)
+    assert job.run_after > timezone.now() + timedelta(seconds=50)
+
+
+def test_unsent_bookings_are_retried_until_attempts_run_out(setup, settings):
+    settings.BOOKING_RETRY_SECONDS = 0
+    pipeline.STEPS[BOOK] = setup.step(BOOK, SabreUnavailable('circuit open'))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert setup.steps == [AVAILABILITY, BOOK, BOOK]
+    assert (job.step, job.attempts, job.error) == (FAILED, 2, 'circuit open')
+
+
+def test_unknown_outcomes_are_not_retried(setup):
+    pipeline.STEPS[BOOK] = setup.step(BOOK, pipeline.UnknownOutcome('timed out'))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert setup.steps == [AVAILABILITY, BOOK]
+    assert (job.step, job.failed_step, job.outcome_unknown) == (FAILED, BOOK, True)
+
+
+def test_other_errors_count_as_attempts(setup, settings):
+    settings.BOOKING_RETRY_SECONDS = 0
+    pipeline.STEPS[TICKET] = setup.step(TICKET, ValueError('bad answer'))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert setup.steps == [AVAILABILITY, BOOK, TICKET, TICKET]
+    assert (job.step, job.failed_step, job.attempts, job.error) == (FAILED, TICKET, 2, 'bad answer')
+
+
+def test_availability_timeouts_are_retried_later(setup, settings):
+    settings.BOOKING_RETRY_SECONDS = 30
+    pipeline.STEPS[AVAILABILITY] = setup.step(AVAILABILITY, SabreTimeout('timed out'))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert (job.step, job.attempts) == (AVAILABILITY, 1)
+    assert job.run_after > timezone.now()
+
+
+def test_step_failures_end_the_job(setup):
+    pipeline.STEPS[AVAILABILITY] = setup.step(
+        AVAILABILITY, pipeline.StepFailed('The trip is no longer available.'))
+
+    job = pipeline.run_job(pipeline.enqueue(setup.trip))
+    assert (job.step, job.failed_step, job.error) == (
+        FAILED, AVAILABILITY, 'The trip is no longer available.')
+
+
+def test_claimed_jobs_are_leased(setup):
+    job = pipeline.enqueue(setup.trip)
+
+    assert [claimed.pk for claimed in pipeline.claim_jobs(None, 10)] == [job.pk]
+    assert BookingJob.objects.get(pk=job.pk).locked_until > timezone.now()
+    assert pipeline.claim_jobs(None, 10) == []
+
+
+def test_jobs_waiting_to_retry_are_not_claimed(setup):
+    job = pipeline.enqueue(setup.trip)
+    BookingJob.objects.filter(pk=job.pk).update(run_after=timezone.now() + timedelta(minutes=1))
+
+    assert pipeline.claim_jobs(None, 10) == []
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeSabre:
+    """
+    Stands in for sabre.transport.post_soap, answering each action with a
+    recorded sample, or raising the exception set for it.
+    """
+
+    def __init__(self):
+        sold = sample('OTA_AirBookRS.xml').replace(b'Status="UC"', b'Status="HK"')
+        self.answers = {
+            'OTA_AirBookLLSRQ': sold,
+            'EndTransactionLLSRQ': sample('EndTransactionRS.xml'),
+        }
+        self.calls = []
+
+    @property
+    def actions(self):
+        return [action for action, envelope in self.calls]
+
+    def envelope(self, action):
+        return [envelope for called, envelope in self.calls if called == action][-1]
+
+    def __call__(self, action, soap_req):
+        self.calls.append((action, soap_req))
+        answer = self.answers.get(action, COMPLETE)
+        if isinstance(answer, BaseException):
+            raise answer
+        return Response(answer)
+
+
+class StepSetupFixture:
+    def __init__(self):
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1',
+            phone='5045550100'
+        )
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data=TRIP_DATA,
+            status=TripStatus.objects.create(is_passenger_ready=True)
+        )
+        self.price = TripPrice.objects.create(
+            trip=self.trip,
+            base=200,
+            tax=30,
+            total=230,
+            last_ticket_time=timezone.now() + timedelta(days=1),
+            fare_calculation='CHI NK DEN Q ORD115.00NUC230.00END'
+        )
+        Passenger.objects.create(
+            user=self.user,
+            trip=self.trip,
+            first_name='Drew',
+            last_name='Brees',
+            gender='M',
+            birthdate='1979-01-15'
+        )
+        self.job = pipeline.enqueue(self.trip)
+
+    @property
+    def status(self):
+        return TripStatus.objects.get(pk=self.trip.status_id)
+
+    def load_trip(self):
+        return Trip.objects.select_related('price').get(pk=self.trip.pk)
+
+    def run(self, step, **status):
+        TripStatus.objects.filter(pk=self.trip.status_id).update(**status)
+        BookingJob.objects.filter(pk=self.job.pk).update(step=step)
+        job = BookingJob.objects.get(pk=self.job.pk)
+        pipeline.run_step(job)
+        return job
+
+
+@pytest.yield_fixture(scope="function")
+def sabre(monkeypatch):
+    sabre = FakeSabre()
+    monkeypatch.setattr(soap_requests, 'post_soap', sabre)
+
+    # A real pool, so its sessions are cleared through IgnoreTransaction
+    pool = SessionPool(max_size=1, refresh_after=600, timeout=0.1,
+                       start=lambda: 'token', close=lambda token: None, ping=lambda token: None)
+    monkeypatch.setattr(pipeline, 'get_session_pool', lambda: pool)
+    yield sabre
+    pool.closeall()
+
+
+@pytest.fixture(scope="function")
+def steps():
+    return StepSetupFixture()
+
+
+def test_book_stores_a_priced_pnr_on_one_session(steps, sabre):
+    assert pipeline.book(steps.load_trip()) == TICKET
+
+    assert sabre.actions == ['OTA_AirBookLLSRQ', 'TravelItineraryAddInfoLLSRQ', 'OTA_AirPriceLLSRQ',
+                             'EndTransactionLLSRQ', 'IgnoreTransactionLLSRQ']
+    assert all('<ns6:BinarySecurityToken>token<' in envelope for action, envelope in sabre.calls)
+    assert '<Surname>Brees</Surname>' in sabre.envelope('TravelItineraryAddInfoLLSRQ')
+    assert 'Phone="5045550100"' in sabre.envelope('TravelItineraryAddInfoLLSRQ')
+    assert '<PassengerType Code="ADT" Quantity="1"/>' in sabre.envelope('OTA_AirPriceLLSRQ')
+    assert (steps.status.is_booked, steps.status.record_locator) == (True, 'QWXJTB')
+
+
+def test_unsold_segments_fail_the_booking_and_are_ignored(steps, sabre):
+    sabre.answers['OTA_AirBookLLSRQ'] = sample('OTA_AirBookRS.xml')
+
+    job = steps.run(BOOK)
+    assert (job.step, job.error) == (FAILED, 'Sabre did not sell NK0630 (UC).')
+    assert sabre.actions == ['OTA_AirBookLLSRQ', 'IgnoreTransactionLLSRQ']
+    assert not steps.status.is_booked
+
+
+def test_booking_errors_before_end_transaction_are_retried(steps, sabre):
+    sabre.answers['OTA_AirPriceLLSRQ'] = SabreTimeout('Sabre OTA_AirPriceLLSRQ timed out')
+
+    job = steps.run(BOOK)
+    assert (job.step, job.attempts, job.outcome_unknown) == (BOOK, 1, False)
+    assert sabre.actions[-1] == 'IgnoreTransactionLLSRQ'
+    assert not steps.status.is_booked
+
+
+def test_end_transaction_timeouts_are_never_booked_again(steps, sabre):
+    sabre.answers['EndTransactionLLSRQ'] = SabreTimeout('Sabre EndTransactionLLSRQ timed out')
+
+    job = steps.run(BOOK)
+    assert (job.step, job.failed_step, job.outcome_unknown) == (FAILED, BOOK, True)
+    assert not steps.status.is_booked
+    with pytest.raises(pipeline.NotRestartable):
+        pipeline.enqueue(steps.trip)
+
+
+def test_end_transaction_without_a_record_locator_is_never_booked_again(steps, sabre):
+    sabre.answers['EndTransactionLLSRQ'] = COMPLETE
+
+    job = steps.run(BOOK)
+    assert (job.step, job.failed_step, job.outcome_unknown) == (FAILED, BOOK, True)
+    assert job.error == 'Sabre did not return a record locator.'
+
+
+def test_booking_errors_sabre_answered_clear_the_mark(steps, sabre):
+    sabre.answers['EndTransactionLLSRQ'] = SabreError('NEED PHONE FIELD')
+
+    job = steps.run(BOOK)
+    assert (job.step, job.attempts) == (FAILED, 1)
+    assert not BookingJob.objects.get(pk=job.pk).outcome_unknown
+
+
+def test_a_booking_whose_worker_died_is_not_sent_again(steps, sabre):
+    sabre.answers['EndTransactionLLSRQ'] = SystemExit()
+
+    with pytest.raises(SystemExit):
+        steps.run(BOOK)
+    assert BookingJob.objects.get(pk=steps.job.pk).outcome_unknown
+
+    job = BookingJob.objects.get(pk=steps.job.pk)
+    pipeline.run_step(job)
+    assert (job.step, job.failed_step, job.outcome_unknown) == (FAILED, BOOK, True)
+    assert sabre.actions.count('OTA_AirBookLLSRQ') == 1
+
+
+def test_a_saved_booking_is_not_sent_again(steps, sabre):
+    job = steps.run(BOOK, is_booked=True, record_locator='QWXJTB')
+
+    assert job.step == TICKET
+    assert sabre.actions == []
+
+
+def test_unreadable_bookings_count_as_attempts(steps, sabre):
+    sabre.answers['OTA_AirBookLLSRQ'] = b'<OTA_AirBookRS'
+
+    job = steps.run(BOOK)
+    assert (job.step, job.attempts) == (BOOK, 1)
+    assert sabre.actions == ['OTA_AirBookLLSRQ', 'IgnoreTransactionLLSRQ']
+
+
+def test_ticket_waits_for_the_purchase(steps, sabre):
+    job = steps.run(TICKET, is_booked=True, record_locator='QWXJTB')
+
+    assert job.step == TICKET and job.run_after > timezone.now()
+    assert sabre.actions == []
+
+
+def test_ticket_expires_trips_not_purchased_in_time(steps, sabre):
+    TripPrice.objects.filter(pk=steps.price.pk).update(last_ticket_time=timezone.now())
+
+    job = steps.run(TICKET, is_booked=True, record_locator='QWXJTB')
+    assert job.step == FAILED
+    assert steps.status.is_expired and not steps.status.is_ticketed
+    assert sabre.actions == []
+
+
+def test_ticket_retrieves_the_stored_pnr(steps, sabre):
+    job = steps.run(TICKET, is_booked=True, is_purchased=True, record_locator='QWXJTB')
+
+    assert job.step == DONE
+    assert sabre.actions == ['TravelItineraryReadLLSRQ', 'AirTicketLLSRQ',
+                             'EndTransactionLLSRQ', 'IgnoreTransactionLLSRQ']
+    assert '<UniqueID ID="QWXJTB"/>' in sabre.envelope('TravelItineraryReadLLSRQ')
+    assert steps.status.is_ticketed
+
+
+def test_a_ticketing_whose_worker_died_is_not_sent_again(steps, sabre):
+    sabre.answers['AirTicketLLSRQ'] = SystemExit()
+
+    with pytest.raises(SystemExit):
+        steps.run(TICKET, is_booked=True, is_purchased=True, record_locator='QWXJTB')
+
+    job = BookingJob.objects.get(pk=steps.job.pk)
+    pipeline.run_step(job)
+    assert (job.step, job.failed_step, job.outcome_unknown) == (FAILED, TICKET, True)
+    assert sabre.actions.count('AirTicketLLSRQ') == 1
+
+
+def test_a_saved_ticketing_is_not_sent_again(steps, sabre):
+    job = steps.run(TICKET, is_booked=True, is_purchased=True, is_ticketed=True,
+                    record_locator='QWXJTB')
+
+    assert job.step == DONE and not job.outcome_unknown
+    assert sabre.actions == []
+
+
+def test_ticket_needs_a_price(steps, sabre):
+    TripPrice.objects.filter(pk=steps.price.pk).delete()
+
+    job = steps.run(TICKET, is_booked=True, record_locator='QWXJTB')
+    assert (job.step, job.failed_step) == (FAILED, TICKET)
+    assert sabre.actions == []
@@ -0,0 +1,91 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+from django.core.urlresolvers import reverse
+from django.test import Client
+from rest_framework import status
+
+from users.models import FlytsterUser
+from bookings.models import AVAILABILITY, BOOK, FAILED, BookingJob
+from trips.models import Trip, TripStatus
+
+
+class BookingSetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create(is_passenger_ready=True)
+        )
+
+        self.url_booking = reverse('trip_booking', args=[self.trip.id])
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return BookingSetupFixture()
+
+
+def test_post_queues_the_trip(setup):
+    response = setup.client.post(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data['step'] == AVAILABILITY
+    assert response.data['status']['is_booked'] is False
+    assert BookingJob.objects.filter(trip=setup.trip).count() == 1
+
+    response = setup.client.post(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert BookingJob.objects.filter(trip=setup.trip).count() == 1
+
+
+def test_post_needs_passengers(setup):
+    TripStatus.objects.filter(pk=setup.trip.status_id).update(is_passenger_ready=False)
+
+    response = setup.client.post(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not BookingJob.objects.exists()
+
+
+def test_post_refuses_a_booking_sabre_may_have_made(setup):
+    BookingJob.objects.create(trip=setup.trip, step=FAILED, failed_step=BOOK, outcome_unknown=True)
+
+    response = setup.client.post(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert BookingJob.objects.get(trip=setup.trip).step == FAILED
+
+
+def test_get_reports_progress(setup):
+    response = setup.client.get(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    BookingJob.objects.create(trip=setup.trip, step='ticket')
+    response = setup.client.get(setup.url_booking, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['step'] == 'ticket'
+
+
+def test_other_users_cannot_book_the_trip(setup):
+    other = FlytsterUser.objects.create_user(
+        first_name='Other',
+        last_name='User',
+        email='other@gmail.com',
+        password='Password1'
+    )
+    other.verify_email_token(other.email_token.token)
+    auth = {'HTTP_AUTHORIZATION': other.auth_tokens.latest('timestamp').token}
+
+    response = setup.client.post(setup.url_booking, **auth)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert not BookingJob.objects.exists()
@@ -0,0 +1,47 @@
+from rest_framework import generics, status
+from rest_framework.response import Response
+
+from trips.models import Trip
+from trips.permissions import IsOwnerOrAdmin
+
+from .models import BookingJob
+from .pipeline import NotReady, NotRestartable, enqueue
+from .serializers import BookingJobSerializer
+
+
+class TripBookingView(generics.GenericAPIView):
+    """
+    POST: Queue the trip for booking. The run_booking_pipeline command does
+          the booking, so this returns at once with the job. Posting again
+          returns the same job, or resumes a failed one from where it
+          stopped, unless Sabre may have acted on it.
+    GET:  Get how far the trip's booking has got.
+    """
+
+    model = Trip
+    serializer_class = BookingJobSerializer
+    permission_classes = (IsOwnerOrAdmin,)
+    queryset = Trip.objects.select_related('status')
+
+    def get(self, request, pk):
+        trip = self.get_object()
+        try:
+            job = BookingJob.objects.using(trip._state.db).get(trip=trip)
+        except BookingJob.DoesNotExist:
+            return Response({'detail': 'The trip has not been queued for booking.'},
+                status=status.HTTP_404_NOT_FOUND)
+
+        job.trip = trip
+        return Response(self.get_serializer(job).data)
+
+    def post(self, request, pk):
+        trip = self.get_object()
+        try:
+            job = enqueue(trip)
+        except NotReady as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except NotRestartable as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+
+        job.trip = trip
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,36 @@
+import pytest
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+
+def stand_in_aliases():
+    return [alias for alias, database in settings.DATABASES.items()
+            if database.get('TEST', {}).get('MIRROR') == 'default']
+
+
+@pytest.yield_fixture(autouse=True)
+def stand_in_connections():
+    """
+    Tests run inside a transaction on the default connection, which a real
+    second connection couldn't see into, so the replica and shard aliases
+    standing in for other databases share it.
+    """
+    aliases = stand_in_aliases()
+    for alias in aliases:
+        connections[alias] = connections['default']
+    yield
+    for alias in aliases:
+        del connections[alias]
+
+
+@pytest.yield_fixture(scope="function")
+def second_shard():
+    """
+    shard2 has a test database of its own, unlike the aliases above, so rows
+    can move to it with their ids. Its writes commit outside the test
+    transaction and are flushed afterwards.
+    """
+    yield 'shard2'
+    call_command('flush', database='shard2', interactive=False, verbosity=0)
@@ -0,0 +1,37 @@
+from .settings import *
+
+
+# Production profile for the token-authenticated API. Session, CSRF, auth and
+# messages middleware only run for the admin, under ADMIN_URL_PREFIX.
+MIDDLEWARE_CLASSES = [
+    'flytster.middleware.ReplicaPinningMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'flytster.middleware.AdminOnlyMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Keep compiled templates instead of reading and parsing them on every email
+TEMPLATES = [dict(TEMPLATES[0], APP_DIRS=False, OPTIONS=dict(TEMPLATES[0]['OPTIONS'], loaders=[
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]))]
+
+REST_FRAMEWORK = dict(REST_FRAMEWORK, **{
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ),
+})
+
+# Each worker process keeps its own pool of Postgres connections. Django still
+# closes the connection at the end of every request, which now just returns it.
+# Copies, so importing this profile leaves flytster.settings.DATABASES alone.
+DATABASES = dict((alias, dict(database, ENGINE='flytster.postgresql_pool', POOL={
+    'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+    'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'PRE_PING': True,
+})) for alias, database in DATABASES.items())
@@ -0,0 +1,25 @@
+"""
+Makes psycopg2 cooperative under gevent. Without a wait callback every query
+blocks the whole worker instead of just its greenlet.
+"""
+import psycopg2
+from psycopg2 import extensions
+
+
+def gevent_wait_callback(conn, timeout=None):
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError('Bad result from poll: {0!r}'.format(state))
+
+
+def make_psycopg_green():
+    extensions.set_wait_callback(gevent_wait_callback)
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import set_pinned, set_shard
+
+
+class AdminOnlyMiddleware(object):
+    """
+    Runs ADMIN_MIDDLEWARE_CLASSES only for requests under ADMIN_URL_PREFIX, so
+    API requests skip session, CSRF, auth and messages handling entirely.
+    """
+
+    def __init__(self):
+        self.prefix = settings.ADMIN_URL_PREFIX
+        self.middleware = [import_string(path)() for path in settings.ADMIN_MIDDLEWARE_CLASSES]
+
+    def is_admin(self, request):
+        return request.path.startswith(self.prefix)
+
+    def process_request(self, request):
+        if not self.is_admin(request):
+            return None
+        for middleware in self.middleware:
+            if hasattr(middleware, 'process_request'):
+                response = middleware.process_request(request)
+                if response is not None:
+                    return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.is_admin(request):
+            return None
+        for middleware in self.middleware:
+            if hasattr(middleware, 'process_view'):
+                response = middleware.process_view(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+
+    def process_exception(self, request, exception):
+        if not self.is_admin(request):
+            return None
+        for middleware in reversed(self.middleware):
+            if hasattr(middleware, 'process_exception'):
+                response = middleware.process_exception(request, exception)
+                if response is not None:
+                    return response
+
+    def process_response(self, request, response):
+        if not self.is_admin(request):
+            return response
+        for middleware in reversed(self.middleware):
+            if hasattr(middleware, 'process_response'):
+                response = middleware.process_response(request, response)
+        return response
+
+
+class ReplicaPinningMiddleware(object):
+    """
+    Pins reads to the primary for unsafe requests and, for REPLICA_PIN_SECONDS
+    after a successful one, for the user's next requests, so a GET right after
+    a write doesn't miss it on a lagging replica. The pin is kept on the user,
+    which TokenAuthentication checks, so it holds for clients that drop
+    cookies. Also clears the shard left selected by the thread's previous
+    request.
+    """
+
+    def process_request(self, request):
+        set_shard(None)
+        set_pinned(request.method not in SAFE_METHODS)
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400 and
+                user is not None and user.is_authenticated()):
+            user.pin_to_primary()
+        set_pinned(False)
+        set_shard(None)
+        return response
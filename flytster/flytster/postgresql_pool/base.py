@@ -0,0 +1,74 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool instead
+of opening one per request. Configure it with a POOL dict in the database
+settings: MIN_SIZE, MAX_SIZE, MAX_LIFETIME, TIMEOUT and PRE_PING.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+
+from .pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, options):
+    """
+    Returns the pool for key in this process. A pool inherited across a fork
+    is replaced, since its sockets belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+                timeout=options.get('TIMEOUT', 10),
+                pre_ping=options.get('PRE_PING', True))
+        return pool
+
+
+def pool_stats():
+    """
+    Checkout and size metrics for every pool in this process.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return dict((key[0], pool.stats()) for key, pool in pools.items())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    pool = None
+
+    def get_pool(self, conn_params):
+        key = (self.alias, tuple(sorted((k, str(v)) for k, v in conn_params.items())))
+        pool = get_pool(key, lambda: base.Database.connect(**conn_params),
+                        self.settings_dict.get('POOL', {}))
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.getconn()
+
+        # Same isolation level handling as the stock backend
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                return self.pool.putconn(self.connection)
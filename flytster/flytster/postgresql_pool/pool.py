@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe pool of psycopg2 connections for one process.
+
+    Connections are checked for age and, with pre_ping, liveness before they
+    are handed out, and are rolled back when returned. Under gevent the
+    threading primitives are monkey-patched, so greenlets share it the same way.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, max_lifetime=1800,
+                 timeout=10, pre_ping=True):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.pid = os.getpid()
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._opened = {}
+        self._size = 0
+        self._filled = False
+        self._stats = {
+            'checkouts': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'timeouts': 0,
+            'opened': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+        }
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        stats['avg_wait_seconds'] = (
+            stats['wait_seconds'] / stats['checkouts'] if stats['checkouts'] else 0.0)
+        return stats
+
+    def fill(self):
+        """
+        Opens connections until min_size are idle or the pool is full.
+        """
+        self._filled = True
+        while True:
+            with self._condition:
+                if len(self._idle) >= self.min_size or self._size >= self.max_size:
+                    return
+                self._size += 1
+            self.putconn(self._open())
+
+    def getconn(self):
+        if not self._filled:
+            self.fill()
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            connection = self._acquire(deadline)
+            if connection is None:
+                connection = self._open()
+                break
+            if self._is_usable(connection):
+                break
+            self._discard(connection)
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+        return connection
+
+    def putconn(self, connection):
+        if connection.closed:
+            self._discard(connection)
+            return
+
+        if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+                return
+
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def closeall(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self._discard(connection)
+
+    def _acquire(self, deadline):
+        """
+        Returns an idle connection, or None once a slot is reserved for a new one.
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    # Most recently used first, so extra connections age out
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    logger.warning('Timed out after %ss waiting for a database connection.', self.timeout)
+                    raise PoolTimeout(
+                        'No database connection was free within {0}s.'.format(self.timeout))
+                self._condition.wait(remaining)
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._opened[connection] = time.monotonic()
+            self._stats['opened'] += 1
+        return connection
+
+    def _is_usable(self, connection):
+        if connection.closed:
+            return False
+
+        if time.monotonic() - self._opened.get(connection, 0) > self.max_lifetime:
+            with self._condition:
+                self._stats['recycled'] += 1
+            return False
+
+        if self.pre_ping:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                if not connection.autocommit:
+                    connection.rollback()
+            except Exception:
+                with self._condition:
+                    self._stats['ping_failures'] += 1
+                return False
+
+        return True
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+        with self._condition:
+            self._opened.pop(connection, None)
+            self._size -= 1
+            self._condition.notify()
@@ -0,0 +1,163 @@
+import pytest
+
+from django.db import connections
+from psycopg2 import extensions
+
+from flytster.postgresql_pool import base
+from flytster.postgresql_pool.base import DatabaseWrapper, get_pool
+from flytster.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.connection.dead:
+            raise extensions.QueryCanceledError('server closed the connection')
+        self.connection.status = extensions.TRANSACTION_STATUS_INTRANS
+
+
+class Connection:
+    """
+    Stands in for a psycopg2 connection, tracking what the pool does to it.
+    """
+
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.autocommit = False
+        self.isolation_level = extensions.ISOLATION_LEVEL_READ_COMMITTED
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def cursor(self):
+        return Cursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise extensions.QueryCanceledError('rollback failed')
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Connector:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        connection = Connection()
+        self.opened.append(connection)
+        return connection
+
+
+@pytest.fixture(scope="function")
+def connect():
+    return Connector()
+
+
+def test_checkout_times_out_when_the_pool_is_full(connect):
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_returned_connections_are_reused(connect):
+    pool = ConnectionPool(connect, max_size=1)
+    connection = pool.getconn()
+    pool.putconn(connection)
+
+    assert pool.getconn() is connection
+    assert len(connect.opened) == 1
+
+
+def test_old_connections_are_recycled(connect):
+    pool = ConnectionPool(connect, max_lifetime=60)
+    connection = pool.getconn()
+    pool.putconn(connection)
+    pool._opened[connection] -= 61
+
+    assert pool.getconn() is not connection
+    assert connection.closed
+    assert pool.stats()['recycled'] == 1 and pool.stats()['size'] == 1
+
+
+def test_pre_ping_discards_dead_connections(connect):
+    pool = ConnectionPool(connect)
+    connection = pool.getconn()
+    pool.putconn(connection)
+    connection.dead = True
+
+    assert pool.getconn() is not connection
+    assert connection.closed
+    assert pool.stats()['ping_failures'] == 1 and pool.stats()['size'] == 1
+
+
+def test_pre_ping_leaves_no_transaction_open(connect):
+    pool = ConnectionPool(connect)
+    pool.putconn(pool.getconn())
+
+    connection = pool.getconn()
+    assert connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_returned_connections_are_rolled_back(connect):
+    pool = ConnectionPool(connect)
+    connection = pool.getconn()
+    connection.status = extensions.TRANSACTION_STATUS_INERROR
+
+    pool.putconn(connection)
+    assert connection.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_connections_that_fail_to_roll_back_are_discarded(connect):
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    connection = pool.getconn()
+    connection.status = extensions.TRANSACTION_STATUS_INTRANS
+    connection.fail_rollback = True
+
+    pool.putconn(connection)
+    assert connection.closed
+    assert pool.getconn() is not connection
+
+
+def test_pools_are_rebuilt_after_a_fork(connect, monkeypatch):
+    monkeypatch.setattr(base, '_pools', {})
+    pool = get_pool(('default', ()), connect, {})
+    assert get_pool(('default', ()), connect, {}) is pool
+
+    # As if this process were a child forked after the pool was built
+    pool.pid = -1
+    assert get_pool(('default', ()), connect, {}) is not pool
+
+
+def test_closing_the_wrapper_returns_its_connection(connect):
+    pool = ConnectionPool(connect)
+    wrapper = DatabaseWrapper(dict(connections['default'].settings_dict), 'pooled')
+    wrapper.get_pool = lambda conn_params: pool
+
+    wrapper.connection = wrapper.get_new_connection({})
+    connection = wrapper.connection
+    connection.status = extensions.TRANSACTION_STATUS_INTRANS
+    wrapper.close()
+
+    assert wrapper.connection is None
+    assert not connection.closed and connection.rollbacks == 1
+    assert pool.getconn() is connection
@@ -0,0 +1,180 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+_state = threading.local()
+
+# Everything owned by a single user. These live on the user's shard when
+# DATABASE_SHARDS is set. Users and their auth tokens stay on default, which
+# is how a request finds its user's shard.
+SHARDED_MODELS = frozenset((
+    'trips.tripstatus', 'trips.trip', 'trips.tripprice',
+    'trips.tripexpectedpassengers', 'trips.flight', 'trips.leg',
+    'passengers.passenger', 'credits.credit', 'sync.tombstone',
+    'idempotency.idempotencykey', 'bookings.bookingjob',
+))
+
+
+class NoShardSelected(Exception):
+    pass
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def set_pinned(pinned):
+    _state.pinned = pinned
+
+
+@contextmanager
+def use_primary():
+    """
+    Sends reads in the block, or the decorated function, to the primary.
+    """
+    previous = is_pinned()
+    set_pinned(True)
+    try:
+        yield
+    finally:
+        set_pinned(previous)
+
+
+def get_shard():
+    return getattr(_state, 'shard', None)
+
+
+def set_shard(shard):
+    _state.shard = shard
+
+
+@contextmanager
+def use_shard(shard):
+    """
+    Sends queries for sharded models in the block to the given shard.
+    """
+    previous = get_shard()
+    set_shard(shard)
+    try:
+        yield
+    finally:
+        set_shard(previous)
+
+
+def user_database():
+    """
+    The primary database holding the current user's rows.
+    """
+    return get_shard() or 'default'
+
+
+def shard_aliases():
+    """
+    Every shard, for work that spans users. Just None, which leaves the
+    choice to the routers, when sharding is off.
+    """
+    return settings.DATABASE_SHARDS or [None]
+
+
+class AcrossShards(object):
+    """
+    A queryset read from every shard in turn, as one sequence that paginators
+    can count and slice. Rows come shard by shard, each in the queryset's
+    own order.
+    """
+
+    def __init__(self, queryset):
+        self.querysets = [queryset.using(using) for using in shard_aliases()]
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self):
+        return sum(self.counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('AcrossShards only supports slices without a step.')
+
+        start, stop = index.start or 0, index.stop
+        rows = []
+        for queryset, count in zip(self.querysets, self.counts()):
+            if stop is not None and stop <= 0:
+                break
+            end = count if stop is None else min(stop, count)
+            if start < end:
+                rows.extend(queryset[start:end])
+            start = max(start - count, 0)
+            if stop is not None:
+                stop -= count
+        return rows
+
+
+def assign_shard(user_id):
+    """
+    Picks the shard for a new user. The choice is stored on the user, so
+    changing DATABASE_SHARDS later doesn't move existing users.
+    """
+    if not settings.DATABASE_SHARDS:
+        return ''
+    return settings.DATABASE_SHARDS[user_id % len(settings.DATABASE_SHARDS)]
+
+
+class ShardRouter(object):
+    """
+    Sends sharded models to the shard selected with use_shard or set_shard,
+    which TokenAuthentication does for the authenticated user. Does nothing
+    unless DATABASE_SHARDS is set.
+    """
+
+    def db_for_shard(self, model, hints):
+        if not settings.DATABASE_SHARDS or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+
+        # Related lookups from a row that already came from a shard
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in settings.DATABASE_SHARDS:
+            return instance._state.db
+
+        shard = get_shard()
+        if shard is None:
+            raise NoShardSelected(
+                'No shard is selected for {0}.'.format(model._meta.label))
+        return shard
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_shard(model, hints)
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads to a random alias in DATABASE_REPLICAS and writes to default.
+    Reads go to default too while pinned, see ReplicaPinningMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_pinned() or not settings.DATABASE_REPLICAS:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
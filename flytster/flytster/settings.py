@@ -38,8 +38,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'authentication',
+    'bookings',
     'credits',
+    'idempotency',
     'passengers',
+    'quotas',
+    'sync',
     'trips',
     'users',
 ]
@@ -59,6 +63,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE_CLASSES = [
+    'flytster.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +74,16 @@ MIDDLEWARE_CLASSES = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Used by flytster.middleware.AdminOnlyMiddleware in api_settings
+ADMIN_URL_PREFIX = '/admin/'
+ADMIN_MIDDLEWARE_CLASSES = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
 ROOT_URLCONF = 'flytster.urls'
 
 TEMPLATES = [
@@ -97,6 +112,29 @@ DATABASES = {
     'default': dj_database_url.config(default=DB_URL)
 }
 
+# Comma separated read replica URLs, added as replica1, replica2, ...
+DB_REPLICA_URLS = [url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url]
+
+DATABASE_REPLICAS = []
+for index, url in enumerate(DB_REPLICA_URLS, 1):
+    DATABASES['replica{0}'.format(index)] = dj_database_url.parse(url)
+    DATABASE_REPLICAS.append('replica{0}'.format(index))
+
+# Comma separated shard URLs, added as shard1, shard2, ... Users are spread
+# over them and their trips, passengers and credits live on their shard.
+DB_SHARD_URLS = [url for url in os.getenv('DATABASE_SHARD_URLS', '').split(',') if url]
+
+DATABASE_SHARDS = []
+for index, url in enumerate(DB_SHARD_URLS, 1):
+    DATABASES['shard{0}'.format(index)] = dj_database_url.parse(url)
+    DATABASE_SHARDS.append('shard{0}'.format(index))
+
+# Shard id sequences count up in steps of this, offset by the shard number, so
+# rows keep their ids when a user moves between shards. Caps the shard count.
+DATABASE_SHARD_ID_STRIDE = 64
+
+DATABASE_ROUTERS = ['flytster.routers.ShardRouter', 'flytster.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -145,6 +183,13 @@ FLYTSTER_API_URL = 'http://192.168.99.100:8000'
 AUTH_TOKEN_EXP_IN_DAYS = 7
 VERIFICATION_TOKEN_EXP_IN_DAYS = 7
 USER_CREDIT_EXP_IN_DAYS = 365
+SYNC_TOMBSTONE_EXP_IN_DAYS = 30
+# Clock skew allowed between app servers and Postgres, see sync.views
+SYNC_WATERMARK_OVERLAP_SECONDS = 5
+IDEMPOTENCY_KEY_EXP_IN_HOURS = 24
+TRIP_BATCH_MAX_SIZE = 50
+BATCH_MAX_REQUESTS = 20
+REPLICA_PIN_SECONDS = 5
 
 # Flytster info
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -168,3 +213,57 @@ SABRE_TESTING_URL = "https://sws3-crt.cert.sabre.com"
 SABRE_PRODUCTION_URL = "https://webservices3.sabre.com"
 SABRE_USERNAME = os.getenv('SABRE_USERNAME', None)
 SABRE_PASSWORD = os.getenv('SABRE_PASSWORD', None)
+SABRE_PCC = os.getenv('SABRE_PCC', 'PPC')
+# Compiled Sabre templates, see sabre.soap_requests. None uses a directory under /tmp.
+SABRE_TEMPLATE_CACHE_DIR = os.getenv('SABRE_TEMPLATE_CACHE_DIR', None)
+# Sessions open at once per process. Keep workers times this under the PCC's limit.
+SABRE_SESSION_POOL_SIZE = int(os.getenv('SABRE_SESSION_POOL_SIZE', 2))
+# Sabre expires sessions idle for 15 minutes
+SABRE_SESSION_REFRESH_SECONDS = 10 * 60
+SABRE_SESSION_TIMEOUT_SECONDS = 10
+# Keep-alive connections to Sabre per process, see sabre.transport
+SABRE_HTTP_POOL_SIZE = 10
+SABRE_HTTP_RETRIES = 2
+SABRE_CONNECT_TIMEOUT_SECONDS = 3.05
+SABRE_READ_TIMEOUT_SECONDS = 30
+SABRE_READ_TIMEOUTS = {
+    'OTA_AirAvailLLSRQ': 8,
+    'OTA_PingRQ': 5,
+    'SessionCloseRQ': 5,
+}
+# Availability checks and pings are retried after transport errors, see sabre.resilience
+SABRE_READ_RETRIES = 2
+SABRE_RETRY_BACKOFF_SECONDS = 0.1
+SABRE_BREAKER_FAILURES = 5
+SABRE_BREAKER_RESET_SECONDS = 30
+# Sends a second availability check on another session once the first is slower than p95
+SABRE_HEDGE_AVAILABILITY = True if os.getenv('SABRE_HEDGE_AVAILABILITY') == 'True' else False
+# Booking pipeline, see bookings.pipeline and the run_booking_pipeline command
+BOOKING_WORKERS = int(os.getenv('BOOKING_WORKERS', 4))
+BOOKING_BATCH_SIZE = 20
+# A claimed job another worker may take over once this passes, e.g. after a crash
+BOOKING_LEASE_SECONDS = 5 * 60
+BOOKING_POLL_SECONDS = 2
+BOOKING_MAX_ATTEMPTS = 5
+BOOKING_RETRY_SECONDS = 30
+# How often a booked trip waiting on payment is checked again
+BOOKING_PURCHASE_POLL_SECONDS = 60
+# Requests per second the Sabre account allows across every worker and cron job,
+# see quotas.utils
+PROVIDER_QUOTAS = {
+    'sabre': {
+        'PER_SECOND': float(os.getenv('SABRE_QUOTA_PER_SECOND', 5)),
+        'BURST': 10,
+    },
+}
+# Share of each burst that background calls leave for interactive ones
+QUOTA_BACKGROUND_RESERVE = 0.5
+QUOTA_WAIT_SECONDS = 10
+# Longest a trip's concurrent availability checks may take, see sabre.availability
+SABRE_AVAILABILITY_DEADLINE_SECONDS = 15
+# How long each process reuses a segment's availability, see sabre.availability_cache
+SABRE_AVAILABILITY_CACHE_SECONDS = int(os.getenv('SABRE_AVAILABILITY_CACHE_SECONDS', 120))
+SABRE_AVAILABILITY_NEGATIVE_CACHE_SECONDS = 30
+SABRE_AVAILABILITY_CACHE_SIZE = 10000
+# How often run_booking_pipeline prints the cache's hit rate and Sabre call metrics
+SABRE_STATS_SECONDS = 5 * 60
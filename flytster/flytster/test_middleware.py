@@ -0,0 +1,97 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+from importlib import reload
+
+from django.core.urlresolvers import clear_url_caches, reverse
+from django.test import Client
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.views import APIView
+
+from flytster import api_settings, urls
+from users.models import FlytsterUser
+
+
+class ApiSettingsSetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.url_user = reverse('get_update_user')
+
+
+@pytest.fixture(scope="function")
+def setup(settings, monkeypatch):
+    """
+    Serves requests with the middleware and renderers of api_settings.
+    """
+    settings.MIDDLEWARE_CLASSES = api_settings.MIDDLEWARE_CLASSES
+    settings.REST_FRAMEWORK = api_settings.REST_FRAMEWORK
+    # Views read their renderers when APIView is defined, not per request
+    monkeypatch.setattr(APIView, 'renderer_classes', [
+        import_string(path) for path in api_settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+    ])
+    return ApiSettingsSetupFixture()
+
+
+@pytest.yield_fixture(scope="function")
+def backstage(setup, settings):
+    """
+    Moves the admin to /backstage/, rebuilding the URLs around the new prefix.
+    """
+    prefix = settings.ADMIN_URL_PREFIX
+    settings.ADMIN_URL_PREFIX = '/backstage/'
+    reload(urls)
+    clear_url_caches()
+    yield
+    settings.ADMIN_URL_PREFIX = prefix
+    reload(urls)
+    clear_url_caches()
+
+
+def test_api_requests_skip_admin_middleware(setup):
+    response = setup.client.get(setup.url_user, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert not hasattr(response.wsgi_request, 'session')
+    assert 'csrftoken' not in response.cookies
+
+
+def test_api_renders_json_only(setup):
+    response = setup.client.get(setup.url_user, HTTP_ACCEPT='text/html,*/*;q=0.8', **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith('application/json')
+
+
+def test_admin_requests_run_admin_middleware(setup):
+    response = setup.client.get('/admin/')
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response['Location'].endswith('/admin/login/?next=/admin/')
+    assert hasattr(response.wsgi_request, 'session')
+
+
+def test_admin_checks_csrf(setup):
+    client = Client(enforce_csrf_checks=True)
+    response = client.post('/admin/login/', {'username': 'flyhigh@gmail.com', 'password': 'Password1'})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_admin_follows_its_url_prefix(backstage):
+    client = Client()
+
+    response = client.get('/backstage/')
+    assert response.status_code == status.HTTP_302_FOUND
+    assert hasattr(response.wsgi_request, 'session')
+
+    response = client.get('/admin/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert not hasattr(response.wsgi_request, 'session')
@@ -8,3 +8,16 @@ EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 TWILIO_ACCOUNT_ID = os.getenv('TEST_TWILIO_ACCOUNT_ID')
 TWILIO_API_TOKEN = os.getenv('TEST_TWILIO_API_TOKEN')
 TWILIO_NUMBER = os.getenv('TEST_TWILIO_NUMBER')
+
+# Stand in for a read replica and a shard. conftest.py points them at the
+# default connection so queries routed to them see each test's uncommitted
+# rows. Sharding stays off unless a test sets DATABASE_SHARDS.
+DATABASES['replica1'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+DATABASES['shard1'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+DATABASE_REPLICAS = ['replica1']
+
+# A shard with a test database of its own, for moving rows between shards.
+# Django tells test databases apart by NAME, so it needs one of its own too.
+# Its writes commit, so tests using it take conftest.py's second_shard fixture
+# to clear it afterwards.
+DATABASES['shard2'] = dict(DATABASES['default'], NAME='{0}_shard2'.format(DATABASES['default']['NAME']))
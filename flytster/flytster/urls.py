@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.conf.urls import include, url
 from django.contrib import admin
 
+from batch.views import BatchView
+from bookings.views import TripBookingView
 from passengers.views import ListCreatePassenger, GetUpdatePassenger
-from trips.views import TripListCreateView, TripRetrieveDeleteView
+from sync.views import SyncView
+from trips.views import (TripListCreateView, TripRetrieveDeleteView, TripBatchCreateView,
+    TripDataSearchView, TripExportView)
 from users.views import (RegisterUser, LoginUser, LogoutUser, GetUpdateUser,
     VerifyUserEmail, ChangePassword, RequestPasswordReset, ResetPassword,
     VerifyPhone)
 
 
 urlpatterns = [
+    url(r'^{0}'.format(settings.ADMIN_URL_PREFIX.lstrip('/')), admin.site.urls),
+
     url(r'^api/v1/', include([
         url(r'^user/register/?$', RegisterUser.as_view(), name='register'),
         url(r'^user/login/?$', LoginUser.as_view(), name='login'),
@@ -24,6 +31,14 @@ urlpatterns = [
         url(r'^passenger/(?P<pk>[0-9]+)/?$', GetUpdatePassenger.as_view(), name='get_update_passenger'),
 
         url(r'^trip/?$', TripListCreateView.as_view(), name='trip_list_create'),
+        url(r'^trip/batch/?$', TripBatchCreateView.as_view(), name='trip_batch_create'),
+        url(r'^trip/search/?$', TripDataSearchView.as_view(), name='trip_data_search'),
+        url(r'^trip/export/?$', TripExportView.as_view(), name='trip_export'),
         url(r'^trip/(?P<pk>[0-9]+)/?$', TripRetrieveDeleteView.as_view(), name='trip_retrieve_delete'),
+        url(r'^trip/(?P<pk>[0-9]+)/booking/?$', TripBookingView.as_view(), name='trip_booking'),
+
+        url(r'^sync/?$', SyncView.as_view(), name='sync'),
+
+        url(r'^batch/?$', BatchView.as_view(), name='batch'),
     ])),
 ]
@@ -0,0 +1,82 @@
+"""
+Does the work Django and DRF otherwise leave for the first requests, so it
+happens once in the gunicorn master when the app is preloaded and workers
+share the result copy-on-write. Nothing here touches the database, since
+connections must not be opened before workers fork.
+"""
+import gc
+import inspect
+from importlib import import_module
+
+from django.apps import apps
+from django.core.urlresolvers import RegexURLResolver, get_resolver
+from django.template.loader import get_template
+from rest_framework import serializers
+
+from sabre import soap_requests
+
+
+SERIALIZER_MODULES = ('batch.serializers', 'passengers.serializers',
+    'trips.serializers', 'users.serializers')
+
+EMAIL_TEMPLATES = ('email.html', 'email.txt')
+
+# Client libraries the app only imports on first use
+CLIENT_MODULES = ('jinja2', 'requests', 'twilio.rest')
+
+
+def warm_urls(resolver=None):
+    """
+    Compiles every URL pattern's regex and builds the reverse lookup tables.
+    """
+    resolver = resolver or get_resolver(None)
+    resolver.regex
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, RegexURLResolver):
+            warm_urls(pattern)
+        else:
+            pattern.regex
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+
+
+def warm_models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+
+def warm_serializers():
+    """
+    Builds the fields of every serializer in the project's apps, which fills
+    Django's model _meta caches they read from.
+    """
+    for name in SERIALIZER_MODULES:
+        module = import_module(name)
+        for _, serializer_class in inspect.getmembers(module, inspect.isclass):
+            if (issubclass(serializer_class, serializers.BaseSerializer) and
+                    serializer_class.__module__ == module.__name__):
+                serializer_class().fields
+
+
+def warm_templates():
+    for name in EMAIL_TEMPLATES:
+        get_template(name)
+    for name in soap_requests.TEMPLATES:
+        soap_requests.get_environment().get_template(name)
+
+
+def warm_clients():
+    for name in CLIENT_MODULES:
+        import_module(name)
+
+
+def warm():
+    warm_urls()
+    warm_models()
+    warm_serializers()
+    warm_templates()
+    warm_clients()
+    # Leave nothing for the first collection in each worker to free, which
+    # would write to and so copy the shared pages
+    gc.collect()
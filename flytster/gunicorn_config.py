@@ -0,0 +1,54 @@
+"""
+Gunicorn settings, e.g. `gunicorn -c gunicorn_config.py flytster.wsgi`.
+
+GUNICORN_WORKER_CLASS picks the worker mode:
+
+* sync - one request per process at a time
+* gthread - GUNICORN_THREADS requests per process, each on its own thread
+* gevent - up to GUNICORN_WORKER_CONNECTIONS requests per process, as greenlets
+
+Requests spend most of their time waiting on Postgres, SMTP, Twilio or Sabre,
+so gthread is the default. Each thread or greenlet holds its own database
+connection while it runs, so the connection pool is sized to match.
+
+With GUNICORN_PRELOAD on (the default) the master imports the app and runs
+flytster.warmup before forking, so workers start warm and share those pages.
+"""
+import multiprocessing
+import os
+
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the preloaded app is imported. Thread locals made at import,
+    # like Django's connections and flytster.routers' state, would otherwise
+    # stay real thread locals shared by every greenlet in a worker, and
+    # warm() would import requests and ssl unpatched.
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+if worker_class == 'gthread':
+    os.environ.setdefault('DB_POOL_MAX_SIZE', str(threads))
+elif worker_class == 'gevent':
+    # Greenlets beyond the pool size wait for a connection
+    os.environ.setdefault('DB_POOL_MAX_SIZE', '20')
+
+
+def when_ready(server):
+    if preload_app:
+        from flytster.warmup import warm
+        warm()
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        from flytster.green import make_psycopg_green
+        make_psycopg_green()
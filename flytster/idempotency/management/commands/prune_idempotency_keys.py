@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flytster.routers import shard_aliases
+from idempotency.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Deletes idempotency keys older than IDEMPOTENCY_KEY_EXP_IN_HOURS.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_EXP_IN_HOURS)
+        count = 0
+        for using in shard_aliases():
+            deleted, _ = IdempotencyKey.objects.using(using).filter(timestamp__lt=cutoff).delete()
+            count += deleted
+        self.stdout.write('Deleted {0} idempotency keys.'.format(count))
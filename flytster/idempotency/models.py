@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils import timezone
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored outcome of a request sent with an Idempotency-Key header.
+    Keys expire after IDEMPOTENCY_KEY_EXP_IN_HOURS.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.IntegerField()
+    response = JSONField()
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = u'IdempotencyKey'
+        verbose_name_plural = u'IdempotencyKeys'
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return self.key
+
+    @property
+    def is_expired(self):
+        if timezone.now() - self.timestamp < timedelta(hours=settings.IDEMPOTENCY_KEY_EXP_IN_HOURS):
+            return False
+        self.delete()
+        return True
@@ -0,0 +1,98 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+import json
+from datetime import timedelta
+
+from django.core.urlresolvers import reverse
+from django.test import Client
+from django.utils import timezone
+from rest_framework import status
+
+from users.models import FlytsterUser
+from trips.models import Trip, TripStatus
+from passengers.models import Passenger
+from idempotency.models import IdempotencyKey
+from idempotency.utils import HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class IdempotencySetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create()
+        )
+
+        self.passenger_data = {
+            "trip_id": self.trip.id,
+            "first_name": "Drew",
+            "last_name": "Brees",
+            "gender": "M",
+            "birthdate": "1979-01-15"
+        }
+
+        self.url_passenger = reverse('list_create_passenger')
+
+    def post(self, data, key=None):
+        headers = dict(self.auth)
+        if key:
+            headers['HTTP_IDEMPOTENCY_KEY'] = key
+        return self.client.post(self.url_passenger, data=json.dumps(data),
+                                content_type='application/json', **headers)
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return IdempotencySetupFixture()
+
+
+def test_replay_passenger_create(setup):
+    response = setup.post(setup.passenger_data, key='abc123')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not response.has_header('Idempotent-Replayed')
+
+    replay = setup.post(setup.passenger_data, key='abc123')
+    assert replay.status_code == status.HTTP_201_CREATED
+    assert replay['Idempotent-Replayed'] == 'true'
+    assert replay.data['id'] == response.data['id']
+    assert Passenger.objects.count() == 1
+
+def test_reused_key_different_request(setup):
+    response = setup.post(setup.passenger_data, key='abc123')
+    assert response.status_code == status.HTTP_201_CREATED
+
+    data = dict(setup.passenger_data, first_name='Matt')
+    response = setup.post(data, key='abc123')
+    assert response.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert Passenger.objects.count() == 1
+
+def test_expired_key_runs_again(setup):
+    response = setup.post(setup.passenger_data, key='abc123')
+    assert response.status_code == status.HTTP_201_CREATED
+
+    IdempotencyKey.objects.update(timestamp=timezone.now() - timedelta(days=2))
+
+    response = setup.post(setup.passenger_data, key='abc123')
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert not response.has_header('Idempotent-Replayed')
+
+def test_no_key_keeps_conflict(setup):
+    response = setup.post(setup.passenger_data)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = setup.post(setup.passenger_data)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert IdempotencyKey.objects.count() == 0
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.db import connections, router, transaction
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+# First half of the two-int advisory lock key, so these locks can't collide
+# with advisory locks taken for anything else.
+ADVISORY_LOCK_NAMESPACE = 1029
+
+# rest_framework.status only has it from DRF 3.4
+HTTP_422_UNPROCESSABLE_ENTITY = 422
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    payload = '{0} {1} {2}'.format(request.method, request.path, body)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def advisory_xact_lock(using, user_id, key):
+    """
+    Blocks until no other transaction holds the lock for this user's key.
+    The lock is released when the surrounding transaction ends.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(%s, hashtext(%s))',
+            [ADVISORY_LOCK_NAMESPACE, '{0}:{1}'.format(user_id, key)])
+
+
+def idempotent(view_method):
+    """
+    Decorates an APIView handler so a retried request with the same
+    Idempotency-Key header replays the first response instead of running again.
+    Concurrent requests with the same key wait on a Postgres advisory lock until
+    the first one commits, then replay its response.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {'detail': 'Idempotency-Key must be at most 255 characters.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+
+        # The key's database, which is also where the user's rows are written
+        using = router.db_for_write(IdempotencyKey)
+        with transaction.atomic(using=using):
+            advisory_xact_lock(using, request.user.id, key)
+
+            stored = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if stored is not None and not stored.is_expired:
+                if stored.fingerprint != fingerprint:
+                    return Response(
+                        {'detail': 'This Idempotency-Key was used with a different request.'},
+                        status=HTTP_422_UNPROCESSABLE_ENTITY)
+
+                response = Response(stored.response, status=stored.status_code)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+            response = view_method(self, request, *args, **kwargs)
+
+            if response.status_code < 500:
+                IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    status_code=response.status_code,
+                    response=json.loads(JSONRenderer().render(response.data).decode('utf-8')))
+
+        return response
+
+    return wrapper
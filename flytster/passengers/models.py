@@ -18,6 +18,7 @@ class Passenger(models.Model):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     birthdate = models.DateField(null=False)
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = u'Passenger'
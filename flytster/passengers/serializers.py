@@ -27,5 +27,5 @@ class PassengerSerializer(serializers.ModelSerializer):
         model = Passenger
         fields = (
             'id', 'user', 'trip', 'first_name', 'middle_name', 'last_name',
-            'gender', 'birthdate', 'timestamp')
-        read_only_fields = ('timestamp')
+            'gender', 'birthdate', 'timestamp', 'updated')
+        read_only_fields = ('timestamp', 'updated')
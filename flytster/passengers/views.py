@@ -1,10 +1,12 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, router, transaction
 from django.conf import settings
 
 from rest_framework import generics, status, views
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
+from idempotency.utils import idempotent
+
 from .models import Passenger
 from .permissions import IsOwner
 from .serializers import (CreatePassengerSerializer, PassengerSerializer)
@@ -23,13 +25,15 @@ class ListCreatePassenger(generics.ListCreateAPIView):
         return Passenger.objects.filter(user=self.request.user).order_by(
             'first_name', 'last_name', 'birthdate').distinct('first_name', 'last_name', 'birthdate')
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         passenger_data = self.get_serializer_class()(data=request.data)
         passenger_data.is_valid(raise_exception=True)
 
         try:
             passenger_data.validated_data['user'] = request.user
-            passenger = Passenger.objects.create(**passenger_data.validated_data)
+            with transaction.atomic(using=router.db_for_write(Passenger)):
+                passenger = Passenger.objects.create(**passenger_data.validated_data)
         except IntegrityError:
             return Response({'detail': 'Passenger already exists.'},
                 status=status.HTTP_409_CONFLICT)
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class QuotaBucket(models.Model):
+    """
+    The shared token bucket for one provider's request quota. Every worker
+    and cron job draws from the same row, see quotas.utils.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = u'QuotaBucket'
+        verbose_name_plural = u'QuotaBuckets'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,70 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+from quotas.models import QuotaBucket
+from quotas.utils import (BACKGROUND, INTERACTIVE, QuotaTimeout, acquire, background,
+    current_priority, thread_task, try_acquire)
+
+
+@pytest.fixture(scope="function")
+def quotas(settings):
+    # Refills too slowly to matter within a test
+    settings.PROVIDER_QUOTAS = {'sabre': {'PER_SECOND': 0.001, 'BURST': 4}}
+    settings.QUOTA_BACKGROUND_RESERVE = 0.5
+
+
+def take(count, priority=INTERACTIVE):
+    return [try_acquire('sabre', priority) for _ in range(count)]
+
+
+def test_bucket_is_created_full(quotas):
+    assert take(5) == [0, None, None, None, None]
+    assert try_acquire('sabre') > 0
+    assert QuotaBucket.objects.get(name='sabre').tokens < 0.01
+
+
+def test_background_calls_leave_the_reserve(quotas):
+    take(1)
+
+    waits = take(3, BACKGROUND)
+    assert waits[:2] == [None, None]
+    assert 990 < waits[2] <= 1000
+    assert take(2) == [None, None]
+
+
+def test_background_context(quotas):
+    take(3)
+
+    with background():
+        assert try_acquire('sabre') > 0
+    assert try_acquire('sabre') is None
+
+
+def test_unconfigured_providers_are_not_limited(quotas):
+    assert take(1) == [0]
+    assert try_acquire('qpx') is None
+
+
+def test_acquire_times_out(quotas):
+    take(5)
+
+    with pytest.raises(QuotaTimeout):
+        acquire('sabre', timeout=0.05)
+
+
+def test_thread_tasks_keep_the_priority_and_close_connections():
+    def task():
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return current_priority(), connections['default']
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with background():
+            priority, connection = executor.submit(thread_task(task)).result()
+        assert executor.submit(current_priority).result() == INTERACTIVE
+    assert priority == BACKGROUND
+    assert connection.connection is None
@@ -0,0 +1,148 @@
+"""
+Token buckets in Postgres for provider request quotas. Every gunicorn
+worker and cron job takes a token from the provider's shared row before a
+call, so together they stay under the account's rate:
+
+    acquire('sabre')
+
+Buckets refill at PROVIDER_QUOTAS[name]['PER_SECOND'] up to 'BURST'. Calls
+made inside background() must leave QUOTA_BACKGROUND_RESERVE of the burst
+in the bucket, so background rechecks wait first when the quota runs low
+and interactive calls keep going. Work handed to a thread pool is wrapped
+in thread_task(), so it keeps its caller's priority.
+"""
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, router
+
+from .models import QuotaBucket
+
+
+INTERACTIVE, BACKGROUND = 'interactive', 'background'
+
+# Refills and takes a token in one statement, so concurrent callers queue on
+# the row lock for only as long as the UPDATE takes.
+TAKE_TOKEN_SQL = '''
+    WITH clock AS (SELECT clock_timestamp() AS now)
+    UPDATE {table} SET
+        tokens = LEAST(%(burst)s, tokens + %(rate)s * EXTRACT(EPOCH FROM clock.now - updated)) - 1,
+        updated = clock.now
+    FROM clock
+    WHERE name = %(name)s
+        AND LEAST(%(burst)s, tokens + %(rate)s * EXTRACT(EPOCH FROM clock.now - updated)) >= %(floor)s + 1
+    RETURNING tokens'''
+
+AVAILABLE_TOKENS_SQL = '''
+    SELECT LEAST(%(burst)s, tokens + %(rate)s * EXTRACT(EPOCH FROM clock_timestamp() - updated))
+    FROM {table}
+    WHERE name = %(name)s'''
+
+_state = threading.local()
+
+
+class QuotaTimeout(Exception):
+    pass
+
+
+def current_priority():
+    return getattr(_state, 'priority', INTERACTIVE)
+
+
+@contextmanager
+def background():
+    """
+    Marks provider calls made in the block as background work.
+    """
+    previous = current_priority()
+    _state.priority = BACKGROUND
+    try:
+        yield
+    finally:
+        _state.priority = previous
+
+
+def thread_task(func):
+    """
+    Wraps func to run on another thread at the caller's priority. The
+    thread's database connections, opened to take tokens, are closed when
+    it returns, since pool threads outlive requests and nothing else would.
+    """
+    priority = current_priority()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        previous = current_priority()
+        _state.priority = priority
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _state.priority = previous
+            connections.close_all()
+    return run
+
+
+def _execute(sql, params):
+    using = router.db_for_write(QuotaBucket)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql.format(table=QuotaBucket._meta.db_table), params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def try_acquire(name, priority=None):
+    """
+    Takes a token from the provider's bucket if one is free at this
+    priority. Returns None if it was taken, or else the seconds until one
+    should be. Unconfigured providers are not limited.
+    """
+    quota = settings.PROVIDER_QUOTAS.get(name)
+    if quota is None:
+        return None
+
+    priority = priority or current_priority()
+    params = {
+        'name': name,
+        'burst': quota['BURST'],
+        'rate': quota['PER_SECOND'],
+        'floor': quota['BURST'] * settings.QUOTA_BACKGROUND_RESERVE if priority == BACKGROUND else 0,
+    }
+
+    if _execute(TAKE_TOKEN_SQL, params) is not None:
+        return None
+
+    available = _execute(AVAILABLE_TOKENS_SQL, params)
+    if available is None:
+        QuotaBucket.objects.get_or_create(name=name, defaults={'tokens': quota['BURST']})
+        return 0
+    return max(params['floor'] + 1 - available, 0) / quota['PER_SECOND']
+
+
+def acquire(name, priority=None, timeout=None):
+    """
+    Waits for a token from the provider's bucket, raising QuotaTimeout after
+    timeout seconds (QUOTA_WAIT_SECONDS by default). Returns the seconds it
+    slept waiting. Call it outside transactions, which would hold the
+    bucket's row lock until they end.
+    """
+    if timeout is None:
+        timeout = settings.QUOTA_WAIT_SECONDS
+    deadline = time.monotonic() + timeout
+    slept = 0.0
+
+    while True:
+        wait = try_acquire(name, priority)
+        if wait is None:
+            return slept
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise QuotaTimeout('No {0} quota was free within {1}s.'.format(name, timeout))
+        # Jitter so waiting workers don't all retry at the same instant
+        pause = min(wait * random.uniform(1, 1.5), remaining)
+        time.sleep(pause)
+        slept += pause
@@ -0,0 +1,152 @@
+"""
+Checks a trip's availability with one OTA_AirAvailLLSRQ per segment, sent
+concurrently on pooled Sabre sessions under an overall deadline:
+
+    is_available = update_trip_availability(trip)
+
+Answers are shared through sabre.availability_cache, so only segments it
+doesn't know are sent to Sabre. As soon as one segment comes back
+unavailable the trip is unavailable, so checks that haven't started are
+cancelled and the ones in flight are left to finish in the background with
+their results ignored. With SABRE_HEDGE_AVAILABILITY, a check slower than
+the recent p95 is raced by a second one, see sabre.resilience.hedged.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.utils import timezone
+
+from quotas.utils import thread_task
+
+from .availability_cache import get_availability_cache
+from .resilience import hedged
+from .sessions import get_session_pool
+from .soap_requests import SabreError, check_segments_availability, trip_segments
+from .transport import metrics
+
+
+AVAILABILITY_ACTION = 'OTA_AirAvailLLSRQ'
+
+
+class AvailabilityDeadlineExceeded(SabreError):
+    pass
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    The thread pool for this process. It has a thread per pooled session,
+    since a check holds a session for as long as it runs.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=settings.SABRE_SESSION_POOL_SIZE)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def is_segment_available(segment, flights):
+    """
+    Whether Sabre listed the segment's flight with enough seats left in its
+    booking class for the party.
+    """
+    for flight in flights:
+        if (flight.carrier == segment.carrier and
+                flight.number.lstrip('0') == segment.number.lstrip('0')):
+            return flight.seats(segment.booking_code) >= segment.party_size
+    return False
+
+
+def count_hedge(won):
+    metrics.count(AVAILABILITY_ACTION, 'hedge_won' if won else 'hedge_lost')
+
+
+def lookup_segment(segment, call, hedge):
+    """
+    Asks Sabre whether the segment is available. With hedge, a call still
+    running at the action's p95 latency is raced by a second one on another
+    session.
+    """
+    def lookup():
+        return is_segment_available(segment, call(check_segments_availability, [segment]))
+
+    if not hedge:
+        return lookup()
+    return hedged(lookup, metrics.percentile(AVAILABILITY_ACTION, 0.95), on_hedge=count_hedge)
+
+
+def check_segments(segments, deadline, call=None, executor=None, cache=None, hedge=None):
+    """
+    Checks each segment concurrently, through the availability cache, and
+    returns whether all are available. Returns False as soon as one isn't,
+    and raises AvailabilityDeadlineExceeded if the answer isn't known within
+    deadline seconds. A SabreError from any check is raised as is.
+    """
+    call = call or get_session_pool().call
+    executor = executor or get_executor()
+    cache = cache or get_availability_cache()
+    if hedge is None:
+        hedge = settings.SABRE_HEDGE_AVAILABILITY
+    cancelled = threading.Event()
+
+    def check(segment):
+        if cancelled.is_set():
+            return None
+        is_available = cache.get_or_check(segment, lambda: lookup_segment(segment, call, hedge))
+        if not is_available:
+            # Before this thread can pick up another segment
+            cancelled.set()
+        return is_available
+
+    task = thread_task(check)
+    pending = {executor.submit(task, segment) for segment in segments}
+    expires = time.monotonic() + deadline
+    try:
+        while pending:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                raise AvailabilityDeadlineExceeded(
+                    '{0} of {1} segments unchecked after {2}s.'.format(
+                        len(pending), len(segments), deadline))
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is False:
+                    return False
+        return True
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+
+def stats():
+    """
+    This process's availability cache stats, hit_rate included, next to its
+    Sabre call metrics by action.
+    """
+    return {'availability_cache': get_availability_cache().stats(), 'calls': metrics.snapshot()}
+
+
+def update_trip_availability(trip, deadline=None):
+    """
+    Checks the trip's segments with Sabre and saves the result as its
+    status's is_available. A check that fails or runs out of time leaves the
+    status as it was.
+    """
+    if deadline is None:
+        deadline = settings.SABRE_AVAILABILITY_DEADLINE_SECONDS
+
+    from trips.models import TripStatus
+
+    is_available = check_segments(trip_segments(trip), deadline)
+    TripStatus.objects.using(trip._state.db).filter(pk=trip.status_id).update(
+        is_available=is_available, updated=timezone.now())
+    return is_available
@@ -0,0 +1,120 @@
+"""
+A per-process cache of segment availability answers, so users checking the
+same flight within a couple of minutes share one Sabre round trip. Answers
+are keyed by carrier, flight number, departure date, booking class and
+party size. Unavailable answers expire sooner than available ones, and
+concurrent lookups of the same key wait for the first one's call instead
+of making their own.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class InFlight(object):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def segment_key(segment):
+    return (segment.carrier, segment.number.lstrip('0'), segment.departure_time[:10],
+        segment.booking_code, segment.party_size)
+
+
+class AvailabilityCache(object):
+
+    def __init__(self, ttl, negative_ttl, max_size, clock=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'shared': 0, 'errors': 0}
+
+    def get_or_check(self, segment, check):
+        """
+        Returns the cached answer for the segment, or calls check() for it.
+        A lookup made while another thread is checking the same segment
+        waits for that answer, or its exception.
+        """
+        key = segment_key(segment)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                is_available, expires = entry
+                if expires > self.clock():
+                    self._stats['hits' if is_available else 'negative_hits'] += 1
+                    return is_available
+                del self._entries[key]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = InFlight()
+                self._stats['misses'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = check()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        else:
+            self._store(key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses'] + stats['shared']
+        stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        return stats
+
+    def _store(self, key, is_available):
+        expires = self.clock() + (self.ttl if is_available else self.negative_ttl)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (is_available, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_availability_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AvailabilityCache(
+                ttl=settings.SABRE_AVAILABILITY_CACHE_SECONDS,
+                negative_ttl=settings.SABRE_AVAILABILITY_NEGATIVE_CACHE_SECONDS,
+                max_size=settings.SABRE_AVAILABILITY_CACHE_SIZE)
+        return _cache
@@ -0,0 +1,37 @@
+class SabreError(Exception):
+    pass
+
+
+class InvalidSessionError(SabreError):
+    """
+    Sabre rejected the session token, usually because the session timed out.
+    """
+    pass
+
+
+class SabreTransportError(SabreError):
+    """
+    The request didn't get a SOAP answer: the connection failed, or a proxy
+    in front of Sabre answered 502, 503 or 504.
+    """
+    pass
+
+
+class SabreTimeout(SabreTransportError):
+    pass
+
+
+class SabreUnavailable(SabreError):
+    """
+    The circuit breaker is open after repeated failures, so the call was
+    not made.
+    """
+    pass
+
+
+class SabreUnexpectedAnswer(SabreError):
+    """
+    Sabre answered without an error but also without what the request
+    returns, so whether it acted on the request is unknown.
+    """
+    pass
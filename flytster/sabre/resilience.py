@@ -0,0 +1,125 @@
+"""
+Failure handling for calls to Sabre: a circuit breaker so calls fail fast
+while Sabre is down, jittered backoff for retries, and hedging, which sends
+a second copy of a slow call and takes whichever answers first.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from quotas.utils import thread_task
+
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker(object):
+    """
+    Opens after failure_threshold failures in a row. While open, allow()
+    refuses calls until reset_after seconds have passed, then lets a single
+    trial call through; its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, failure_threshold, reset_after, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_after:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+
+def backoff(attempt, base):
+    """
+    Seconds to wait before retry number attempt (from 1), drawn uniformly up
+    to base * 2 ** attempt so clients retrying together spread out.
+    """
+    return random.uniform(0, base * 2 ** attempt)
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker():
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=settings.SABRE_BREAKER_FAILURES,
+                reset_after=settings.SABRE_BREAKER_RESET_SECONDS)
+        return _breaker
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_executor():
+    """
+    Threads for hedged calls, kept apart from sabre.availability's so a
+    check waiting on its hedge can't starve the pool that runs it.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=2 * settings.SABRE_SESSION_POOL_SIZE)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def hedged(func, delay, executor=None, on_hedge=None):
+    """
+    Calls func(), and calls it again if the first call hasn't returned after
+    delay seconds. Returns the first result; an exception is only raised if
+    both calls fail. on_hedge(won) is called once a hedge has been sent,
+    with whether the second call answered first.
+    """
+    executor = executor or get_hedge_executor()
+    func = thread_task(func)
+    first = executor.submit(func)
+    if delay is None or wait([first], timeout=delay).done:
+        return first.result()
+
+    second = executor.submit(func)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if on_hedge is not None:
+                    on_hedge(future is second)
+                return future.result()
+            error = future.exception()
+    if on_hedge is not None:
+        on_hedge(False)
+    raise error
@@ -0,0 +1,153 @@
+"""
+Streaming decoders for Sabre responses. They walk the XML with iterparse,
+keep only the fields the app uses as small tuples, and clear each element
+once it has been read, so a large OTA_AirAvailRS never sits in memory as a
+full tree.
+"""
+import io
+from collections import namedtuple
+from xml.etree.ElementTree import iterparse
+
+
+SABRE_NS = '{http://webservices.sabre.com/sabreXML/2011/10}'
+STL_NS = '{http://services.sabre.com/STL/v01}'
+
+# Segment status codes for a sell Sabre accepted. UC, US and NO mean it didn't.
+SOLD_STATUSES = frozenset(['HK', 'KK', 'NN', 'SS'])
+
+AirAvailability = namedtuple('AirAvailability', ['flights', 'errors'])
+AirBooking = namedtuple('AirBooking', ['segments', 'errors'])
+EndTransaction = namedtuple('EndTransaction', ['record_locator', 'errors'])
+
+
+class AvailableFlight(namedtuple('AvailableFlight', ['carrier', 'number', 'origin',
+        'destination', 'departure_time', 'arrival_time', 'booking_classes'])):
+    """
+    A flight from OTA_AirAvailRS. booking_classes holds (code, seats) pairs.
+    """
+    __slots__ = ()
+
+    def seats(self, booking_code):
+        for code, seats in self.booking_classes:
+            if code == booking_code:
+                return seats
+        return 0
+
+
+class BookedSegment(namedtuple('BookedSegment', ['carrier', 'number', 'origin',
+        'destination', 'departure_time', 'booking_code', 'party_size', 'status'])):
+    """
+    A segment from OTA_AirBookRS with Sabre's status code for it.
+    """
+    __slots__ = ()
+
+    @property
+    def is_sold(self):
+        return self.status in SOLD_STATUSES
+
+
+def _events(source, events=('start', 'end')):
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return iterparse(source, events=events)
+
+
+def _location(segment, name):
+    location = segment.find(SABRE_NS + name)
+    return location.get('LocationCode') if location is not None else None
+
+
+def _airline(segment):
+    airline = segment.find(SABRE_NS + 'MarketingAirline')
+    return airline.get('Code') if airline is not None else None
+
+
+def _errors(results, errors):
+    if results.get('status') == 'Complete':
+        return
+    for error in results.iter(STL_NS + 'Error'):
+        errors.append(' '.join(message.text.strip()
+            for message in error.iter(STL_NS + 'Message') if message.text) or
+            error.get('type', 'Unknown error'))
+    if not errors:
+        errors.append('Sabre returned status {0}.'.format(results.get('status')))
+
+
+def decode_availability(source):
+    """
+    Decodes an OTA_AirAvailRS from bytes or a binary file into an
+    AirAvailability of AvailableFlights.
+    """
+    flights, errors = [], []
+    options = None
+    for event, element in _events(source):
+        if event == 'start':
+            if element.tag == SABRE_NS + 'OriginDestinationOptions':
+                options = element
+        elif element.tag == SABRE_NS + 'FlightSegment':
+            flights.append(AvailableFlight(
+                carrier=_airline(element),
+                number=element.get('FlightNumber'),
+                origin=_location(element, 'OriginLocation'),
+                destination=_location(element, 'DestinationLocation'),
+                departure_time=element.get('DepartureDateTime'),
+                arrival_time=element.get('ArrivalDateTime'),
+                booking_classes=tuple(
+                    (avail.get('ResBookDesigCode'), int(avail.get('ResBookDesigQuantity') or 0))
+                    for avail in element.iterfind(SABRE_NS + 'BookingClassAvail'))))
+        elif element.tag == SABRE_NS + 'OriginDestinationOption':
+            # Drops the option and its segments, which have been read
+            options.clear()
+        elif element.tag == STL_NS + 'ApplicationResults':
+            _errors(element, errors)
+    return AirAvailability(flights, tuple(errors))
+
+
+def decode_booking(source):
+    """
+    Decodes an OTA_AirBookRS from bytes or a binary file into an AirBooking
+    of BookedSegments.
+    """
+    segments, errors = [], []
+    for event, element in _events(source, events=('end',)):
+        if element.tag == SABRE_NS + 'FlightSegment':
+            segments.append(BookedSegment(
+                carrier=_airline(element),
+                number=element.get('FlightNumber'),
+                origin=_location(element, 'OriginLocation'),
+                destination=_location(element, 'DestinationLocation'),
+                departure_time=element.get('DepartureDateTime'),
+                booking_code=element.get('ResBookDesigCode'),
+                party_size=int(element.get('NumberInParty') or 0),
+                status=element.get('Status')))
+            element.clear()
+        elif element.tag == STL_NS + 'ApplicationResults':
+            _errors(element, errors)
+    return AirBooking(segments, tuple(errors))
+
+
+def decode_end_transaction(source):
+    """
+    Decodes an EndTransactionRS from bytes or a binary file into an
+    EndTransaction with the record locator of the PNR Sabre stored.
+    """
+    record_locator, errors = None, []
+    for event, element in _events(source, events=('end',)):
+        if element.tag == SABRE_NS + 'ItineraryRef':
+            record_locator = element.get('ID')
+        elif element.tag == STL_NS + 'ApplicationResults':
+            _errors(element, errors)
+    return EndTransaction(record_locator, tuple(errors))
+
+
+def decode_errors(source):
+    """
+    The error messages in a response's ApplicationResults, for actions
+    whose other content the app doesn't use.
+    """
+    errors = []
+    for event, element in _events(source, events=('end',)):
+        if element.tag == STL_NS + 'ApplicationResults':
+            _errors(element, errors)
+            break
+    return tuple(errors)
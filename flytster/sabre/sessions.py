@@ -0,0 +1,249 @@
+"""
+A process-wide pool of authenticated Sabre sessions. Creating a session is a
+full SOAP round trip and Sabre caps how many a PCC can hold open, so calls
+borrow an open session instead:
+
+    with get_session_pool().session() as token:
+        check_air_availability(token, trip)
+
+Calls that build a PNR in the session's work area, like a booking's sell,
+price and end transaction, hold one session through transaction(), which
+ignores whatever the work area still holds before the session goes back.
+
+A background thread pings idle sessions before Sabre's 15 minute timeout and
+drops the ones Sabre has already expired.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from quotas.utils import background
+
+from .soap_requests import (InvalidSessionError, SabreError, close_sabre_session,
+    ignore_transaction, ping_sabre_session, start_sabre_session)
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPoolTimeout(SabreError):
+    pass
+
+
+class PooledSession(object):
+    __slots__ = ('token', 'created', 'last_used')
+
+    def __init__(self, token):
+        self.token = token
+        self.created = self.last_used = time.monotonic()
+
+
+class SessionPool(object):
+
+    def __init__(self, max_size, refresh_after, timeout, start=start_sabre_session,
+                 close=close_sabre_session, ping=ping_sabre_session, ignore=ignore_transaction):
+        self.max_size = max_size
+        self.refresh_after = refresh_after
+        self.timeout = timeout
+        self.start = start
+        self.close = close
+        self.ping = ping
+        self.ignore = ignore
+        self.pid = os.getpid()
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._refresher = None
+        self._stopped = threading.Event()
+
+    def borrow(self):
+        """
+        Returns an idle session, or a new one while the pool is under
+        max_size, waiting up to timeout for one to be returned otherwise.
+        """
+        self._start_refresher()
+        deadline = time.monotonic() + self.timeout
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SessionPoolTimeout(
+                        'No Sabre session was free within {0}s.'.format(self.timeout))
+                self._condition.wait(remaining)
+
+        try:
+            return PooledSession(self.start())
+        except Exception:
+            self._forget()
+            raise
+
+    def release(self, session):
+        session.last_used = time.monotonic()
+        with self._condition:
+            self._idle.append(session)
+            self._condition.notify()
+
+    def discard(self, session, close=True):
+        """
+        Drops a session from the pool, closing it with Sabre unless it's
+        already known to be dead.
+        """
+        self._forget()
+        if close:
+            try:
+                self.close(session.token)
+            except SabreError:
+                logger.warning('Could not close a Sabre session.', exc_info=True)
+
+    @contextmanager
+    def session(self):
+        """
+        Lends a session token for the block. A session Sabre rejects is
+        dropped so the next borrow opens a fresh one. Only for calls that
+        leave nothing in the work area, like availability checks; see
+        transaction().
+        """
+        session = self.borrow()
+        try:
+            yield session.token
+        except InvalidSessionError:
+            self.discard(session, close=False)
+            raise
+        except BaseException:
+            self.release(session)
+            raise
+        else:
+            self.release(session)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Lends a session token for a block of calls that share its work area.
+        However the block ends, the work area is ignored before the session
+        goes back, so the next borrower never builds on what it left. A
+        session that can't be cleared is closed, which drops its work area.
+        """
+        session = self.borrow()
+        try:
+            yield session.token
+        except InvalidSessionError:
+            self.discard(session, close=False)
+            raise
+        except BaseException:
+            self._clear(session)
+            raise
+        else:
+            self._clear(session)
+
+    def _clear(self, session):
+        try:
+            self.ignore(session.token)
+        except InvalidSessionError:
+            self.discard(session, close=False)
+        except Exception:
+            logger.warning('Could not ignore a Sabre session\'s work area.', exc_info=True)
+            self.discard(session)
+        else:
+            self.release(session)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls func(token, *args, **kwargs) with a pooled session, retrying
+        once on a fresh session if Sabre rejects the first.
+        """
+        try:
+            with self.session() as token:
+                return func(token, *args, **kwargs)
+        except InvalidSessionError:
+            with self.session() as token:
+                return func(token, *args, **kwargs)
+
+    def refresh(self):
+        """
+        Pings sessions idle for longer than refresh_after and drops the ones
+        Sabre no longer accepts.
+        """
+        now = time.monotonic()
+        with self._condition:
+            stale = [session for session in self._idle
+                     if now - session.last_used > self.refresh_after]
+            for session in stale:
+                self._idle.remove(session)
+
+        for session in stale:
+            try:
+                self.ping(session.token)
+            except InvalidSessionError:
+                self.discard(session, close=False)
+            except SabreError:
+                logger.warning('Could not refresh a Sabre session.', exc_info=True)
+                self.discard(session)
+            else:
+                self.release(session)
+
+    def closeall(self):
+        self._stopped.set()
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for session in idle:
+            self.discard(session)
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._condition:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_forever, name='sabre-session-refresh', daemon=True)
+            self._refresher.start()
+
+    def _refresh_forever(self):
+        interval = max(self.refresh_after / 4, 1)
+        while not self._stopped.wait(interval):
+            try:
+                with background():
+                    self.refresh()
+            except Exception:
+                logger.exception('Sabre session refresh failed.')
+            finally:
+                # Its quota connection would otherwise stay open between refreshes
+                connections.close_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """
+    The pool for this process. A pool inherited across a fork is replaced,
+    since its sessions and refresh thread belong to the parent.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = SessionPool(
+                max_size=settings.SABRE_SESSION_POOL_SIZE,
+                refresh_after=settings.SABRE_SESSION_REFRESH_SECONDS,
+                timeout=settings.SABRE_SESSION_TIMEOUT_SECONDS)
+        return _pool
@@ -1,101 +1,324 @@
-import xml.etree.ElementTree as ET
-import requests
+import threading
+from collections import namedtuple
 
 from django.conf import settings
+from django.utils import timezone
 
-from jinja2 import Environment, PackageLoader
+from .exceptions import InvalidSessionError, SabreError, SabreUnexpectedAnswer
+from .responses import decode_availability, decode_booking, decode_end_transaction, decode_errors
+from .transport import post_soap
 
 # WILL FINISH THIS SECTION ONCE I GET SABRE CREDENTIALS
 
-def start_sabre_session():
+# jinja2 and requests are imported on first use, so importing this module
+# stays cheap for processes that never talk to Sabre.
+
+SOAP_ENV_NS = '{http://schemas.xmlsoap.org/soap/envelope/}'
+SECEXT_NS = '{http://schemas.xmlsoap.org/ws/2002/12/secext}'
+
+
+def check_fault(content):
     """
-    Sends xml-formatted SOAP request to start Sabre session
+    Raises SabreError for a SOAP fault, or InvalidSessionError when the fault
+    is about the session token.
+    """
+    if b'Fault' not in content:
+        return
+
+    from xml.etree import ElementTree
+
+    fault = ElementTree.fromstring(content).find('.//{0}Fault'.format(SOAP_ENV_NS))
+    if fault is None:
+        return
+
+    code = fault.findtext('faultcode', '')
+    message = fault.findtext('faultstring', '')
+    if 'InvalidSecurityToken' in code or 'SecurityToken' in message:
+        raise InvalidSessionError(message or code)
+    raise SabreError(message or code)
+
+
+TEMPLATES = ('start_session.xml', 'close_session.xml', 'ping_session.xml',
+    'check_air_availability.xml', 'book_air_segment.xml', 'add_passenger_names.xml',
+    'price_itinerary.xml', 'end_transaction.xml', 'ignore_transaction.xml',
+    'retrieve_itinerary.xml', 'issue_tickets.xml')
+
+SEATED_PASSENGER_KEYS = ('adult_count', 'child_count', 'infant_in_seat_count', 'senior_count')
+
+# Sabre's passenger type code for each QPX passenger count
+PASSENGER_TYPE_CODES = (
+    ('adult_count', 'ADT'),
+    ('child_count', 'CNN'),
+    ('infant_in_lap_count', 'INF'),
+    ('infant_in_seat_count', 'INS'),
+    ('senior_count', 'SRC'))
+
+# One FlightSegment of an availability or booking request
+Segment = namedtuple('Segment', ['carrier', 'number', 'booking_code', 'aircraft',
+    'origin', 'destination', 'departure_time', 'arrival_time', 'party_size'])
+
+_environment = None
+_environment_lock = threading.Lock()
+
+
+def get_environment():
+    """
+    The Jinja environment for the Sabre templates, built once per process.
+    Compiled templates are kept in memory, and their bytecode on disk so
+    new processes skip compiling them.
+    """
+    global _environment
+    with _environment_lock:
+        if _environment is None:
+            from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, StrictUndefined
+
+            _environment = Environment(
+                loader=PackageLoader('sabre', 'templates'),
+                bytecode_cache=FileSystemBytecodeCache(settings.SABRE_TEMPLATE_CACHE_DIR),
+                auto_reload=settings.DEBUG,
+                autoescape=True,
+                undefined=StrictUndefined)
+        return _environment
+
+
+def render_template(name, context):
+    return get_environment().get_template(name).render(context)
+
+
+def trip_segments(trip):
     """
-    env = Environment(loader=PackageLoader('sabre', 'templates'))
+    The trip's legs as Segments, in travel order. They are read from the
+    QPX tripOption kept in Trip.data, which has the local departure and
+    arrival times Sabre expects, so a loaded trip needs no more queries and
+    templates render without touching the database.
+    """
+    passengers = trip.data.get('passenger_data') or {}
+    # Infants in lap don't take a seat
+    party_size = sum(passengers.get(key) or 0 for key in SEATED_PASSENGER_KEYS)
+
+    return [Segment(
+        carrier=segment['carrier'],
+        number=segment['number'],
+        booking_code=segment['booking_code'],
+        aircraft=leg['aircraft'],
+        origin=leg['origin'],
+        destination=leg['destination'],
+        departure_time=leg['departure_time'][:16],
+        arrival_time=leg['arrival_time'][:16],
+        party_size=party_size)
+        for trip_slice in trip.data['trip_data']['slice']
+        for segment in trip_slice['segment']
+        for leg in segment['leg']]
+
+
+def trip_passenger_types(trip):
+    """
+    (code, quantity) pairs for each type of passenger on the trip.
+    """
+    passengers = trip.data.get('passenger_data') or {}
+    return [(code, passengers[key]) for key, code in PASSENGER_TYPE_CODES if passengers.get(key)]
 
+
+def base_context(token=None):
     context = {
+        "PCC": settings.SABRE_PCC,
         "EMAIL": settings.EMAIL_HOST_USER,
-        "USERNAME": settings.SABRE_USERNAME,
-        "PASSWORD": settings.SABRE_PASSWORD,
-        "PCC": "PPC",
-        "DOMAIN": "DEFAULT"
     }
+    if token is not None:
+        context["TOKEN"] = token
+    return context
+
+
+def start_sabre_session():
+    """
+    Sends xml-formatted SOAP request to start Sabre session
+    Returns the session token
+    """
+    context = dict(base_context(),
+        USERNAME=settings.SABRE_USERNAME,
+        PASSWORD=settings.SABRE_PASSWORD,
+        DOMAIN="DEFAULT")
+
+    soap_req = render_template('start_session.xml', context)
+
+    response = post_soap('SessionCreateRQ', soap_req)
+    check_fault(response.content)
 
-    template = env.get_template('start_session.xml')
-    soap_req = template.render(context)
+    from xml.etree import ElementTree
 
-    headers = {'content-type': 'text/xml'}
-    response = requests.post(settings.SABRE_TESTING_URL, data=soap_req, headers=headers)
-    print(response.status_code)
-    print(response.content)
-    # will get sabre token
-    token = response
-    return token
+    token = ElementTree.fromstring(response.content).findtext(
+        './/{0}BinarySecurityToken'.format(SECEXT_NS))
+    if not token:
+        raise SabreError('Sabre did not return a session token.')
+    return token.strip()
 
 def close_sabre_session(token):
     """
     Sends xml-formatted SOAP request to close Sabre session
-    Eventually will implement a refresh session to stop token timeout after 15 min
+    Sessions time out after 15 min, see sabre.sessions for keeping them alive
     """
-    env = Environment(loader=PackageLoader('sabre', 'templates'))
+    context = base_context(token)
 
-    context = {
-        "PCC": "PPC",
-        "EMAIL": settings.EMAIL_HOST_USER,
-        "TOKEN": token
-    }
+    soap_req = render_template('close_session.xml', context)
 
-    template = env.get_template('close_session.xml')
-    soap_req = template.render(context)
+    response = post_soap('SessionCloseRQ', soap_req)
+    check_fault(response.content)
 
-    headers = {'content-type': 'text/xml'}
-    response = requests.post(settings.SABRE_TESTING_URL, data=soap_req, headers=headers)
-    print(response.status_code)
-    print(response.content)
+
+def ping_sabre_session(token):
+    """
+    Sends xml-formatted SOAP request to keep a Sabre session from timing out
+    Raises InvalidSessionError if it already has
+    """
+    context = dict(base_context(token),
+        TIMESTAMP=timezone.now().strftime('%Y-%m-%dT%H:%M:%S'))
+
+    soap_req = render_template('ping_session.xml', context)
+
+    response = post_soap('OTA_PingRQ', soap_req)
+    check_fault(response.content)
 
 
 def check_air_availability(token, trip):
     """
     Sends xml-formatted SOAP request to check trip availability with Sabre
+    Returns the AvailableFlights Sabre listed
+    See sabre.availability for checking each segment concurrently
     """
-    env = Environment(loader=PackageLoader('sabre', 'templates'))
+    return check_segments_availability(token, trip_segments(trip))
 
-    context = {
-        "PCC": "PPC",
-        "EMAIL": settings.EMAIL_HOST_USER,
-        "TOKEN": token,
-        "TRIP": trip
-    }
 
-    template = env.get_template('check_air_availability.xml')
-    soap_req = template.render(context)
-    print(soap_req)
+def check_segments_availability(token, segments):
+    """
+    Sends xml-formatted SOAP request to check availability of some Segments
+    Returns the AvailableFlights Sabre listed
+    """
+    context = dict(base_context(token), SEGMENTS=segments)
+
+    soap_req = render_template('check_air_availability.xml', context)
+
+    response = post_soap('OTA_AirAvailLLSRQ', soap_req)
+    check_fault(response.content)
 
-    headers = {'content-type': 'text/xml'}
-    response = requests.post(settings.SABRE_TESTING_URL, data=soap_req, headers=headers)
-    import pprint
-    pprint.pprint(response.status_code)
-    pprint.pprint(response.content)
+    availability = decode_availability(response.content)
+    if availability.errors:
+        raise SabreError('; '.join(availability.errors))
+    return availability.flights
 
 
 def book_air_segment(token, trip):
     """
     Sends xml-formatted SOAP request to book a flight with Sabre
+    Returns a BookedSegment per segment, check is_sold on each
     """
-    env = Environment(loader=PackageLoader('sabre', 'templates'))
+    context = dict(base_context(token), SEGMENTS=trip_segments(trip))
 
-    context = {
-        "PCC": "PPC",
-        "EMAIL": settings.EMAIL_HOST_USER,
-        "TOKEN": token,
-        "TRIP": trip
-    }
+    soap_req = render_template('book_air_segment.xml', context)
+
+    response = post_soap('OTA_AirBookLLSRQ', soap_req)
+    check_fault(response.content)
+
+    booking = decode_booking(response.content)
+    if booking.errors:
+        raise SabreError('; '.join(booking.errors))
+    return booking.segments
+
+
+def add_passenger_names(token, passengers, phone=None):
+    """
+    Sends xml-formatted SOAP request to add the passengers' names, and a
+    contact phone number, to the PNR in the session's work area
+    """
+    context = dict(base_context(token), PASSENGERS=passengers, PHONE=phone)
+
+    soap_req = render_template('add_passenger_names.xml', context)
+
+    response = post_soap('TravelItineraryAddInfoLLSRQ', soap_req)
+    check_fault(response.content)
+
+    errors = decode_errors(response.content)
+    if errors:
+        raise SabreError('; '.join(errors))
+
+
+def price_itinerary(token, trip):
+    """
+    Sends xml-formatted SOAP request to price the itinerary in the session's
+    work area and store the price quote in its PNR
+    """
+    context = dict(base_context(token), PASSENGER_TYPES=trip_passenger_types(trip))
+
+    soap_req = render_template('price_itinerary.xml', context)
+
+    response = post_soap('OTA_AirPriceLLSRQ', soap_req)
+    check_fault(response.content)
+
+    errors = decode_errors(response.content)
+    if errors:
+        raise SabreError('; '.join(errors))
+
+
+def end_transaction(token):
+    """
+    Sends xml-formatted SOAP request to store the PNR in the session's work
+    area, which empties it
+    Returns the PNR's record locator
+    """
+    soap_req = render_template('end_transaction.xml', base_context(token))
+
+    response = post_soap('EndTransactionLLSRQ', soap_req)
+    check_fault(response.content)
+
+    end = decode_end_transaction(response.content)
+    if end.errors:
+        raise SabreError('; '.join(end.errors))
+    if not end.record_locator:
+        raise SabreUnexpectedAnswer('Sabre did not return a record locator.')
+    return end.record_locator
+
+
+def ignore_transaction(token):
+    """
+    Sends xml-formatted SOAP request to drop whatever the session's work area
+    holds, such as segments sold into a PNR that was never ended
+    """
+    soap_req = render_template('ignore_transaction.xml', base_context(token))
+
+    response = post_soap('IgnoreTransactionLLSRQ', soap_req)
+    check_fault(response.content)
+
+    errors = decode_errors(response.content)
+    if errors:
+        raise SabreError('; '.join(errors))
+
+
+def retrieve_itinerary(token, record_locator):
+    """
+    Sends xml-formatted SOAP request to load a stored PNR into the session's
+    work area
+    """
+    context = dict(base_context(token), RECORD_LOCATOR=record_locator)
+
+    soap_req = render_template('retrieve_itinerary.xml', context)
+
+    response = post_soap('TravelItineraryReadLLSRQ', soap_req)
+    check_fault(response.content)
+
+    errors = decode_errors(response.content)
+    if errors:
+        raise SabreError('; '.join(errors))
+
+
+def issue_tickets(token):
+    """
+    Sends xml-formatted SOAP request to ticket the PNR in the session's work
+    area against its stored price quote, see retrieve_itinerary
+    """
+    soap_req = render_template('issue_tickets.xml', base_context(token))
 
-    template = env.get_template('book_air_segment.xml')
-    soap_req = template.render(context)
-    print(soap_req)
+    response = post_soap('AirTicketLLSRQ', soap_req)
+    check_fault(response.content)
 
-    headers = {'content-type': 'text/xml'}
-    response = requests.post(settings.SABRE_TESTING_URL, data=soap_req, headers=headers)
-    print(response.status_code)
-    print(response.content)
+    errors = decode_errors(response.content)
+    if errors:
+        raise SabreError('; '.join(errors))
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from quotas.utils import BACKGROUND, background, current_priority
+from sabre.availability import AvailabilityDeadlineExceeded, check_segments, is_segment_available
+from sabre.availability_cache import AvailabilityCache
+from sabre.responses import AvailableFlight
+from sabre.soap_requests import SabreError, Segment
+
+
+def segment(number, booking_code='Y', party_size=2):
+    return Segment(carrier='NK', number=number, booking_code=booking_code, aircraft='320',
+        origin='ORD', destination='DEN', departure_time='2016-02-16T12:25',
+        arrival_time='2016-02-16T14:04', party_size=party_size)
+
+
+def flight(number, seats):
+    return AvailableFlight(carrier='NK', number=number, origin='ORD', destination='DEN',
+        departure_time='02-16T12:25', arrival_time='02-16T14:04', booking_classes=(('Y', seats),))
+
+
+class FakeSabre:
+    """
+    Stands in for SessionPool.call, answering each segment's check with the
+    seats in seats after delay seconds.
+    """
+
+    def __init__(self, seats, delays=None):
+        self.seats = seats
+        self.delays = delays or {}
+        self.checked = []
+        self.priorities = []
+        self.lock = threading.Lock()
+
+    def __call__(self, func, segments):
+        number = segments[0].number
+        with self.lock:
+            self.checked.append(number)
+            self.priorities.append(current_priority())
+        time.sleep(self.delays.get(number, 0))
+        seats = self.seats[number]
+        if isinstance(seats, Exception):
+            raise seats
+        return [flight('0' + number, seats)]
+
+
+@pytest.yield_fixture(scope="function")
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture(scope="function")
+def cache():
+    return AvailabilityCache(ttl=60, negative_ttl=10, max_size=100)
+
+
+def test_is_segment_available_matches_flight_and_seats():
+    assert is_segment_available(segment('847'), [flight('0847', 2)])
+    assert not is_segment_available(segment('847'), [flight('0847', 1)])
+    assert not is_segment_available(segment('847', booking_code='B'), [flight('0847', 9)])
+    assert not is_segment_available(segment('847'), [flight('848', 9)])
+
+
+def test_all_segments_available(executor, cache):
+    sabre = FakeSabre({'1': 9, '2': 9, '3': 9})
+
+    assert check_segments([segment('1'), segment('2'), segment('3')], 5, sabre, executor, cache)
+    assert sorted(sabre.checked) == ['1', '2', '3']
+
+
+def test_unavailable_segment_cancels_the_rest(executor, cache):
+    sabre = FakeSabre({'1': 0, '2': 9, '3': 9, '4': 9}, delays={'2': 0.2})
+
+    start = time.monotonic()
+    assert not check_segments([segment(n) for n in '1234'], 5, sabre, executor, cache)
+    assert time.monotonic() - start < 0.2
+
+    executor.shutdown(wait=True)
+    assert '3' not in sabre.checked and '4' not in sabre.checked
+
+
+def test_deadline(executor, cache):
+    sabre = FakeSabre({'1': 9, '2': 9}, delays={'2': 0.5})
+
+    with pytest.raises(AvailabilityDeadlineExceeded):
+        check_segments([segment('1'), segment('2')], 0.1, sabre, executor, cache)
+
+
+def test_sabre_errors_are_raised(executor, cache):
+    sabre = FakeSabre({'1': 9, '2': SabreError('NO AVAILABILITY')})
+
+    with pytest.raises(SabreError):
+        check_segments([segment('1'), segment('2')], 5, sabre, executor, cache)
+
+
+def test_cached_answers_skip_sabre(executor, cache):
+    sabre = FakeSabre({'1': 9, '2': 9})
+    check_segments([segment('1'), segment('2')], 5, sabre, executor, cache)
+
+    assert check_segments([segment('1'), segment('2')], 5, sabre, executor, cache)
+    assert len(sabre.checked) == 2
+    assert cache.stats()['hits'] == 2
+
+
+def test_checks_keep_the_callers_priority(executor, cache):
+    sabre = FakeSabre({'1': 9, '2': 9})
+
+    with background():
+        check_segments([segment('1'), segment('2')], 5, sabre, executor, cache, hedge=True)
+    assert sabre.priorities == [BACKGROUND, BACKGROUND]
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from sabre.availability_cache import AvailabilityCache
+from sabre.soap_requests import SabreError, Segment
+
+
+SEGMENT = Segment(carrier='NK', number='847', booking_code='Y', aircraft='320',
+    origin='ORD', destination='DEN', departure_time='2016-02-16T12:25',
+    arrival_time='2016-02-16T14:04', party_size=2)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return Clock()
+
+
+@pytest.fixture(scope="function")
+def cache(clock):
+    return AvailabilityCache(ttl=60, negative_ttl=10, max_size=2, clock=clock)
+
+
+def test_hit_until_ttl(cache, clock):
+    calls = []
+    check = lambda: calls.append(1) or True
+
+    assert cache.get_or_check(SEGMENT, check)
+    clock.now = 59
+    assert cache.get_or_check(SEGMENT._replace(number='0847'), check)
+    clock.now = 61
+    assert cache.get_or_check(SEGMENT, check)
+
+    assert len(calls) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_negative_answers_expire_sooner(cache, clock):
+    calls = []
+    check = lambda: calls.append(1) and False
+
+    assert not cache.get_or_check(SEGMENT, check)
+    clock.now = 9
+    assert not cache.get_or_check(SEGMENT, check)
+    clock.now = 11
+    cache.get_or_check(SEGMENT, check)
+
+    assert len(calls) == 2
+    assert cache.stats()['negative_hits'] == 1
+
+
+def test_party_size_is_part_of_the_key(cache):
+    cache.get_or_check(SEGMENT, lambda: True)
+
+    assert not cache.get_or_check(SEGMENT._replace(party_size=5), lambda: False)
+
+
+def test_errors_are_not_cached(cache):
+    def fail():
+        raise SabreError('down')
+
+    with pytest.raises(SabreError):
+        cache.get_or_check(SEGMENT, fail)
+    assert cache.get_or_check(SEGMENT, lambda: True)
+
+
+def test_evicts_oldest_over_max_size(cache):
+    for number in ('1', '2', '3'):
+        cache.get_or_check(SEGMENT._replace(number=number), lambda: True)
+
+    assert cache.stats()['size'] == 2
+    assert not cache.get_or_check(SEGMENT._replace(number='1'), lambda: False)
+
+
+def test_concurrent_lookups_share_one_check(cache):
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def check():
+        calls.append(1)
+        release.wait(5)
+        return True
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_check(SEGMENT, check)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()['shared'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    shared = cache.stats()['shared']
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert shared == 4
+    assert calls == [1]
+    assert results == [True] * 5
+    assert cache.stats()['hit_rate'] == 0.8
@@ -0,0 +1,171 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from sabre import transport
+from sabre.exceptions import SabreError, SabreTimeout, SabreTransportError, SabreUnavailable
+from sabre.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, hedged
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Killed(BaseException):
+    """
+    Stands in for GreenletExit and other exits that aren't errors.
+    """
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """
+    Answers each post with the next item in replies, raising it if it's an
+    exception.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.posts = 0
+
+    def post(self, url, data, timeout):
+        self.posts += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, BaseException):
+            raise reply
+        return reply
+
+
+@pytest.yield_fixture(scope="function")
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture(scope="function")
+def sabre(monkeypatch, settings):
+    settings.SABRE_RETRY_BACKOFF_SECONDS = 0
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=30)
+    monkeypatch.setattr(transport, 'get_breaker', lambda: breaker)
+    monkeypatch.setattr(transport, 'acquire', lambda name: 0)
+    monkeypatch.setattr(transport, 'metrics', transport.CallMetrics())
+
+    def serve(*replies):
+        session = FakeSession(replies)
+        monkeypatch.setattr(transport, 'get_http_session', lambda: session)
+        return session
+    serve.breaker = breaker
+    return serve
+
+
+def test_breaker_opens_and_half_opens():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=30, clock=clock)
+
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 30
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_hedged_skips_the_hedge_for_fast_calls(executor):
+    calls = []
+    assert hedged(lambda: calls.append(1) or 'first', 1, executor) == 'first'
+    assert calls == [1]
+
+
+def test_hedged_returns_the_faster_call(executor):
+    delays = [0.5, 0]
+    hedges = []
+
+    def call():
+        time.sleep(delays.pop(0))
+        return 'answer'
+
+    assert hedged(call, 0.05, executor, on_hedge=hedges.append) == 'answer'
+    assert hedges == [True]
+
+
+def test_hedged_raises_when_both_fail(executor):
+    def call():
+        time.sleep(0.1)
+        raise SabreError('down')
+
+    with pytest.raises(SabreError):
+        hedged(call, 0.01, executor)
+
+
+def test_reads_are_retried(sabre):
+    session = sabre(requests.ConnectionError(), Response(503), Response(200))
+
+    assert transport.post_soap('OTA_AirAvailLLSRQ', '<x/>').status_code == 200
+    assert session.posts == 3
+    assert transport.metrics.snapshot()['OTA_AirAvailLLSRQ']['outcomes'] == {
+        'error': 2, 'retried': 2, 'ok': 1}
+
+
+def test_bookings_are_sent_once(sabre):
+    session = sabre(requests.ReadTimeout(), Response(200))
+
+    with pytest.raises(SabreTimeout):
+        transport.post_soap('OTA_AirBookLLSRQ', '<x/>')
+    assert session.posts == 1
+
+
+def test_soap_faults_keep_the_breaker_closed(sabre):
+    sabre(*[Response(500)] * 5)
+
+    for _ in range(5):
+        assert transport.post_soap('OTA_AirBookLLSRQ', '<x/>').status_code == 500
+    assert sabre.breaker.state == CLOSED
+
+
+def test_open_breaker_fails_fast(sabre):
+    session = sabre(*[Response(502)] * 3)
+
+    with pytest.raises(SabreTransportError):
+        transport.post_soap('OTA_AirAvailLLSRQ', '<x/>')
+    with pytest.raises(SabreUnavailable):
+        transport.post_soap('OTA_AirAvailLLSRQ', '<x/>')
+    assert session.posts == 3
+    assert transport.metrics.snapshot()['OTA_AirAvailLLSRQ']['outcomes']['short_circuited'] == 1
+
+
+def test_half_open_trial_ends_on_any_exception(sabre, monkeypatch):
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30, clock=clock)
+    monkeypatch.setattr(transport, 'get_breaker', lambda: breaker)
+    breaker.failure()
+    clock.now = 30
+    sabre(Killed(), RuntimeError('adapter bug'))
+
+    with pytest.raises(Killed):
+        transport.post_soap('OTA_AirBookLLSRQ', '<x/>')
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    with pytest.raises(RuntimeError):
+        transport.post_soap('OTA_AirBookLLSRQ', '<x/>')
+    assert breaker.state == OPEN
@@ -0,0 +1,59 @@
+import os
+
+from sabre.responses import decode_availability, decode_booking, decode_end_transaction
+
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+
+FAILED_RESULTS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/"><soap-env:Body>
+<OTA_AirAvailRS xmlns="http://webservices.sabre.com/sabreXML/2011/10" xmlns:stl="http://services.sabre.com/STL/v01">
+<stl:ApplicationResults status="NotProcessed"><stl:Error type="BusinessLogic">
+<stl:SystemSpecificResults><stl:Message>NO AVAILABILITY FOR THIS CITY PAIR</stl:Message></stl:SystemSpecificResults>
+</stl:Error></stl:ApplicationResults></OTA_AirAvailRS></soap-env:Body></soap-env:Envelope>'''
+
+
+def sample(name):
+    with open(os.path.join(SAMPLES_DIR, name), 'rb') as sample_file:
+        return sample_file.read()
+
+
+def test_decode_availability():
+    availability = decode_availability(sample('OTA_AirAvailRS.xml'))
+
+    assert availability.errors == ()
+    assert [(f.carrier, f.number, f.origin, f.destination) for f in availability.flights] == [
+        ('NK', '847', 'ORD', 'DEN'), ('UA', '1217', 'ORD', 'DEN'),
+        ('AA', '2215', 'ORD', 'STL'), ('AA', '1441', 'STL', 'DEN')]
+    first = availability.flights[0]
+    assert first.departure_time == '02-16T12:25'
+    assert first.seats('B') == 4
+    assert first.seats('M') == 0
+    assert first.seats('F') == 0
+
+
+def test_decode_availability_from_a_file():
+    with open(os.path.join(SAMPLES_DIR, 'OTA_AirAvailRS.xml'), 'rb') as sample_file:
+        assert len(decode_availability(sample_file).flights) == 4
+
+
+def test_decode_errors():
+    availability = decode_availability(FAILED_RESULTS)
+
+    assert availability.flights == []
+    assert availability.errors == ('NO AVAILABILITY FOR THIS CITY PAIR',)
+
+
+def test_decode_booking():
+    booking = decode_booking(sample('OTA_AirBookRS.xml'))
+
+    assert booking.errors == ()
+    assert [(s.number, s.party_size, s.status, s.is_sold) for s in booking.segments] == [
+        ('0847', 2, 'NN', True), ('0630', 2, 'UC', False)]
+
+
+def test_decode_end_transaction():
+    end = decode_end_transaction(sample('EndTransactionRS.xml'))
+
+    assert end.errors == ()
+    assert end.record_locator == 'QWXJTB'
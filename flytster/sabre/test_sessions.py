@@ -0,0 +1,128 @@
+import time
+
+import pytest
+
+from sabre.exceptions import SabreTransportError
+from sabre.sessions import SessionPool, SessionPoolTimeout
+from sabre.soap_requests import InvalidSessionError
+
+
+class FakeSabre:
+    def __init__(self):
+        self.started = 0
+        self.closed = []
+        self.pinged = []
+        self.ignored = []
+        self.ignore_fails = False
+        self.dead = set()
+
+    def start(self):
+        self.started += 1
+        return 'token{0}'.format(self.started)
+
+    def close(self, token):
+        self.closed.append(token)
+
+    def ignore(self, token):
+        self.ignored.append(token)
+        if self.ignore_fails:
+            raise SabreTransportError('Sabre IgnoreTransactionLLSRQ timed out')
+
+    def ping(self, token):
+        self.pinged.append(token)
+        if token in self.dead:
+            raise InvalidSessionError('Invalid or Expired binary security token')
+
+
+@pytest.fixture(scope="function")
+def sabre():
+    return FakeSabre()
+
+
+def make_pool(sabre, max_size=2, refresh_after=600, timeout=0.1):
+    return SessionPool(max_size, refresh_after, timeout,
+                       start=sabre.start, close=sabre.close, ping=sabre.ping, ignore=sabre.ignore)
+
+
+def test_session_is_reused(sabre):
+    pool = make_pool(sabre)
+    with pool.session() as first:
+        pass
+    with pool.session() as second:
+        pass
+    assert first == second
+    assert sabre.started == 1
+
+def test_borrow_waits_then_times_out_at_max_size(sabre):
+    pool = make_pool(sabre, max_size=1)
+    with pool.session():
+        with pytest.raises(SessionPoolTimeout):
+            pool.borrow()
+    assert sabre.started == 1
+
+def test_invalid_session_is_replaced(sabre):
+    pool = make_pool(sabre)
+    with pytest.raises(InvalidSessionError):
+        with pool.session():
+            raise InvalidSessionError('expired')
+    with pool.session() as token:
+        assert token == 'token2'
+
+def test_call_retries_on_fresh_session(sabre):
+    pool = make_pool(sabre)
+    tokens = []
+
+    def operation(token):
+        tokens.append(token)
+        if len(tokens) == 1:
+            raise InvalidSessionError('expired')
+        return token
+
+    assert pool.call(operation) == 'token2'
+    assert tokens == ['token1', 'token2']
+
+def test_refresh_pings_idle_sessions_and_drops_dead_ones(sabre):
+    pool = make_pool(sabre, refresh_after=0)
+    with pool.session():
+        with pool.session():
+            pass
+    sabre.dead.add('token2')
+    time.sleep(0.01)
+
+    pool.refresh()
+
+    assert sorted(sabre.pinged) == ['token1', 'token2']
+    with pool.session() as token:
+        assert token == 'token1'
+    with pool.session() as token:
+        with pool.session() as other:
+            assert other == 'token3'
+
+def test_closeall_closes_idle_sessions(sabre):
+    pool = make_pool(sabre)
+    with pool.session():
+        pass
+    pool.closeall()
+    assert sabre.closed == ['token1']
+
+def test_transaction_ignores_the_work_area_before_release(sabre):
+    pool = make_pool(sabre)
+    with pool.transaction() as token:
+        pass
+    with pytest.raises(ValueError):
+        with pool.transaction():
+            raise ValueError('the booking failed')
+
+    assert sabre.ignored == [token, token]
+    with pool.session() as second:
+        assert second == token
+
+def test_transaction_closes_a_session_it_cannot_ignore(sabre):
+    pool = make_pool(sabre)
+    sabre.ignore_fails = True
+    with pool.transaction() as token:
+        pass
+
+    assert sabre.closed == [token]
+    with pool.session() as second:
+        assert second != token
@@ -0,0 +1,50 @@
+import pytest
+
+from sabre import soap_requests
+
+
+TRIP_DATA = {
+    "passenger_data": {"adult_count": 2, "child_count": 1, "infant_in_lap_count": 1},
+    "trip_data": {"slice": [
+        {"segment": [{
+            "carrier": "NK", "number": "847", "booking_code": "Y", "leg": [{
+                "aircraft": "320", "arrival_time": "2016-02-16T14:04-07:00",
+                "departure_time": "2016-02-16T12:25-06:00", "origin": "ORD", "destination": "DEN"}]}]},
+        {"segment": [{
+            "carrier": "NK", "number": "630", "booking_code": "Y", "leg": [{
+                "aircraft": "320", "arrival_time": "2016-02-17T17:06-06:00",
+                "departure_time": "2016-02-17T13:35-07:00", "origin": "DEN", "destination": "ORD"}]}]}
+    ]}
+}
+
+
+class StoredTrip:
+    data = TRIP_DATA
+
+
+@pytest.fixture(scope="function")
+def context():
+    return dict(soap_requests.base_context('token'),
+        SEGMENTS=soap_requests.trip_segments(StoredTrip()))
+
+
+def test_trip_segments_keep_local_times_and_count_seats():
+    segments = soap_requests.trip_segments(StoredTrip())
+
+    assert [(s.origin, s.destination) for s in segments] == [('ORD', 'DEN'), ('DEN', 'ORD')]
+    assert segments[0].departure_time == '2016-02-16T12:25'
+    assert segments[0].arrival_time == '2016-02-16T14:04'
+    assert all(s.party_size == 3 for s in segments)
+
+
+@pytest.mark.parametrize('name', ['check_air_availability.xml', 'book_air_segment.xml'])
+def test_render_fills_pcc_and_segments(name, context, settings):
+    envelope = soap_requests.render_template(name, context)
+
+    assert '<eb:CPAId>{0}</eb:CPAId>'.format(settings.SABRE_PCC) in envelope
+    assert envelope.count('<FlightSegment ') == 2
+    assert 'NumberInParty="3"' in envelope
+
+
+def test_environment_is_shared():
+    assert soap_requests.get_environment() is soap_requests.get_environment()
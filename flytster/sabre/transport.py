@@ -0,0 +1,214 @@
+"""
+One keep-alive HTTP session per process for every call to Sabre, so calls
+reuse pooled TCP+TLS connections instead of opening one each. requests is
+imported when the session is first needed.
+
+Each call takes a token from the shared Sabre quota in quotas.utils, gets
+its action's read timeout, goes through the circuit breaker in
+sabre.resilience and is counted in metrics by outcome.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from quotas.utils import QuotaTimeout, acquire
+
+from .exceptions import SabreTimeout, SabreTransportError, SabreUnavailable
+from .resilience import backoff, get_breaker
+
+
+logger = logging.getLogger(__name__)
+
+SOAP_HEADERS = {'content-type': 'text/xml'}
+
+QUOTA_NAME = 'sabre'
+
+# Actions that only read, so are safe to send again
+IDEMPOTENT_ACTIONS = frozenset(['OTA_AirAvailLLSRQ', 'OTA_PingRQ'])
+
+GATEWAY_ERRORS = frozenset([502, 503, 504])
+
+ANSWERED_OUTCOMES = frozenset(['ok', 'fault'])
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def build_http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.packages.urllib3.util.retry import Retry
+
+    # Only failures to connect are retried. A request that reached Sabre
+    # might have booked something, so POSTs are never resent after that.
+    retries = Retry(total=settings.SABRE_HTTP_RETRIES, connect=settings.SABRE_HTTP_RETRIES,
+                    read=0, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.SABRE_HTTP_POOL_SIZE,
+                          max_retries=retries)
+
+    session = requests.Session()
+    session.headers.update(SOAP_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session():
+    """
+    The session for this process. One inherited across a fork is replaced,
+    since its sockets belong to the parent.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session, _session_pid = build_http_session(), os.getpid()
+        return _session
+
+
+class CallMetrics(object):
+    """
+    Per action counts of each call outcome and the latency of calls Sabre
+    answered, for this process. The latest LATENCY_SAMPLES latencies are
+    kept for percentiles.
+    """
+
+    LATENCY_SAMPLES = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._actions = {}
+
+    def _stats(self, action):
+        stats = self._actions.get(action)
+        if stats is None:
+            stats = self._actions[action] = {
+                'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'outcomes': {},
+                'latencies': deque(maxlen=self.LATENCY_SAMPLES)}
+        return stats
+
+    def record(self, action, seconds, outcome='ok'):
+        with self._lock:
+            stats = self._stats(action)
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+            if outcome in ANSWERED_OUTCOMES:
+                stats['latencies'].append(seconds)
+
+    def count(self, action, outcome):
+        """
+        Counts an outcome that isn't a call of its own, like a retry or a
+        call the circuit breaker refused.
+        """
+        with self._lock:
+            outcomes = self._stats(action)['outcomes']
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def percentile(self, action, fraction, min_samples=20):
+        """
+        The latency below which fraction of recent answered calls fell, or
+        None until there are min_samples of them.
+        """
+        with self._lock:
+            latencies = sorted(self._stats(action)['latencies'])
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)]
+
+    def snapshot(self):
+        with self._lock:
+            actions = {action: dict(stats, outcomes=dict(stats['outcomes']),
+                                    latencies=list(stats['latencies']))
+                       for action, stats in self._actions.items()}
+        for action, stats in actions.items():
+            latencies = sorted(stats.pop('latencies'))
+            stats['avg_seconds'] = stats['seconds'] / stats['calls'] if stats['calls'] else 0.0
+            stats['p50_seconds'] = latencies[len(latencies) // 2] if latencies else None
+            stats['p95_seconds'] = latencies[int(len(latencies) * 0.95)] if latencies else None
+        return actions
+
+
+metrics = CallMetrics()
+
+
+def read_timeout(action):
+    return settings.SABRE_READ_TIMEOUTS.get(action, settings.SABRE_READ_TIMEOUT_SECONDS)
+
+
+def post_soap(action, soap_req):
+    """
+    POSTs a SOAP envelope to Sabre on the shared session. Calls fail fast
+    with SabreUnavailable while the circuit breaker is open. Actions in
+    IDEMPOTENT_ACTIONS are retried after a transport error, with jittered
+    backoff; others are sent once, since Sabre may have acted on them.
+    Raises SabreTransportError, or SabreTimeout, when no SOAP answer came.
+    """
+    attempts = 1
+    if action in IDEMPOTENT_ACTIONS:
+        attempts += settings.SABRE_READ_RETRIES
+
+    for attempt in range(attempts):
+        if attempt:
+            metrics.count(action, 'retried')
+            time.sleep(backoff(attempt, settings.SABRE_RETRY_BACKOFF_SECONDS))
+        try:
+            return _post_once(action, soap_req)
+        except SabreTransportError:
+            if attempt == attempts - 1:
+                raise
+
+
+def _post_once(action, soap_req):
+    import requests
+
+    # Before the breaker, so a trial call it lets through is always made
+    try:
+        waited = acquire(QUOTA_NAME)
+    except QuotaTimeout as e:
+        metrics.count(action, 'throttled')
+        raise SabreUnavailable(str(e))
+    if waited:
+        metrics.count(action, 'queued')
+
+    breaker = get_breaker()
+    if not breaker.allow():
+        metrics.count(action, 'short_circuited')
+        raise SabreUnavailable('Not calling Sabre for {0}s after repeated failures.'.format(
+            breaker.reset_after))
+
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = get_http_session().post(
+            settings.SABRE_TESTING_URL, data=soap_req,
+            timeout=(settings.SABRE_CONNECT_TIMEOUT_SECONDS, read_timeout(action)))
+    except requests.Timeout as e:
+        outcome = 'timeout'
+        breaker.failure()
+        raise SabreTimeout('Sabre {0} timed out: {1}'.format(action, e))
+    except requests.RequestException as e:
+        breaker.failure()
+        raise SabreTransportError('Sabre {0} failed: {1}'.format(action, e))
+    except BaseException:
+        # Anything else, down to GreenletExit, still ends a half-open trial
+        breaker.failure()
+        raise
+    else:
+        if response.status_code in GATEWAY_ERRORS:
+            breaker.failure()
+            raise SabreTransportError('Sabre {0} answered HTTP {1}.'.format(
+                action, response.status_code))
+        # SOAP faults come back as HTTP 500 too, but mean Sabre is up
+        outcome = 'fault' if response.status_code >= 400 else 'ok'
+        breaker.success()
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.record(action, seconds, outcome)
+        logger.debug('Sabre %s took %.1f ms (%s)', action, seconds * 1000, outcome)
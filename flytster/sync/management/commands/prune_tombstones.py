@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flytster.routers import shard_aliases
+from sync.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Deletes tombstones older than SYNC_TOMBSTONE_EXP_IN_DAYS.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_EXP_IN_DAYS)
+        count = 0
+        for using in shard_aliases():
+            deleted, _ = Tombstone.objects.using(using).filter(deleted__lt=cutoff).delete()
+            count += deleted
+        self.stdout.write('Deleted {0} tombstones.'.format(count))
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from passengers.models import Passenger
+from trips.models import Trip
+
+
+MODEL_CHOICES = (
+    ("trip", "trip"),
+    ("passenger", "passenger"))
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted Trip or Passenger so clients can drop it on their next sync.
+    The user key has no database constraint so tombstones written while a user
+    is being deleted don't block the delete.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='tombstones', db_constraint=False)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    deleted = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = u'Tombstone'
+        verbose_name_plural = u'Tombstones'
+        ordering = ['deleted']
+
+    def __str__(self):
+        return '{0} {1}'.format(self.model, self.object_id)
+
+
+@receiver(post_delete, sender=Trip)
+def trip_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(user_id=instance.user_id, model='trip', object_id=instance.id)
+
+
+@receiver(post_delete, sender=Passenger)
+def passenger_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(user_id=instance.user_id, model='passenger', object_id=instance.id)
@@ -0,0 +1,128 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+import time
+from datetime import timedelta
+
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+from rest_framework import status
+
+from users.models import FlytsterUser
+from passengers.models import Passenger
+from trips.models import Trip, TripStatus
+from sync.utils import encode_watermark, decode_watermark
+
+
+class SyncSetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create()
+        )
+        self.passenger = Passenger.objects.create(
+            user=self.user,
+            trip=self.trip,
+            first_name='Drew',
+            last_name='Brees',
+            gender='M',
+            birthdate='1979-01-15'
+        )
+
+        self.url_sync = reverse('sync')
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return SyncSetupFixture()
+
+
+def test_watermark_round_trip():
+    moment = timezone.now()
+    assert decode_watermark(encode_watermark(moment)) == moment
+
+def test_full_sync(setup):
+    response = setup.client.get(setup.url_sync, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert [t['id'] for t in response.data['trips']] == [setup.trip.id]
+    assert [p['id'] for p in response.data['passengers']] == [setup.passenger.id]
+    assert response.data['deleted'] == {'trips': [], 'passengers': []}
+    assert 'watermark' in response.data
+
+def test_sync_since_no_changes(setup):
+    since = encode_watermark(timezone.now())
+    response = setup.client.get(setup.url_sync, {'since': since}, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['trips'] == []
+    assert response.data['passengers'] == []
+    assert response.data['watermark'] == since
+
+def test_sync_status_change(setup):
+    since = encode_watermark(timezone.now())
+    setup.trip.status.is_passenger_ready = True
+    setup.trip.status.save()
+
+    response = setup.client.get(setup.url_sync, {'since': since}, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert [t['id'] for t in response.data['trips']] == [setup.trip.id]
+    assert response.data['trips'][0]['status']['is_passenger_ready'] is True
+
+def test_sync_deletions(setup):
+    since = encode_watermark(timezone.now())
+    trip_id, passenger_id = setup.trip.id, setup.passenger.id
+    setup.trip.delete()
+
+    response = setup.client.get(setup.url_sync, {'since': since}, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['trips'] == []
+    assert response.data['deleted'] == {'trips': [trip_id], 'passengers': [passenger_id]}
+
+def test_sync_late_commits(transactional_db, setup, settings):
+    settings.SYNC_WATERMARK_OVERLAP_SECONDS = 0
+    other = connections['default'].copy()
+    try:
+        # Another request saves the trip, then commits after this sync
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            time.sleep(0.01)
+            cursor.execute('UPDATE trips_trip SET data = %s, updated = %s WHERE id = %s',
+                ['{"fake": "late"}', timezone.now(), setup.trip.id])
+        time.sleep(0.01)
+
+        response = setup.client.get(setup.url_sync, **setup.auth)
+        watermark = response.data['watermark']
+        other.commit()
+    finally:
+        other.close()
+
+    response = setup.client.get(setup.url_sync, {'since': watermark}, **setup.auth)
+    assert [t['id'] for t in response.data['trips']] == [setup.trip.id]
+
+def test_sync_bad_watermark(setup):
+    response = setup.client.get(setup.url_sync, {'since': 'yesterday'}, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_sync_expired_watermark(setup):
+    since = encode_watermark(timezone.now() - timedelta(days=365))
+    response = setup.client.get(setup.url_sync, {'since': since}, **setup.auth)
+    assert response.status_code == status.HTTP_410_GONE
+
+def test_sync_no_auth(setup):
+    response = setup.client.get(setup.url_sync)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Idle connections, pooled ones included, have no xact_start
+OLDEST_TRANSACTION_SQL = '''
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()'''
+
+
+class InvalidWatermark(Exception):
+    pass
+
+
+def encode_watermark(moment):
+    """
+    Watermarks are opaque to clients: microseconds since the epoch as a string.
+    """
+    delta = moment - EPOCH
+    return str((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def decode_watermark(watermark):
+    try:
+        microseconds = int(watermark)
+    except (TypeError, ValueError):
+        raise InvalidWatermark('The sync watermark is invalid.')
+    if microseconds < 0:
+        raise InvalidWatermark('The sync watermark is invalid.')
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
+def oldest_transaction_start(using):
+    """
+    When the oldest transaction still open on the database began, or None.
+    Rows it wrote were saved after then, however late it commits.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(OLDEST_TRANSACTION_SQL)
+        return cursor.fetchone()[0]
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Q
+from django.utils import timezone
+
+from rest_framework import status, views
+from rest_framework.response import Response
+
+from flytster.routers import use_primary
+
+from passengers.models import Passenger
+from passengers.serializers import PassengerSerializer
+from trips.models import Trip
+from trips.serializers import TripSerializer
+
+from .models import Tombstone
+from .utils import InvalidWatermark, encode_watermark, decode_watermark, oldest_transaction_start
+
+
+class SyncView(views.APIView):
+    """
+    GET: Returns the user's trips, passengers and deletions changed since a
+    watermark, plus the watermark to send on the next sync.
+    """
+
+    # A lagging replica could miss rows older than the returned watermark
+    @use_primary()
+    def get(self, request):
+        started = timezone.now()
+        since = None
+
+        if request.query_params.get('since'):
+            try:
+                since = decode_watermark(request.query_params['since'])
+            except InvalidWatermark as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if started - since > timedelta(days=settings.SYNC_TOMBSTONE_EXP_IN_DAYS):
+                return Response(
+                    {'detail': 'The sync watermark has expired. Sync again without one.'},
+                    status=status.HTTP_410_GONE)
+
+        # updated is set when a row is saved, not when it commits, so rows a
+        # transaction open now commits later can be older than started. Read
+        # this before the rows, so any transaction starting after it saves
+        # rows newer than the watermark.
+        oldest = oldest_transaction_start(router.db_for_read(Trip))
+
+        trips = Trip.objects.filter(user=request.user).select_related(
+            'status', 'price__expected_passengers').prefetch_related('flights__legs')
+        passengers = Passenger.objects.filter(user=request.user)
+        tombstones = Tombstone.objects.none()
+
+        if since is not None:
+            trips = trips.filter(Q(updated__gt=since) | Q(status__updated__gt=since))
+            passengers = passengers.filter(updated__gt=since)
+            tombstones = Tombstone.objects.filter(user=request.user, deleted__gt=since)
+
+        deleted = {'trips': [], 'passengers': []}
+        for model, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[model + 's'].append(object_id)
+
+        # The next sync starts from before the oldest open transaction, less
+        # an overlap for clock skew between the app and Postgres. Clients
+        # upsert by id, so repeats are harmless.
+        watermark = min(started, oldest or started)
+        watermark -= timedelta(seconds=settings.SYNC_WATERMARK_OVERLAP_SECONDS)
+        if since is not None and watermark < since:
+            watermark = since
+
+        return Response({
+            'watermark': encode_watermark(watermark),
+            'trips': TripSerializer(trips, many=True).data,
+            'passengers': PassengerSerializer(passengers, many=True).data,
+            'deleted': deleted,
+        }, status=status.HTTP_200_OK)
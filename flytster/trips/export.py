@@ -0,0 +1,180 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.db.models import Q
+from django.utils import timezone
+
+from flytster.routers import shard_aliases
+from sync.utils import oldest_transaction_start
+
+from .models import Trip
+
+
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+STATUS_FIELDS = ('is_selected', 'is_passenger_ready', 'is_available',
+    'is_purchased', 'is_booked', 'is_ticketed', 'is_expired', 'record_locator',
+    'updated')
+PRICE_FIELDS = ('base', 'tax', 'total', 'ptc', 'refundable',
+    'last_ticket_time', 'fare_calculation')
+EXPECTED_PASSENGER_FIELDS = ('adult_count', 'child_count', 'infant_in_lap_count',
+    'infant_in_seat_count', 'senior_count')
+FLIGHT_FIELDS = ('id', 'carrier', 'number', 'duration', 'cabin', 'booking_code',
+    'married_group', 'connection_duration', 'timestamp')
+LEG_FIELDS = ('id', 'aircraft', 'arrival_time', 'departure_time', 'origin',
+    'destination', 'duration', 'on_time_performance', 'mileage', 'meal',
+    'secure', 'connection_duration', 'change_plane', 'timestamp')
+PASSENGER_FIELDS = ('id', 'first_name', 'middle_name', 'last_name', 'gender',
+    'birthdate', 'timestamp')
+
+CSV_HEADER = (
+    'trip_id', 'user_id', 'trip_timestamp', 'base', 'tax', 'total', 'ptc',
+    'refundable', 'last_ticket_time', 'passenger_count', 'flight_id', 'carrier',
+    'number', 'cabin', 'booking_code', 'leg_id', 'origin', 'destination',
+    'departure_time', 'arrival_time', 'duration')
+
+
+def _fields(instance, field_names):
+    return {name: getattr(instance, name) for name in field_names}
+
+
+def iter_trips(since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields trips with their related rows, least recently updated first, one
+    chunk at a time. With since, only trips whose own row, status or
+    passengers changed after it are read. Chunks are read by keyset on
+    (updated, id) so memory use stays flat no matter how many trips are
+    exported, and each chunk is prefetched in a fixed number of queries. With
+    sharding on, each shard is read in turn.
+    """
+    for using in shard_aliases():
+        for trip in _iter_shard_trips(_primary(using), since, chunk_size):
+            yield trip
+
+
+def _primary(using):
+    # A lagging replica could miss rows older than the next since
+    return using or router.db_for_write(Trip)
+
+
+def next_since():
+    """
+    The since for the export after this one. Call it before reading any
+    trips: updated is set when a row is saved, not when it commits, so it is
+    the earlier of now and the oldest transaction open on any shard, less an
+    overlap for clock skew between the app and Postgres.
+    """
+    watermark = timezone.now()
+    for using in shard_aliases():
+        oldest = oldest_transaction_start(_primary(using))
+        if oldest is not None and oldest < watermark:
+            watermark = oldest
+    return watermark - timedelta(seconds=settings.SYNC_WATERMARK_OVERLAP_SECONDS)
+
+
+def _iter_shard_trips(using, since, chunk_size):
+    queryset = Trip.objects.using(using).select_related(
+        'status', 'price__expected_passengers').prefetch_related(
+        'flights__legs', 'passengers').order_by('updated', 'id')
+
+    if since is not None:
+        changed = Trip.objects.using(using).filter(
+            Q(updated__gt=since) | Q(status__updated__gt=since) |
+            Q(passengers__updated__gt=since))
+        queryset = queryset.filter(id__in=changed.values('id'))
+
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(
+                Q(updated__gt=last.updated) | Q(updated=last.updated, id__gt=last.id))
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+
+        for trip in chunk:
+            yield trip
+        last = chunk[-1]
+
+
+def trip_record(trip):
+    """
+    The nested NDJSON representation of a single trip.
+    """
+    price = getattr(trip, 'price', None)
+    record = {
+        'id': trip.id,
+        'user': trip.user_id,
+        'timestamp': trip.timestamp,
+        'updated': trip.updated,
+        'status': _fields(trip.status, STATUS_FIELDS),
+        'price': None,
+        'flights': [],
+        'passengers': [_fields(p, PASSENGER_FIELDS) for p in trip.passengers.all()],
+    }
+
+    if price is not None:
+        record['price'] = _fields(price, PRICE_FIELDS)
+        expected = getattr(price, 'expected_passengers', None)
+        if expected is not None:
+            record['price']['expected_passengers'] = _fields(expected, EXPECTED_PASSENGER_FIELDS)
+
+    for flight in trip.flights.all():
+        flight_record = _fields(flight, FLIGHT_FIELDS)
+        flight_record['legs'] = [_fields(leg, LEG_FIELDS) for leg in flight.legs.all()]
+        record['flights'].append(flight_record)
+
+    return record
+
+
+def trip_csv_rows(trip):
+    """
+    One flat CSV row per leg of the trip.
+    """
+    price = getattr(trip, 'price', None)
+    trip_columns = [
+        trip.id, trip.user_id, trip.timestamp.isoformat(),
+        price.base if price else '', price.tax if price else '',
+        price.total if price else '', price.ptc if price else '',
+        price.refundable if price else '',
+        price.last_ticket_time.isoformat() if price else '',
+        len(trip.passengers.all())]
+
+    for flight in trip.flights.all():
+        flight_columns = [flight.id, flight.carrier, flight.number, flight.cabin,
+            flight.booking_code]
+        for leg in flight.legs.all():
+            yield trip_columns + flight_columns + [
+                leg.id, leg.origin, leg.destination, leg.departure_time.isoformat(),
+                leg.arrival_time.isoformat(), leg.duration]
+
+
+class Echo(object):
+    """
+    A file-like object whose write() hands the line back to the caller.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_lines(trips, export_format):
+    """
+    Yields encoded lines for each trip in the chosen format.
+    """
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER)
+        for trip in trips:
+            for row in trip_csv_rows(trip):
+                yield writer.writerow(row)
+    else:
+        for trip in trips:
+            yield json.dumps(trip_record(trip), cls=DjangoJSONEncoder) + '\n'
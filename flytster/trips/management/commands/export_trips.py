@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from trips.export import (EXPORT_FORMATS, EXPORT_CHUNK_SIZE, iter_trips, export_lines,
+    next_since)
+
+
+class Command(BaseCommand):
+    help = 'Streams trips with their flights, legs, prices and passengers to a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--since', help='Only export trips changed after this ISO timestamp.')
+        parser.add_argument('--output', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since must be an ISO 8601 timestamp.')
+
+        watermark = next_since()
+        if since is not None and watermark < since:
+            watermark = since
+        exported = {'count': 0}
+
+        def counted(trips):
+            for trip in trips:
+                exported['count'] += 1
+                yield trip
+
+        trips = counted(iter_trips(since=since, chunk_size=options['chunk_size']))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                for line in export_lines(trips, options['format']):
+                    output.write(line)
+        else:
+            for line in export_lines(trips, options['format']):
+                self.stdout.write(line, ending='')
+
+        self.stderr.write('Exported {0} trips. Next --since: {1}'.format(
+            exported['count'], watermark.isoformat()))
@@ -1,43 +1,207 @@
-from django.db import models, transaction
-from django.utils.timezone import now, timedelta
+import re
+from collections import namedtuple
 
-from utils.converters import utc_string_to_datetime
+from django.db import connections, models, router, transaction
+from django.db.models import Max, Min, Prefetch
+from django.utils.timezone import now, timedelta
 
 class InvalidTripOption(Exception):
     pass
 
 
-class TripManager(models.Manager):
+class InvalidDataQuery(Exception):
+    pass
+
+
+# Keys in Trip.data that hold lists in a QPX tripOption
+DATA_ARRAY_KEYS = ('slice', 'segment', 'leg')
 
-    @transaction.atomic
-    def create_trip(self, user, data):
+DATA_KEY_REGEX = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+DATA_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def data_path_to_containment(path, value):
+    """
+    Turns a dotted path into a nested object for the jsonb @> operator.
+    Array keys are wrapped in a list so they match any element, e.g.
+    'trip_data.slice.segment.carrier', 'NK' becomes
+    {'trip_data': {'slice': [{'segment': [{'carrier': 'NK'}]}]}}
+    """
+    keys = path.split('.')
+    for key in keys:
+        if key.isdigit():
+            raise InvalidDataQuery(
+                '{0}: positional lookups can not use the data index.'.format(path))
+        if not DATA_KEY_REGEX.match(key):
+            raise InvalidDataQuery('{0}: invalid key "{1}".'.format(path, key))
+
+    containment = value
+    for key in reversed(keys):
+        containment = {key: [containment] if key in DATA_ARRAY_KEYS else containment}
+    return containment
+
+
+def validate_data_containment(value, path='data'):
+    """
+    Only non-empty containment documents with scalar leaves can be answered
+    from the jsonb_path_ops GIN index. Anything else would need a full scan.
+    """
+    if isinstance(value, dict):
+        if not value:
+            raise InvalidDataQuery('{0}: empty objects match every trip.'.format(path))
+        for key, item in value.items():
+            validate_data_containment(item, '{0}.{1}'.format(path, key))
+    elif isinstance(value, list):
+        if not value:
+            raise InvalidDataQuery('{0}: empty lists match every trip.'.format(path))
+        for item in value:
+            validate_data_containment(item, path)
+    elif not isinstance(value, DATA_SCALAR_TYPES):
+        raise InvalidDataQuery('{0}: unsupported value {1!r}.'.format(path, value))
+
+
+class TripQuerySet(models.QuerySet):
+
+    def data_contains(self, containment):
+        """
+        Filter on a jsonb containment document, served by trips_trip_data_gin.
+        """
+        validate_data_containment(containment)
+        return self.filter(data__contains=containment)
+
+    def data_paths(self, filters):
+        """
+        Filter on {dotted path: value} pairs. Each pair is its own containment
+        check so Postgres can AND the index bitmaps together.
+        """
+        if not filters:
+            raise InvalidDataQuery('At least one data filter is required.')
+
+        queryset = self
+        for path, value in sorted(filters.items()):
+            queryset = queryset.data_contains(data_path_to_containment(path, value))
+        return queryset
+
+    def for_fields(self, fields, expand):
+        """
+        Loads only what a trip response with these fields and expansions renders.
+        """
+        from .models import Flight, Leg
+
+        # user is always loaded for the owner permission check
+        columns = ['id', 'user'] + [f for f in ('status', 'timestamp', 'updated') if f in fields]
+        queryset = self.only(*columns)
+
+        if 'status' in fields:
+            queryset = queryset.select_related('status')
+        if 'price' in fields:
+            queryset = queryset.select_related('price__expected_passengers')
+        if 'departure_time' in fields:
+            queryset = queryset.annotate(departure_time=Min('flights__legs__departure_time'))
+        if 'arrival_time' in fields:
+            queryset = queryset.annotate(arrival_time=Max('flights__legs__arrival_time'))
+
+        if 'flights' in fields:
+            if 'flights.legs' in expand:
+                queryset = queryset.prefetch_related('flights__legs')
+            elif 'flights' in expand:
+                queryset = queryset.prefetch_related(Prefetch(
+                    'flights', queryset=Flight.objects.prefetch_related(
+                        Prefetch('legs', queryset=Leg.objects.only('id', 'flight')))))
+            else:
+                queryset = queryset.prefetch_related(
+                    Prefetch('flights', queryset=Flight.objects.only('id', 'trip')))
+
+        return queryset
+
+
+def reserve_ids(model, count):
+    """
+    Draws count primary keys from the model's id sequence. bulk_create
+    doesn't return primary keys on Django 1.9, so related rows get their
+    keys up front instead.
+    """
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [model._meta.db_table, count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+TripRows = namedtuple('TripRows', 'status trip price expected_passengers flights')
+
+
+class TripManager(models.Manager.from_queryset(TripQuerySet)):
+
+    def build_trip(self, user, data):
+        """
+        Builds unsaved rows for a Google QPX tripOption. data is either the raw
+        payload or TripPostSerializer's validated_data, which already carries
+        the parsed trip_option.
+        """
         from .models import TripStatus, TripExpectedPassengers, TripPrice, Trip, Flight, Leg
+        from .schema import InvalidTripSchema, parse_trip_option
 
-        try:
-            trip = Trip.objects.create(
-                user=user,
-                status=TripStatus.objects.create(),
-                data=data)
-
-            data['pricing_data']['last_ticket_time'] = utc_string_to_datetime(data['pricing_data']['last_ticket_time'])
-            trip_price = TripPrice.objects.create(trip=trip, **data['pricing_data'])
-
-            trip_exp_pass = TripExpectedPassengers.objects.create(
-                                    trip_price=trip_price, **data['passenger_data'])
-
-            # Loop through each slice object (one for one-way, two for round-trip)
-            for slice_item in data['trip_data']['slice']:
-                # Loop through each segment (multiple segments mean connecting flights)
-                for segment_item in slice_item['segment']:
-                    legs = segment_item.pop('leg')
-                    flight = Flight.objects.create(trip=trip, **segment_item)
-                    # Loop through each leg (smallest unit of travel - flight takeoff to landing)
-                    for leg_item in legs:
-                        leg_item['arrival_time'] = utc_string_to_datetime(leg_item['arrival_time'])
-                        leg_item['departure_time'] = utc_string_to_datetime(leg_item['departure_time'])
-                        Leg.objects.create(flight=flight, **leg_item)
+        data = dict(data)
+        trip_option = data.pop('trip_option', None)
+        if trip_option is None:
+            try:
+                trip_option = parse_trip_option(data)
+            except InvalidTripSchema as e:
+                raise InvalidTripOption(e.errors)
+
+        return TripRows(
+            status=TripStatus(),
+            trip=Trip(user=user, data=data),
+            price=TripPrice(**trip_option.pricing),
+            expected_passengers=TripExpectedPassengers(**trip_option.passengers),
+            flights=[(Flight(**flight), [Leg(**leg) for leg in legs])
+                for flight, legs in trip_option.segments])
 
+    def bulk_create_trips(self, trip_rows):
+        """
+        Inserts rows from build_trip with one INSERT per table.
+        """
+        from .models import TripStatus, TripExpectedPassengers, TripPrice, Trip, Flight, Leg
+
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            count = len(trip_rows)
+            status_ids = reserve_ids(TripStatus, count)
+            trip_ids = reserve_ids(Trip, count)
+            price_ids = reserve_ids(TripPrice, count)
+            flight_ids = iter(reserve_ids(Flight, sum(len(rows.flights) for rows in trip_rows)))
+
+            legs = []
+            for rows, status_id, trip_id, price_id in zip(trip_rows, status_ids, trip_ids, price_ids):
+                rows.status.id = status_id
+                rows.trip.id = trip_id
+                rows.trip.status = rows.status
+                rows.price.id = price_id
+                rows.price.trip = rows.trip
+                rows.expected_passengers.trip_price = rows.price
+                for flight, flight_legs in rows.flights:
+                    flight.id = next(flight_ids)
+                    flight.trip = rows.trip
+                    for leg in flight_legs:
+                        leg.flight = flight
+                        legs.append(leg)
+
+            TripStatus.objects.bulk_create([rows.status for rows in trip_rows])
+            Trip.objects.bulk_create([rows.trip for rows in trip_rows])
+            TripPrice.objects.bulk_create([rows.price for rows in trip_rows])
+            TripExpectedPassengers.objects.bulk_create(
+                [rows.expected_passengers for rows in trip_rows])
+            Flight.objects.bulk_create(
+                [flight for rows in trip_rows for flight, _ in rows.flights])
+            Leg.objects.bulk_create(legs)
+
+            return [rows.trip for rows in trip_rows]
+
+    def create_trip(self, user, data):
+        rows = self.build_trip(user, data)
+
+        try:
+            return self.bulk_create_trips([rows])[0]
         except Exception as e:
             raise InvalidTripOption(e)
-
-        return trip
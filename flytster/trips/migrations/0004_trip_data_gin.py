@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_auto_20160624_0336'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX trips_trip_data_gin ON trips_trip USING gin (data jsonb_path_ops);',
+            reverse_sql='DROP INDEX trips_trip_data_gin;'),
+    ]
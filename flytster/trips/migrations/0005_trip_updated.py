@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0004_trip_data_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='tripstatus',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
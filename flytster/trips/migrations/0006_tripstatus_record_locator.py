@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_trip_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripstatus',
+            name='record_locator',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+    ]
@@ -22,7 +22,9 @@ class TripStatus(models.Model):
     is_booked = models.BooleanField(default=False)
     is_ticketed = models.BooleanField(default=False)
     is_expired = models.BooleanField(default=False)
-    updated = models.DateTimeField(auto_now_add=False, auto_now=True)
+    # The Sabre PNR the booking pipeline stored, ticketed once purchased
+    record_locator = models.CharField(max_length=8, default='', blank=True)
+    updated = models.DateTimeField(auto_now_add=False, auto_now=True, db_index=True)
 
     def __str__(self):
         for field_name in ['is_selected', 'is_passenger_ready', 'is_available',
@@ -69,6 +71,7 @@ class Trip(models.Model):
     status = models.OneToOneField(TripStatus)
     data = JSONField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
 
     objects = TripManager()
 
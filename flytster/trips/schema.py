@@ -0,0 +1,214 @@
+"""
+Declarative schema for the passenger_data, pricing_data and trip_data objects
+posted to create a trip. Each object is compiled once at import into a
+validator built from the model fields it maps to, so payloads are checked and
+converted to model-ready values before any database work.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import models
+
+from utils.converters import utc_string_to_datetime
+
+from .models import TripExpectedPassengers, TripPrice, Flight, Leg
+
+
+TripOption = namedtuple('TripOption', 'passengers pricing segments')
+
+
+class InvalidTripSchema(Exception):
+
+    def __init__(self, errors):
+        super(InvalidTripSchema, self).__init__(errors)
+        self.errors = errors
+
+
+# Schema: (model, JSON keys mapped to model fields, extra keys allowed)
+PASSENGER_DATA = (TripExpectedPassengers, (
+    'adult_count', 'child_count', 'infant_in_lap_count', 'infant_in_seat_count',
+    'senior_count'), ())
+PRICING_DATA = (TripPrice, (
+    'base', 'tax', 'total', 'ptc', 'refundable', 'last_ticket_time',
+    'fare_calculation'), ())
+SEGMENT = (Flight, (
+    'carrier', 'number', 'duration', 'cabin', 'booking_code', 'married_group',
+    'connection_duration'), ('leg',))
+LEG = (Leg, (
+    'aircraft', 'arrival_time', 'departure_time', 'origin', 'destination',
+    'duration', 'on_time_performance', 'mileage', 'meal', 'secure',
+    'connection_duration', 'change_plane'), ())
+SLICE_KEYS = ('duration', 'segment')
+
+
+def _compile_field(field):
+    """
+    Returns a function converting a JSON value to the model field's type,
+    raising ValueError with a message when it can't.
+    """
+    if isinstance(field, models.BooleanField):
+        def convert(value):
+            if not isinstance(value, bool):
+                raise ValueError('must be true or false.')
+            return value
+
+    elif isinstance(field, models.IntegerField):
+        def convert(value):
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError('must be an integer.')
+            return value
+
+    elif isinstance(field, models.DecimalField):
+        validator = DecimalValidator(field.max_digits, field.decimal_places)
+
+        def convert(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError('must be a number.')
+            try:
+                # str() first so JSON floats keep the digits that were sent
+                value = Decimal(str(value))
+            except InvalidOperation:
+                raise ValueError('must be a number.')
+            if not value.is_finite():
+                raise ValueError('must be a number.')
+            try:
+                validator(value)
+            except ValidationError as e:
+                raise ValueError(e.messages[0])
+            return value
+
+    elif isinstance(field, models.DateTimeField):
+        def convert(value):
+            if not isinstance(value, str):
+                raise ValueError('must be a string.')
+            return utc_string_to_datetime(value)
+
+    elif isinstance(field, models.CharField):
+        choices = set(key for key, _ in field.choices)
+        max_length = field.max_length
+
+        def convert(value):
+            if not isinstance(value, str):
+                raise ValueError('must be a string.')
+            if len(value) > max_length:
+                raise ValueError('must be at most {0} characters.'.format(max_length))
+            if choices and value not in choices:
+                raise ValueError('"{0}" is not a valid choice.'.format(value))
+            return value
+
+    else:
+        raise TypeError('No schema converter for {0}.'.format(type(field).__name__))
+
+    if field.null:
+        convert_value = convert
+
+        def convert(value):
+            return None if value is None else convert_value(value)
+
+    return convert
+
+
+def _compile_object(schema):
+    model, keys, extra_keys = schema
+
+    fields = []
+    for key in keys:
+        field = model._meta.get_field(key)
+        required = not (field.has_default() or field.null)
+        fields.append((key, _compile_field(field), required))
+    allowed = frozenset(keys) | frozenset(extra_keys)
+
+    def validate(value, path, errors):
+        """
+        Returns model kwargs for value, appending any problems to errors.
+        """
+        if not isinstance(value, dict):
+            errors.append('{0}: must be an object.'.format(path))
+            return {}
+
+        result = {}
+        for key, convert, required in fields:
+            if key in value:
+                try:
+                    result[key] = convert(value[key])
+                except ValueError as e:
+                    errors.append('{0}.{1}: {2}'.format(path, key, e))
+            elif required:
+                errors.append('{0}.{1}: is required.'.format(path, key))
+
+        for key in sorted(set(value) - allowed):
+            errors.append('{0}.{1}: is not allowed.'.format(path, key))
+
+        return result
+
+    return validate
+
+
+def _list_items(value, path, errors):
+    if not isinstance(value, list) or not value:
+        errors.append('{0}: must be a non-empty list.'.format(path))
+        return []
+    return value
+
+
+validate_passenger_data = _compile_object(PASSENGER_DATA)
+validate_pricing_data = _compile_object(PRICING_DATA)
+validate_segment = _compile_object(SEGMENT)
+validate_leg = _compile_object(LEG)
+
+
+def parse_trip_option(data):
+    """
+    Validates a trip's passenger_data, pricing_data and trip_data and returns
+    them as a TripOption of model kwargs. Raises InvalidTripSchema with the
+    errors for each object.
+    """
+    errors = {}
+
+    passenger_errors = []
+    passengers = validate_passenger_data(
+        data.get('passenger_data'), 'passenger_data', passenger_errors)
+    if passenger_errors:
+        errors['passenger_data'] = passenger_errors
+
+    pricing_errors = []
+    pricing = validate_pricing_data(data.get('pricing_data'), 'pricing_data', pricing_errors)
+    if pricing_errors:
+        errors['pricing_data'] = pricing_errors
+
+    trip_errors = []
+    segments = []
+    trip_data = data.get('trip_data')
+    if not isinstance(trip_data, dict):
+        trip_errors.append('trip_data: must be an object.')
+        trip_data = {}
+
+    for s, slice_item in enumerate(_list_items(trip_data.get('slice'), 'trip_data.slice', trip_errors)):
+        slice_path = 'trip_data.slice[{0}]'.format(s)
+        if not isinstance(slice_item, dict):
+            trip_errors.append('{0}: must be an object.'.format(slice_path))
+            continue
+        for key in sorted(set(slice_item) - set(SLICE_KEYS)):
+            trip_errors.append('{0}.{1}: is not allowed.'.format(slice_path, key))
+
+        segment_items = _list_items(slice_item.get('segment'), slice_path + '.segment', trip_errors)
+        for g, segment_item in enumerate(segment_items):
+            segment_path = '{0}.segment[{1}]'.format(slice_path, g)
+            flight = validate_segment(segment_item, segment_path, trip_errors)
+            legs = []
+            if isinstance(segment_item, dict):
+                leg_items = _list_items(segment_item.get('leg'), segment_path + '.leg', trip_errors)
+                for l, leg_item in enumerate(leg_items):
+                    leg_path = '{0}.leg[{1}]'.format(segment_path, l)
+                    legs.append(validate_leg(leg_item, leg_path, trip_errors))
+            segments.append((flight, legs))
+
+    if trip_errors:
+        errors['trip_data'] = trip_errors
+
+    if errors:
+        raise InvalidTripSchema(errors)
+
+    return TripOption(passengers=passengers, pricing=pricing, segments=segments)
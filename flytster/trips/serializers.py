@@ -1,11 +1,13 @@
 import re
 from datetime import datetime
 
-from django.db.models import Min
+from django.conf import settings
 
 from rest_framework import serializers
 
+from .managers import InvalidDataQuery, data_path_to_containment, validate_data_containment
 from .models import TripStatus, TripExpectedPassengers, TripPrice, Trip, Flight, Leg
+from .schema import InvalidTripSchema, parse_trip_option
 
 
 class TripPostSerializer(serializers.Serializer):
@@ -13,13 +15,46 @@ class TripPostSerializer(serializers.Serializer):
     pricing_data = serializers.JSONField()
     trip_data = serializers.JSONField()
 
+    def validate(self, attrs):
+        try:
+            attrs['trip_option'] = parse_trip_option(attrs)
+        except InvalidTripSchema as e:
+            raise serializers.ValidationError(e.errors)
+        return attrs
+
+
+class TripBatchPostSerializer(serializers.Serializer):
+    trips = serializers.ListField(child=serializers.DictField())
+
+    def validate_trips(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one trip is required.')
+        if len(value) > settings.TRIP_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                'At most {0} trips can be saved at once.'.format(settings.TRIP_BATCH_MAX_SIZE))
+        return value
+
+
+class TripDataSearchSerializer(serializers.Serializer):
+    filters = serializers.DictField()
+
+    def validate_filters(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one filter is required.')
+        try:
+            for path, item in value.items():
+                validate_data_containment(data_path_to_containment(path, item))
+        except InvalidDataQuery as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
 
 class TripStatusSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TripStatus
         fields = ('is_selected', 'is_passenger_ready', 'is_available',
-            'is_purchased', 'is_booked', 'is_expired', 'updated')
+            'is_purchased', 'is_booked', 'is_ticketed', 'is_expired', 'record_locator', 'updated')
 
 
 class TripExpectedPassengersSerializer(serializers.ModelSerializer):
@@ -51,12 +86,66 @@ class FlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flight
 
+    def __init__(self, *args, **kwargs):
+        expand_legs = kwargs.pop('expand_legs', True)
+        super(FlightSerializer, self).__init__(*args, **kwargs)
+        if not expand_legs:
+            self.fields['legs'] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+TRIP_DEFAULT_FIELDS = ('id', 'user', 'price', 'flights', 'status', 'timestamp', 'updated')
+TRIP_FIELDS = TRIP_DEFAULT_FIELDS + ('departure_time', 'arrival_time')
+TRIP_EXPANSIONS = ('flights', 'flights.legs')
+
+
+def parse_trip_fields(query_params):
+    """
+    Reads the ?fields= and ?expand= query parameters for trip responses.
+    Without them every default field is rendered with flights and legs expanded.
+    """
+    fields, expand = TRIP_DEFAULT_FIELDS, TRIP_EXPANSIONS
+    errors = {}
+
+    if 'fields' in query_params:
+        fields = tuple(f for f in query_params['fields'].split(',') if f)
+        unknown = set(fields) - set(TRIP_FIELDS)
+        if unknown or not fields:
+            errors['fields'] = 'Must be a comma separated list of: {0}.'.format(', '.join(TRIP_FIELDS))
+
+    if 'expand' in query_params:
+        expand = tuple(e for e in query_params['expand'].split(',') if e)
+        if set(expand) - set(TRIP_EXPANSIONS):
+            errors['expand'] = 'Must be a comma separated list of: {0}.'.format(', '.join(TRIP_EXPANSIONS))
+        if 'flights.legs' in expand:
+            expand += ('flights',)
+
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    return fields, expand
+
 
 class TripSerializer(serializers.ModelSerializer):
     status = TripStatusSerializer()
     price = TripPriceSerializer()
     flights = FlightSerializer(many=True)
+    departure_time = serializers.DateTimeField(read_only=True)
+    arrival_time = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Trip
-        fields = ('id', 'user', 'price', 'flights', 'status', 'timestamp')
+        fields = TRIP_FIELDS
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', TRIP_DEFAULT_FIELDS)
+        expand = kwargs.pop('expand', TRIP_EXPANSIONS)
+        super(TripSerializer, self).__init__(*args, **kwargs)
+
+        for field_name in set(self.fields) - set(fields):
+            self.fields.pop(field_name)
+
+        if 'flights' in self.fields:
+            if 'flights' not in expand:
+                self.fields['flights'] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+            elif 'flights.legs' not in expand:
+                self.fields['flights'] = FlightSerializer(many=True, expand_legs=False)
@@ -0,0 +1,389 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+import json
+from collections import defaultdict
+from copy import deepcopy
+
+from django.core.urlresolvers import reverse
+from django.test import Client
+from rest_framework import status
+
+from flytster.routers import NoShardSelected, ReplicaRouter, use_primary, use_shard
+from users.models import FlytsterUser
+from trips.managers import InvalidDataQuery
+from trips.models import Trip
+from trips.views import HTTP_207_MULTI_STATUS
+
+
+TRIP_DATA = {
+    "passenger_data": {
+        "adult_count": 1,
+        "child_count": 1
+    },
+    "pricing_data": {
+        "base": 885.58,
+        "tax": 111.62,
+        "total": 997.20,
+        "last_ticket_time": "2016-02-16T10:25-05:00",
+        "ptc": "ADT",
+        "refundable": True,
+        "fare_calculation": "END ZP OGG PDX LAX XT 8.90US 73.25US 12.00ZP"
+    },
+    "trip_data": {
+        "slice": [
+            {
+                "duration": 159,
+                "segment": [
+                    {
+                        "duration": 159,
+                        "carrier": "NK",
+                        "number": "847",
+                        "cabin": "COACH",
+                        "booking_code": "Y",
+                        "married_group": "0",
+                        "leg": [
+                            {
+                                "duration": 159,
+                                "aircraft": "320",
+                                "arrival_time": "2016-02-16T14:04-07:00",
+                                "departure_time": "2016-02-16T12:25-06:00",
+                                "origin": "ORD",
+                                "destination": "DEN"
+                            }
+                        ]
+                    }
+                ]
+            },
+            {
+                "duration": 151,
+                "segment": [
+                    {
+                        "duration": 151,
+                        "carrier": "NK",
+                        "number": "630",
+                        "cabin": "COACH",
+                        "booking_code": "Y",
+                        "married_group": "1",
+                        "leg": [
+                            {
+                                "duration": 151,
+                                "aircraft": "320",
+                                "arrival_time": "2016-02-17T17:06-06:00",
+                                "departure_time": "2016-02-17T13:35-07:00",
+                                "origin": "DEN",
+                                "destination": "ORD"
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
+}
+
+
+class TripSetupFixture:
+    def __init__(self):
+        self.client = Client()
+
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+        self.user.verify_email_token(self.user.email_token.token)
+        self.auth = {'HTTP_AUTHORIZATION': self.user.auth_tokens.latest('timestamp').token}
+
+        self.admin = FlytsterUser.objects.create_superuser(
+            first_name='Sky',
+            last_name='Admin',
+            email='skyadmin@gmail.com',
+            password='Password1'
+        )
+        self.admin.verify_email_token(self.admin.email_token.token)
+        self.admin_auth = {'HTTP_AUTHORIZATION': self.admin.auth_tokens.latest('timestamp').token}
+
+        self.trip = Trip.objects.create_trip(self.user, deepcopy(TRIP_DATA))
+
+        self.url_list_create = reverse('trip_list_create')
+        self.url_batch = reverse('trip_batch_create')
+        self.url_retrieve = lambda t: reverse('trip_retrieve_delete', args=[t])
+        self.url_search = reverse('trip_data_search')
+        self.url_export = reverse('trip_export')
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return TripSetupFixture()
+
+
+@pytest.fixture(scope="function")
+def reads(monkeypatch):
+    """
+    Records the aliases ReplicaRouter sends each model's reads to.
+    """
+    aliases = defaultdict(set)
+    db_for_read = ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        alias = db_for_read(self, model, **hints)
+        aliases[model._meta.label_lower].add(alias)
+        return alias
+    monkeypatch.setattr(ReplicaRouter, 'db_for_read', record)
+    return aliases
+
+
+def post_json(setup, url, data, auth):
+    return setup.client.post(url, data=json.dumps(data),
+                            content_type='application/json', **auth)
+
+
+# Test Trip Create
+def test_create_trip(setup):
+    response = post_json(setup, setup.url_list_create, TRIP_DATA, setup.auth)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['user'] == setup.user.id
+    assert response.data['price']['total'] == '997.20'
+    assert response.data['price']['expected_passengers']['child_count'] == 1
+    assert len(response.data['flights']) == 2
+    assert len(response.data['flights'][0]['legs']) == 1
+
+def test_create_trip_bad_cabin(setup):
+    data = deepcopy(TRIP_DATA)
+    data['trip_data']['slice'][0]['segment'][0]['cabin'] = 'STEERAGE'
+    response = post_json(setup, setup.url_list_create, data, setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['trip_data'] == [
+        'trip_data.slice[0].segment[0].cabin: "STEERAGE" is not a valid choice.']
+    assert Trip.objects.count() == 1
+
+def test_create_trip_bad_pricing_and_legs(setup):
+    data = deepcopy(TRIP_DATA)
+    data['pricing_data']['total'] = 99999.99
+    del data['trip_data']['slice'][1]['segment'][0]['leg'][0]['origin']
+    response = post_json(setup, setup.url_list_create, data, setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert len(response.data['pricing_data']) == 1
+    assert response.data['trip_data'] == [
+        'trip_data.slice[1].segment[0].leg[0].origin: is required.']
+    assert Trip.objects.count() == 1
+
+
+# Test Trip Fields
+def test_list_trips(setup):
+    response = setup.client.get(setup.url_list_create, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 1
+    trip = response.data['results'][0]
+    assert set(trip) == {'id', 'user', 'price', 'flights', 'status', 'timestamp', 'updated'}
+    assert 'carrier' in trip['flights'][0]
+    assert 'origin' in trip['flights'][0]['legs'][0]
+
+def test_list_trips_sparse_fields(setup):
+    params = {'fields': 'id,price,status,departure_time,arrival_time'}
+    response = setup.client.get(setup.url_list_create, params, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    trip = response.data['results'][0]
+    assert set(trip) == {'id', 'price', 'status', 'departure_time', 'arrival_time'}
+    assert trip['departure_time'] == '2016-02-16T18:25:00.000000Z'
+    assert trip['arrival_time'] == '2016-02-17T23:06:00.000000Z'
+
+def test_get_trip_flights_not_expanded(setup):
+    params = {'fields': 'id,flights', 'expand': ''}
+    response = setup.client.get(setup.url_retrieve(setup.trip.id), params, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(response.data['flights']) == sorted(f.id for f in setup.trip.flights.all())
+
+def test_get_trip_legs_not_expanded(setup):
+    params = {'fields': 'flights', 'expand': 'flights'}
+    response = setup.client.get(setup.url_retrieve(setup.trip.id), params, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'carrier' in response.data['flights'][0]
+    assert isinstance(response.data['flights'][0]['legs'][0], int)
+
+def test_list_trips_unknown_field(setup):
+    response = setup.client.get(setup.url_list_create, {'fields': 'id,data'}, **setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'fields' in response.data
+
+
+# Test Trip Batch Create
+def test_batch_create_trips(setup):
+    data = {'trips': [deepcopy(TRIP_DATA), deepcopy(TRIP_DATA)]}
+    response = post_json(setup, setup.url_batch, data, setup.auth)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [r['status'] for r in response.data['results']] == [201, 201]
+    assert len(response.data['results'][1]['trip']['flights']) == 2
+    assert Trip.objects.filter(user=setup.user).count() == 3
+
+def test_batch_create_trips_partial(setup):
+    bad = deepcopy(TRIP_DATA)
+    del bad['pricing_data']['last_ticket_time']
+    data = {'trips': [bad, deepcopy(TRIP_DATA)]}
+    response = post_json(setup, setup.url_batch, data, setup.auth)
+    assert response.status_code == HTTP_207_MULTI_STATUS
+    assert response.data['results'][0]['status'] == 400
+    assert response.data['results'][1]['status'] == 201
+    assert Trip.objects.filter(user=setup.user).count() == 2
+
+def test_batch_create_trips_all_invalid(setup):
+    data = {'trips': [{'pricing_data': {}}]}
+    response = post_json(setup, setup.url_batch, data, setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert Trip.objects.filter(user=setup.user).count() == 1
+
+def test_batch_create_trips_too_many(setup, settings):
+    settings.TRIP_BATCH_MAX_SIZE = 1
+    data = {'trips': [deepcopy(TRIP_DATA), deepcopy(TRIP_DATA)]}
+    response = post_json(setup, setup.url_batch, data, setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'trips' in response.data
+
+
+# Test Trip Data Search
+def test_search_trips_by_carrier_and_fare(setup):
+    data = {'filters': {
+        'trip_data.slice.segment.carrier': 'NK',
+        'pricing_data.ptc': 'ADT'
+    }}
+    response = post_json(setup, setup.url_search, data, setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 1
+    assert response.data['results'][0]['id'] == setup.trip.id
+
+def test_search_trips_across_shards(setup, settings, second_shard):
+    settings.DATABASE_SHARDS = [second_shard]
+    user = FlytsterUser.objects.create_user(
+        first_name='Shard', last_name='User', email='sharduser@gmail.com', password='Password1')
+    with use_shard(user.shard):
+        trip = Trip.objects.create_trip(user, deepcopy(TRIP_DATA))
+
+    # setup.trip is on default, which shard1 stands in for
+    settings.DATABASE_SHARDS = ['shard1', second_shard]
+    data = {'filters': {'trip_data.slice.segment.carrier': 'NK'}}
+    response = post_json(setup, setup.url_search, data, setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 2
+    assert [t['id'] for t in response.data['results']] == [setup.trip.id, trip.id]
+
+def test_search_trips_no_match(setup):
+    data = {'filters': {'trip_data.slice.segment.leg.origin': 'LAX'}}
+    response = post_json(setup, setup.url_search, data, setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 0
+
+def test_search_trips_positional_path(setup):
+    data = {'filters': {'trip_data.slice.0.duration': 159}}
+    response = post_json(setup, setup.url_search, data, setup.admin_auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'filters' in response.data
+
+def test_search_trips_empty_filters(setup):
+    response = post_json(setup, setup.url_search, {'filters': {}}, setup.admin_auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_search_trips_not_staff(setup):
+    data = {'filters': {'pricing_data.ptc': 'ADT'}}
+    response = post_json(setup, setup.url_search, data, setup.auth)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_data_contains_rejects_empty_object(setup):
+    with pytest.raises(InvalidDataQuery):
+        Trip.objects.data_contains({'trip_data': {}})
+
+
+# Test Trip Export
+def test_export_trips_ndjson(setup):
+    response = setup.client.get(setup.url_export, **setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record['id'] == setup.trip.id
+    assert len(record['flights']) == 2
+    assert len(record['flights'][0]['legs']) == 1
+
+def test_export_trips_csv(setup):
+    response = setup.client.get(setup.url_export, {'output': 'csv'}, **setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0].startswith('trip_id,')
+    assert len(lines) == 3
+
+def test_export_trips_since(setup, settings):
+    settings.SYNC_WATERMARK_OVERLAP_SECONDS = 0
+    response = setup.client.get(setup.url_export, **setup.admin_auth)
+    since = response['X-Next-Since']
+    b''.join(response.streaming_content)
+
+    response = setup.client.get(setup.url_export, {'since': since}, **setup.admin_auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert b''.join(response.streaming_content) == b''
+    assert response['X-Next-Since'] >= since
+
+def test_export_trips_since_status_change(setup, settings):
+    settings.SYNC_WATERMARK_OVERLAP_SECONDS = 0
+    since = setup.client.get(setup.url_export, **setup.admin_auth)['X-Next-Since']
+    setup.trip.status.is_booked = True
+    setup.trip.status.save()
+
+    response = setup.client.get(setup.url_export, {'since': since}, **setup.admin_auth)
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [setup.trip.id]
+    assert json.loads(lines[0])['status']['is_booked'] is True
+
+def test_export_trips_not_staff(setup):
+    response = setup.client.get(setup.url_export, **setup.auth)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+# Test Replica Routing
+def test_reads_use_replica_unless_pinned(setup):
+    assert Trip.objects.all().db == 'replica1'
+    with use_primary():
+        assert Trip.objects.all().db == 'default'
+    assert Trip.objects.all().db == 'replica1'
+
+def test_create_trip_pins_user_to_primary(setup, reads):
+    response = post_json(setup, setup.url_list_create, TRIP_DATA, setup.auth)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    # A client that kept no cookies from the write
+    response = Client().get(setup.url_list_create, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 2
+    assert reads['trips.trip'] == {'default'}
+
+def test_reads_use_replica_without_a_pin(setup, reads):
+    response = setup.client.get(setup.url_list_create, **setup.auth)
+    assert response.status_code == status.HTTP_200_OK
+    assert reads['trips.trip'] == {'replica1'}
+
+def test_failed_create_trip_does_not_pin(setup):
+    response = post_json(setup, setup.url_list_create, {}, setup.auth)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert FlytsterUser.objects.get(pk=setup.user.pk).primary_until is None
+
+
+# Test Sharding
+def test_sharded_trips_go_to_user_shard(setup, settings):
+    settings.DATABASE_SHARDS = ['shard1']
+    user = FlytsterUser.objects.create_user(
+        first_name='Shard', last_name='User', email='sharduser@gmail.com', password='Password1')
+    assert user.shard == 'shard1'
+
+    auth = {'HTTP_AUTHORIZATION': user.auth_tokens.latest('timestamp').token}
+    response = post_json(setup, setup.url_list_create, TRIP_DATA, auth)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    with use_shard(user.shard):
+        trips = Trip.objects.filter(user=user)
+        assert trips.db == 'shard1'
+        assert trips.count() == 1
+
+def test_sharded_models_need_a_shard(setup, settings):
+    settings.DATABASE_SHARDS = ['shard1']
+    with pytest.raises(NoShardSelected):
+        Trip.objects.count()
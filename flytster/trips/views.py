@@ -2,18 +2,48 @@ import json
 import datetime
 
 from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 
 from rest_framework import generics, status, views
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 
+from flytster.routers import AcrossShards
+from idempotency.utils import idempotent
+
+from .export import EXPORT_FORMATS, iter_trips, export_lines, next_since
 from .models import Trip, TripStatus
 from .permissions import IsOwnerOrAdmin
-from .serializers import TripPostSerializer, TripSerializer
-from .utils import create_flights_from_trip_data, InvalidTripOption
+from .managers import InvalidTripOption
+from .serializers import (TripPostSerializer, TripSerializer, TripBatchPostSerializer,
+    TripDataSearchSerializer, parse_trip_fields)
+
+
+# rest_framework.status only has it from DRF 3.4
+HTTP_207_MULTI_STATUS = 207
+
+
+class TripFieldsMixin(object):
+    """
+    Prunes trip responses and their queries to the ?fields= and ?expand= requested.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super(TripFieldsMixin, self).initial(request, *args, **kwargs)
+        self.trip_fields, self.trip_expand = parse_trip_fields(request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.get_serializer_class() is TripSerializer:
+            kwargs.setdefault('fields', self.trip_fields)
+            kwargs.setdefault('expand', self.trip_expand)
+        return super(TripFieldsMixin, self).get_serializer(*args, **kwargs)
 
+    def trim_queryset(self, queryset):
+        return queryset.for_fields(self.trip_fields, self.trip_expand)
 
-class TripListCreateView(generics.ListCreateAPIView):
+
+class TripListCreateView(TripFieldsMixin, generics.ListCreateAPIView):
     """
     POST: Create a Trip instance from a Google QPX tripOption.
     GET:  Get all Trip instances that are selected and not expired
@@ -27,9 +57,10 @@ class TripListCreateView(generics.ListCreateAPIView):
         return TripSerializer
 
     def get_queryset(self):
-        return self.model.objects.filter(user=self.request.user).filter(
-            status__is_selected=True).filter(status__is_expired=False)
+        return self.trim_queryset(self.model.objects.filter(user=self.request.user).filter(
+            status__is_selected=True).filter(status__is_expired=False))
 
+    @idempotent
     def post(self, request):
         new_trip = self.get_serializer_class()(data=request.data)
         new_trip.is_valid(raise_exception=True)
@@ -43,7 +74,56 @@ class TripListCreateView(generics.ListCreateAPIView):
         return Response(result.data, status=status.HTTP_201_CREATED)
 
 
-class TripRetrieveDeleteView(generics.RetrieveDestroyAPIView):
+class TripBatchCreateView(views.APIView):
+    """
+    POST: Create a Trip instance for each Google QPX tripOption in the list.
+    Valid trips are saved together and invalid ones are reported by index.
+    """
+
+    @idempotent
+    def post(self, request):
+        batch = TripBatchPostSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        results, rows = [], []
+        for index, item in enumerate(batch.validated_data['trips']):
+            new_trip = TripPostSerializer(data=item)
+            if not new_trip.is_valid():
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': new_trip.errors})
+                continue
+
+            try:
+                rows.append(Trip.objects.build_trip(request.user, new_trip.validated_data))
+            except InvalidTripOption as e:
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'detail': str(e)}})
+                continue
+
+            results.append({'index': index, 'status': status.HTTP_201_CREATED, 'trip': None})
+
+        if rows:
+            trip_ids = [trip.id for trip in Trip.objects.bulk_create_trips(rows)]
+            trips = Trip.objects.filter(id__in=trip_ids).select_related(
+                'status', 'price__expected_passengers').prefetch_related('flights__legs')
+            trips = dict((trip.id, trip) for trip in trips)
+
+            created = iter(trip_ids)
+            for result in results:
+                if result['status'] == status.HTTP_201_CREATED:
+                    result['trip'] = TripSerializer(trips[next(created)]).data
+
+        if not rows:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(rows) < len(results):
+            response_status = HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response({'results': results}, status=response_status)
+
+
+class TripRetrieveDeleteView(TripFieldsMixin, generics.RetrieveDestroyAPIView):
     """
     GET: Retrieve a specific TripSearch instance
     """
@@ -51,4 +131,67 @@ class TripRetrieveDeleteView(generics.RetrieveDestroyAPIView):
     model = Trip
     serializer_class = TripSerializer
     permission_classes = (IsOwnerOrAdmin,)
-    queryset = Trip.objects.all()
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return self.trim_queryset(Trip.objects.all())
+        return Trip.objects.all()
+
+
+class TripDataSearchView(generics.GenericAPIView):
+    """
+    POST: Staff only. Search all trips with containment filters on Trip.data.
+          With sharding on, every shard is searched.
+    """
+
+    model = Trip
+    serializer_class = TripSerializer
+    permission_classes = (IsAdminUser,)
+    queryset = Trip.objects.select_related('status', 'price__expected_passengers')
+
+    def post(self, request):
+        search = TripDataSearchSerializer(data=request.data)
+        search.is_valid(raise_exception=True)
+
+        trips = self.get_queryset().data_paths(search.validated_data['filters'])
+
+        page = self.paginate_queryset(AcrossShards(trips.prefetch_related('flights__legs')))
+        result = self.get_serializer(page, many=True)
+        return self.get_paginated_response(result.data)
+
+
+class TripExportView(views.APIView):
+    """
+    GET: Staff only. Streams trips as NDJSON or CSV, optionally only those
+    changed since a timestamp. The X-Next-Since header is the since to send
+    on the next incremental export.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'output': 'Must be one of: {0}.'.format(', '.join(EXPORT_FORMATS))},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                return Response(
+                    {'since': 'Must be an ISO 8601 timestamp.'},
+                    status=status.HTTP_400_BAD_REQUEST)
+
+        watermark = next_since()
+        if since and watermark < since:
+            watermark = since
+
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            export_lines(iter_trips(since=since or None), export_format),
+            content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="trips.{0}"'.format(export_format)
+        response['X-Next-Since'] = watermark.isoformat()
+        return response
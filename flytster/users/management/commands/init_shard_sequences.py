@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from flytster.routers import SHARDED_MODELS
+
+
+def max_id(using, table):
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM {0}'.format(table))
+        return cursor.fetchone()[0]
+
+
+def first_id(highest, offset, stride):
+    """
+    The first id past highest that is offset mod stride.
+    """
+    return highest + 1 + (offset - highest - 1) % stride
+
+
+class Command(BaseCommand):
+    help = ('Makes the id sequences on each shard step by DATABASE_SHARD_ID_STRIDE '
+            'from the shard number, so ids never collide across shards and rows '
+            'keep their ids when moved with move_user_shard.')
+
+    def handle(self, *args, **options):
+        stride = settings.DATABASE_SHARD_ID_STRIDE
+        tables = [apps.get_model(label)._meta.db_table for label in sorted(SHARDED_MODELS)]
+
+        # Rows can also move over from default, from before sharding was on
+        highest = {}
+        for table in tables:
+            highest[table] = max(max_id(using, table)
+                for using in ['default'] + settings.DATABASE_SHARDS)
+
+        for offset, using in enumerate(settings.DATABASE_SHARDS, 1):
+            with connections[using].cursor() as cursor:
+                for table in tables:
+                    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+                    sequence = cursor.fetchone()[0]
+
+                    start = first_id(highest[table], offset, stride)
+                    cursor.execute('ALTER SEQUENCE {0} INCREMENT BY {1} RESTART WITH {2}'.format(
+                        sequence, stride, start))
+
+            self.stdout.write('Set id sequences on {0} to {1} + n * {2}.'.format(using, offset, stride))
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings.models import BookingJob
+from credits.models import Credit
+from flytster.routers import use_shard
+from idempotency.models import IdempotencyKey
+from passengers.models import Passenger
+from sync.models import Tombstone
+from trips.models import TripStatus, Trip, TripPrice, TripExpectedPassengers, Flight, Leg
+from users.models import FlytsterUser, copy_user
+
+
+# Parents before children, so foreign keys hold while copying
+MOVED_ROWS = (
+    (TripStatus, 'trip__user'),
+    (Trip, 'user'),
+    (TripPrice, 'trip__user'),
+    (TripExpectedPassengers, 'trip_price__trip__user'),
+    (Flight, 'trip__user'),
+    (Leg, 'flight__trip__user'),
+    (BookingJob, 'trip__user'),
+    (Passenger, 'user'),
+    (Credit, 'user'),
+    (Tombstone, 'user'),
+    (IdempotencyKey, 'user'),
+)
+
+# Deleting a trip status cascades to its trip and everything under it. Those
+# deletes write tombstones, so tombstones go last.
+DELETED_ROWS = (
+    (IdempotencyKey, 'user'),
+    (Credit, 'user'),
+    (Passenger, 'user'),
+    (TripStatus, 'trip__user'),
+    (Tombstone, 'user'),
+)
+
+
+def user_rows(model, lookup, user, using):
+    return model.objects.using(using).filter(**{lookup: user.id})
+
+
+class Command(BaseCommand):
+    help = ("Moves a user's rows to another shard and points the user at it. "
+            "Run it while the user is inactive, since writes made during the "
+            "move can be lost.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('shard', choices=settings.DATABASE_SHARDS)
+
+    def handle(self, *args, **options):
+        try:
+            user = FlytsterUser.objects.using('default').get(email=options['email'])
+        except FlytsterUser.DoesNotExist:
+            raise CommandError('No user has that email.')
+
+        # Users from before sharding was turned on still have their rows on default
+        source, target = user.shard or 'default', options['shard']
+        if source == target:
+            raise CommandError('The user is already on {0}.'.format(target))
+
+        user.shard = target
+        counts = []
+
+        # target commits first. If source then fails to commit, the user still
+        # points at source and the copies on target are cleared on the next run.
+        with transaction.atomic(using=source), transaction.atomic(using=target):
+            self.delete_rows(user, target)
+            copy_user(user, target)
+
+            for model, lookup in MOVED_ROWS:
+                rows = list(user_rows(model, lookup, user, source))
+                model.objects.using(target).bulk_create(rows)
+                counts.append('{0} {1}'.format(len(rows), model._meta.verbose_name_plural))
+
+            self.delete_rows(user, source)
+
+        user.save(using='default', update_fields=['shard'])
+        self.stdout.write('Moved {0} from {1} to {2}: {3}.'.format(
+            user.email, source, target, ', '.join(counts)))
+
+    def delete_rows(self, user, using):
+        with use_shard(using):
+            for model, lookup in DELETED_ROWS:
+                user_rows(model, lookup, user, using).delete()
+            if using != 'default':
+                FlytsterUser.objects.using(using).filter(pk=user.pk).delete()
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_flytsteruser_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flytsteruser',
+            name='primary_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
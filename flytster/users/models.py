@@ -1,13 +1,16 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.core.mail import send_mail
 from django.utils.timezone import now
 
-from twilio.rest import TwilioRestClient
-
 from authentication.models import (AuthToken, InvalidTokenError, EmailToken,
     PasswordToken, PhoneToken)
+from flytster.routers import assign_shard, use_shard
 
 from .utils import new_user_email, verify_email, password_reset_email
 
@@ -22,6 +25,11 @@ class FlytsterUserManager(BaseUserManager):
             phone=phone)
         user.set_password(password)
         user.save(using=self._db)
+
+        if settings.DATABASE_SHARDS:
+            user.shard = assign_shard(user.id)
+            user.save(using=self._db, update_fields=['shard'])
+
         user.send_registration_email(user.email)
 
         AuthToken.objects.create(user=user)
@@ -49,6 +57,9 @@ class FlytsterUser(AbstractBaseUser):
     phone_verified = models.BooleanField(default=False)
     recieve_notifications = models.BooleanField(default=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    shard = models.CharField(max_length=20, blank=True)
+    # Reads go to the primary until then, see ReplicaPinningMiddleware
+    primary_until = models.DateTimeField(null=True, blank=True)
 
     objects = FlytsterUserManager()
 
@@ -61,6 +72,12 @@ class FlytsterUser(AbstractBaseUser):
     def is_staff(self):
         return self.is_active and self.is_admin
 
+    def has_perm(self, perm, obj=None):
+        return self.is_staff
+
+    def has_module_perms(self, app_label):
+        return self.is_staff
+
     def get_full_name(self):
         return self.first_name + ' ' + self.last_name
 
@@ -70,6 +87,22 @@ class FlytsterUser(AbstractBaseUser):
     def str(self):
         return self.email
 
+    @property
+    def is_pinned_to_primary(self):
+        return self.primary_until is not None and self.primary_until > now()
+
+    def pin_to_primary(self):
+        """
+        Sends the user's reads to the primary for REPLICA_PIN_SECONDS, so they
+        see their own writes whatever client they read from next.
+        """
+        # Requests in a burst of writes only extend the pin once it's half gone
+        pin_seconds = settings.REPLICA_PIN_SECONDS
+        if self.primary_until and self.primary_until > now() + timedelta(seconds=pin_seconds / 2):
+            return
+        self.primary_until = now() + timedelta(seconds=pin_seconds)
+        FlytsterUser.objects.filter(pk=self.pk).update(primary_until=self.primary_until)
+
     def login(self):
         for token in self.auth_tokens.all():
             token.is_expired
@@ -164,6 +197,10 @@ class FlytsterUser(AbstractBaseUser):
 
         phone = '+1' + phone
 
+        # Imported here so every process that loads the models, like each
+        # manage.py command, doesn't pay for importing Twilio
+        from twilio.rest import TwilioRestClient
+
         try:
             client = TwilioRestClient(settings.TWILIO_ACCOUNT_ID, settings.TWILIO_API_TOKEN)
             client.messages.create(body=msg, to=phone, from_=settings.TWILIO_NUMBER)
@@ -198,3 +235,27 @@ class FlytsterUser(AbstractBaseUser):
             self.save()
         else:
             raise InvalidTokenError('The supplied phone verification code was invalid.')
+
+
+def copy_user(user, using):
+    copy = FlytsterUser(**{field.attname: getattr(user, field.attname)
+        for field in FlytsterUser._meta.concrete_fields})
+    copy.save(using=using)
+
+
+# Users live on default. Their shard keeps a copy of the row for the foreign
+# keys there.
+
+@receiver(post_save, sender=FlytsterUser)
+def copy_user_to_shard(sender, instance, using, **kwargs):
+    if instance.shard and using == 'default':
+        copy_user(instance, instance.shard)
+
+
+@receiver(post_delete, sender=FlytsterUser)
+def delete_user_from_shard(sender, instance, using, **kwargs):
+    if not instance.shard or using != 'default':
+        return
+
+    with use_shard(instance.shard):
+        FlytsterUser.objects.using(instance.shard).filter(pk=instance.pk).delete()
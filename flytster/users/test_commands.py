@@ -0,0 +1,130 @@
+import pytest
+pytestmark = pytest.mark.django_db
+
+from datetime import timedelta
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.utils import timezone
+
+from bookings.models import BookingJob
+from credits.models import Credit
+from flytster.routers import SHARDED_MODELS, use_shard
+from passengers.models import Passenger
+from sync.models import Tombstone
+from trips.models import Trip, TripStatus
+from users.management.commands.init_shard_sequences import first_id
+from users.models import FlytsterUser
+
+
+def in_a_month():
+    return timezone.now() + timedelta(days=30)
+
+
+class ShardSetupFixture:
+    """
+    A user from before sharding was turned on, with their rows on default.
+    """
+
+    def __init__(self):
+        self.user = FlytsterUser.objects.create_user(
+            first_name='Fly',
+            last_name='High',
+            email='flyhigh@gmail.com',
+            password='Password1'
+        )
+
+        self.trip = Trip.objects.create(
+            user=self.user,
+            data={"fake": "data"},
+            status=TripStatus.objects.create(is_passenger_ready=True)
+        )
+        self.passenger = Passenger.objects.create(
+            user=self.user,
+            trip=self.trip,
+            first_name='Drew',
+            last_name='Brees',
+            gender='M',
+            birthdate='1979-01-15'
+        )
+        self.booking = BookingJob.objects.create(trip=self.trip)
+        self.credit = Credit.objects.create(user=self.user, amount=25, expiration=in_a_month())
+        self.tombstone = Tombstone.objects.create(user=self.user, model='trip', object_id=1)
+
+
+@pytest.fixture(scope="function")
+def setup():
+    return ShardSetupFixture()
+
+
+@pytest.yield_fixture(scope="function")
+def sequences():
+    """
+    Puts the sharded id sequences back to steps of one, since Postgres
+    before 10 doesn't roll back ALTER SEQUENCE.
+    """
+    yield
+    with connections['default'].cursor() as cursor:
+        for label in SHARDED_MODELS:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [apps.get_model(label)._meta.db_table])
+            cursor.execute('ALTER SEQUENCE {0} INCREMENT BY 1'.format(cursor.fetchone()[0]))
+
+
+def test_move_user_keeps_ids(setup, settings, second_shard):
+    settings.DATABASE_SHARDS = ['shard1', second_shard]
+    out = StringIO()
+    call_command('move_user_shard', setup.user.email, second_shard, stdout=out)
+
+    assert FlytsterUser.objects.get(pk=setup.user.pk).shard == second_shard
+    assert FlytsterUser.objects.using(second_shard).filter(pk=setup.user.pk).exists()
+    assert 'Moved flyhigh@gmail.com from default to shard2' in out.getvalue()
+
+    with use_shard(second_shard):
+        trip = Trip.objects.get(pk=setup.trip.pk)
+        assert trip.status_id == setup.trip.status_id
+        assert trip.status.is_passenger_ready
+        assert list(trip.passengers.values_list('id', flat=True)) == [setup.passenger.pk]
+        assert BookingJob.objects.get(trip=trip).pk == setup.booking.pk
+        assert list(Credit.objects.filter(user=setup.user).values_list('id', flat=True)) == [setup.credit.pk]
+        assert list(Tombstone.objects.filter(user=setup.user).values_list('id', flat=True)) == [setup.tombstone.pk]
+
+
+def test_move_user_clears_the_source(setup, settings, second_shard):
+    settings.DATABASE_SHARDS = ['shard1', second_shard]
+    call_command('move_user_shard', setup.user.email, second_shard, stdout=StringIO())
+
+    for model in (Trip, TripStatus, Passenger, BookingJob, Credit, Tombstone):
+        assert not model.objects.using('default').exists(), model
+    assert FlytsterUser.objects.using('default').filter(pk=setup.user.pk).exists()
+
+
+def test_move_user_to_current_shard_fails(setup, settings):
+    settings.DATABASE_SHARDS = ['shard1', 'shard2']
+    FlytsterUser.objects.filter(pk=setup.user.pk).update(shard='shard2')
+
+    with pytest.raises(CommandError):
+        call_command('move_user_shard', setup.user.email, 'shard2', stdout=StringIO())
+    assert Trip.objects.using('default').filter(pk=setup.trip.pk).exists()
+
+
+def test_first_id_is_past_highest_and_offset_mod_stride():
+    assert first_id(0, 1, 64) == 1
+    assert first_id(0, 2, 64) == 2
+    assert first_id(128, 1, 64) == 129
+    assert first_id(129, 1, 64) == 193
+    assert first_id(130, 3, 64) == 131
+
+
+def test_shard_sequences_stride_from_the_shard_number(setup, settings, sequences):
+    settings.DATABASE_SHARDS = ['shard1']
+    settings.DATABASE_SHARD_ID_STRIDE = 64
+    call_command('init_shard_sequences', stdout=StringIO())
+
+    with use_shard('shard1'):
+        first = Credit.objects.create(user=setup.user, amount=10, expiration=in_a_month())
+        second = Credit.objects.create(user=setup.user, amount=10, expiration=in_a_month())
+    assert first.pk > setup.credit.pk
+    assert first.pk % 64 == 1
+    assert second.pk - first.pk == 64
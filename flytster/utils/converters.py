@@ -1,9 +1,47 @@
-from datetime import datetime
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 
+QPX_DATETIME_REGEX = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d)([+-])(\d\d):(\d\d)$')
+
+# Fixed-offset tzinfo objects, shared by every datetime with the same offset.
+# Threads racing to add one just build equal objects, so there's no lock.
+_TIMEZONES = {}
+
+
+def _fixed_timezone(sign, hours, minutes):
+    key = (sign, hours, minutes)
+    tz = _TIMEZONES.get(key)
+    if tz is None:
+        offset = timedelta(hours=int(hours), minutes=int(minutes))
+        tz = _TIMEZONES[key] = timezone(-offset if sign == '-' else offset)
+    return tz
+
+
+@lru_cache(maxsize=4096)
 def utc_string_to_datetime(utc_string):
     """
     utc_string has to be in format: xxxx-xx-xxTxx:xx-xx:xx
+    Parsed by hand instead of strptime, which is far slower. Results are
+    cached since the same flight times show up across many trips.
+    """
+    match = QPX_DATETIME_REGEX.match(utc_string)
+    if match is None:
+        raise ValueError(
+            "time data '{0}' does not match format 'YYYY-MM-DDTHH:MM+HH:MM'".format(utc_string))
+
+    year, month, day, hour, minute, sign, tz_hours, tz_minutes = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute),
+        tzinfo=_fixed_timezone(sign, tz_hours, tz_minutes))
+
+
+def utc_strings_to_datetimes(utc_strings):
+    """
+    Converts a list of utc strings in one call, parsing each distinct string once.
     """
-    string = ''.join(utc_string.rsplit(':', 1))
-    return datetime.strptime(string, '%Y-%m-%dT%H:%M%z')
+    parsed = {}
+    for utc_string in utc_strings:
+        if utc_string not in parsed:
+            parsed[utc_string] = utc_string_to_datetime(utc_string)
+    return [parsed[utc_string] for utc_string in utc_strings]
@@ -0,0 +1,30 @@
+import pytest
+
+from datetime import datetime, timedelta, timezone
+
+from utils.converters import utc_string_to_datetime, utc_strings_to_datetimes
+
+
+def test_utc_string_to_datetime():
+    value = utc_string_to_datetime('2016-02-16T10:25-05:00')
+    assert value == datetime(2016, 2, 16, 15, 25, tzinfo=timezone.utc)
+    assert value.utcoffset() == timedelta(hours=-5)
+
+def test_utc_string_to_datetime_positive_offset():
+    value = utc_string_to_datetime('2016-02-16T10:25+05:30')
+    assert value.utcoffset() == timedelta(hours=5, minutes=30)
+
+def test_utc_string_to_datetime_shares_tzinfo():
+    first = utc_string_to_datetime('2016-02-16T10:25-05:00')
+    second = utc_string_to_datetime('2016-03-01T08:00-05:00')
+    assert first.tzinfo is second.tzinfo
+
+def test_utc_string_to_datetime_bad_format():
+    with pytest.raises(ValueError):
+        utc_string_to_datetime('2016-02-16 10:25')
+    with pytest.raises(ValueError):
+        utc_string_to_datetime('2016-02-30T10:25-05:00')
+
+def test_utc_strings_to_datetimes():
+    strings = ['2016-02-16T14:04-07:00', '2016-02-16T12:25-06:00', '2016-02-16T14:04-07:00']
+    assert utc_strings_to_datetimes(strings) == [utc_string_to_datetime(s) for s in strings]